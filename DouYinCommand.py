@@ -3,9 +3,9 @@
 
 
 import argparse
+import itertools
 import os
 import sys
-import json
 import yaml
 import time
 from dataclasses import dataclass, field
@@ -32,8 +32,13 @@ except ImportError:
 
 from apiproxy.douyin.douyin import Douyin
 from apiproxy.douyin.download import Download
+from apiproxy.douyin.resolver import ShortLinkResolver
+from apiproxy.douyin.client import DouyinAsyncClient
+from apiproxy.douyin.model import Aweme
+from apiproxy.douyin.database import DataBase
 from apiproxy.douyin import douyin_headers
-from apiproxy.common import utils
+from apiproxy.common import utils, jsonlib
+from apiproxy.common.session import create_session
 
 @dataclass
 class DownloadConfig:
@@ -91,6 +96,9 @@ configModel = {
         "music": 0,
     },
     'database': True,
+    "database_path": "data.db",
+    "database_compression": "zlib",
+    "database_dict": False,
     "increase": {
         "post": False,
         "like": False,
@@ -99,6 +107,18 @@ configModel = {
         "music": False,
     },
     "thread": 5,
+    "segments": 4,
+    "segment_threshold_mb": 20,
+    "redirect_cache": "short_links.json",
+    "redirect_cache_days": 30,
+    "async_client": False,
+    "compact_model": False,
+    "json_mode": "file",
+    "json_compression": "",
+    "json_flush_every": 50,
+    "dedup": True,
+    "music_cache": True,
+    "music_cache_mb": 512,
     "cookie": os.environ.get("DOUYIN_COOKIE", "")
 }
 
@@ -150,6 +170,8 @@ def argument():
                         type=int, required=False, default=5)
     parser.add_argument("--cookie", help="设置cookie, 格式: \"name1=value1; name2=value2;\" 注意要加冒号",
                         type=str, required=False, default='')
+    parser.add_argument("--compact", action="store_true",
+                        help="压缩整理数据库: 把旧数据改写为当前压缩格式并回收空间, 完成后退出")
     parser.add_argument("--config", "-F", 
                        type=argparse.FileType('r', encoding='utf-8'),
                        help="配置文件路径")
@@ -221,6 +243,10 @@ def main():
     else:
         yamlConfig()
 
+    if args.compact:
+        compact_database()
+        return
+
     if not validate_config(configModel):
         return
 
@@ -238,25 +264,64 @@ def main():
     douyin_logger.info(f"数据保存路径 {configModel['path']}")
 
     # 初始化下载器
-    dy = Douyin(database=configModel["database"])
+    resolver = ShortLinkResolver(
+        configModel["redirect_cache"],
+        ttl=float(configModel["redirect_cache_days"]) * 86400
+    )
+    # 可选：接口请求改由异步客户端的连接池发出
+    client = DouyinAsyncClient(limit_per_host=configModel["thread"]) if configModel["async_client"] else None
+    # V1 的接口请求与媒体下载共用一个连接池会话
+    session = create_session(max(configModel["thread"], configModel["segments"]))
+    dy = Douyin(database=configModel["database"], database_path=configModel["database_path"],
+                database_compression=configModel["database_compression"] or None,
+                resolver=resolver, client=client, session=session,
+                compact_model=configModel["compact_model"], keep_json=configModel["json"])
     dl = Download(
         thread=configModel["thread"],
         music=configModel["music"],
         cover=configModel["cover"],
         avatar=configModel["avatar"],
         resjson=configModel["json"],
-        folderstyle=configModel["folderstyle"]
+        folderstyle=configModel["folderstyle"],
+        segments=configModel["segments"],
+        segment_threshold=int(float(configModel["segment_threshold_mb"]) * 1024 * 1024),
+        session=session,
+        json_mode=configModel["json_mode"],
+        json_compression=configModel["json_compression"] or None,
+        json_flush_every=configModel["json_flush_every"],
+        dedup=configModel["dedup"],
+        music_cache=os.path.join(configModel["path"], ".music_cache") if configModel["music_cache"] else None,
+        music_cache_bytes=int(float(configModel["music_cache_mb"]) * 1024 * 1024)
     )
 
     # 处理每个链接
-    for link in configModel["link"]:
-        process_link(dy, dl, link)
+    try:
+        for link in configModel["link"]:
+            process_link(dy, dl, link)
+    finally:
+        dy.close()
+        if client is not None:
+            client.close_sync()
+        session.close()
 
     # 计算耗时
     duration = time.time() - start
     douyin_logger.info(f'\n[下载完成]:总耗时: {int(duration/60)}分钟{int(duration%60)}秒\n')
 
 
+def compact_database():
+    """压缩整理增量数据库"""
+    db = DataBase(configModel["database_path"], configModel["database_compression"] or None)
+    try:
+        stats = db.compact(train_dictionary=bool(configModel["database_dict"]))
+    finally:
+        db.close()
+    douyin_logger.info(
+        f"[数据库整理]: 改写 {stats['rows']} 条, "
+        f"{stats['before'] / 1024 / 1024:.1f}MB -> {stats['after'] / 1024 / 1024:.1f}MB"
+    )
+
+
 def process_link(dy, dl, link):
     """处理单个链接的下载逻辑"""
     douyin_logger.info("-" * 80)
@@ -303,9 +368,17 @@ def handle_user_download(dy, dl, key):
         elif mode == 'mix':
             _handle_mix_mode(dy, dl, key, userPath)
 
+def _peek(iterable):
+    """取出生成器的第一项，返回 (第一项, 包含第一项的完整迭代器)，为空时第一项为 None"""
+    iterator = iter(iterable)
+    first = next(iterator, None)
+    if first is None:
+        return None, iter(())
+    return first, itertools.chain((first,), iterator)
+
 def _handle_post_like_mode(dy, dl, key, mode, userPath):
-    """处理发布/喜欢模式的下载"""
-    datalist = dy.getUserInfo(
+    """处理发布/喜欢模式的下载，边获取边下载"""
+    first, datalist = _peek(dy.iterUserInfo(
         key, 
         mode, 
         35, 
@@ -313,9 +386,9 @@ def _handle_post_like_mode(dy, dl, key, mode, userPath):
         configModel["increase"][mode],
         start_time=configModel.get("start_time", ""),
         end_time=configModel.get("end_time", "")
-    )
+    ))
     
-    if not datalist:
+    if first is None:
         return
         
     modePath = os.path.join(userPath, mode)
@@ -335,7 +408,7 @@ def _handle_mix_mode(dy, dl, key, userPath):
     for mix_id, mix_name in mixIdNameDict.items():
         douyin_logger.info(f'[  提示  ]:正在下载合集 [{mix_name}] 中的作品')
         mix_file_name = utils.replaceStr(mix_name)
-        datalist = dy.getMixInfo(
+        first, datalist = _peek(dy.iterMixInfo(
             mix_id, 
             35, 
             0, 
@@ -343,9 +416,9 @@ def _handle_mix_mode(dy, dl, key, userPath):
             key,
             start_time=configModel.get("start_time", ""),
             end_time=configModel.get("end_time", "")
-        )
+        ))
         
-        if datalist:
+        if first is not None:
             dl.userDownload(awemeList=datalist, savePath=os.path.join(modePath, mix_file_name))
             douyin_logger.info(f'[  提示  ]:合集 [{mix_name}] 中的作品下载完成')
 
@@ -353,7 +426,7 @@ def handle_mix_download(dy, dl, key):
     """处理单个合集下载"""
     douyin_logger.info("[  提示  ]:正在请求单个合集下作品")
     try:
-        datalist = dy.getMixInfo(
+        first, datalist = _peek(dy.iterMixInfo(
             key, 
             35, 
             configModel["number"]["mix"], 
@@ -361,13 +434,13 @@ def handle_mix_download(dy, dl, key):
             "",
             start_time=configModel.get("start_time", ""),
             end_time=configModel.get("end_time", "")
-        )
+        ))
         
-        if not datalist:
+        if first is None:
             douyin_logger.error("获取合集信息失败")
             return
             
-        mixname = utils.replaceStr(datalist[0]["mix_info"]["mix_name"])
+        mixname = utils.replaceStr(first.mix_name if isinstance(first, Aweme) else first["mix_info"]["mix_name"])
         mixPath = os.path.join(configModel["path"], f"mix_{mixname}_{key}")
         os.makedirs(mixPath, exist_ok=True)
         dl.userDownload(awemeList=datalist, savePath=mixPath)
@@ -377,10 +450,10 @@ def handle_mix_download(dy, dl, key):
 def handle_music_download(dy, dl, key):
     """处理音乐作品下载"""
     douyin_logger.info("[  提示  ]:正在请求音乐(原声)下作品")
-    datalist = dy.getMusicInfo(key, 35, configModel["number"]["music"], configModel["increase"]["music"])
+    first, datalist = _peek(dy.iterMusicInfo(key, 35, configModel["number"]["music"], configModel["increase"]["music"]))
 
-    if datalist:
-        musicname = utils.replaceStr(datalist[0]["music"]["title"])
+    if first is not None:
+        musicname = utils.replaceStr(first.music_title if isinstance(first, Aweme) else first["music"]["title"])
         musicPath = os.path.join(configModel["path"], f"music_{musicname}_{key}")
         os.makedirs(musicPath, exist_ok=True)
         dl.userDownload(awemeList=datalist, savePath=musicPath)
@@ -457,8 +530,7 @@ def handle_live_download(dy, dl, key):
         json_path = os.path.join(livePath, f"{live_file_name}.json")
         
         douyin_logger.info("[  提示  ]:正在保存获取到的信息到result.json")
-        with open(json_path, "w", encoding='utf-8') as f:
-            json.dump(live_json, f, ensure_ascii=False, indent=2)
+        jsonlib.dump_file(json_path, live_json)
 
 # 条件定义异步函数
 if ASYNC_SUPPORT:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+作品文件去重
+同一个作品常在一次运行中以不同身份出现（主页作品、喜欢、合集、音乐），
+各自保存到不同目录。按 (aweme_id, 资源) 记录第一次保存的位置，
+再次出现时链接到已有文件而不是重新下载
+"""
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Linux 的 FICLONE ioctl：btrfs / xfs 等文件系统上共享数据块的写时复制副本
+FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if fcntl is None:
+        raise OSError("当前平台不支持 reflink")
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src: Union[str, Path], dst: Union[str, Path], symlink: bool = True) -> str:
+    """让 dst 与 src 内容相同，依次尝试硬链接、reflink、符号链接、复制
+
+    Args:
+        symlink: src 之后可能被删除时应为 False，不使用符号链接
+
+    Returns:
+        使用的方式: hardlink / reflink / symlink / copy
+    """
+    src, dst = Path(src), Path(dst)
+    if os.path.lexists(dst):
+        raise FileExistsError(f"目标文件已存在: {dst}")
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        _reflink(src, dst)
+        return 'reflink'
+    except OSError:
+        pass
+    if symlink:
+        try:
+            os.symlink(src.resolve(), dst)
+            return 'symlink'
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+
+class ContentIndex:
+    """aweme_id -> 已保存文件 的索引，线程安全"""
+
+    def __init__(self):
+        self._paths: Dict[Tuple[str, str], Path] = {}
+        self._lock = threading.Lock()
+        # 通过链接复用的文件数与字节数
+        self.linked = 0
+        self.linked_bytes = 0
+
+    def record(self, aweme_id, asset: str, path: Union[str, Path]) -> None:
+        """记录作品的某个资源（video / image_0 / music / cover ...）已保存在 path"""
+        with self._lock:
+            self._paths.setdefault((str(aweme_id), asset), Path(path))
+
+    def lookup(self, aweme_id, asset: str) -> Optional[Path]:
+        """已保存的文件路径，文件已被删除时返回 None"""
+        key = (str(aweme_id), asset)
+        with self._lock:
+            path = self._paths.get(key)
+        if path is None:
+            return None
+        if not path.is_file():
+            with self._lock:
+                self._paths.pop(key, None)
+            return None
+        return path
+
+    def link(self, aweme_id, asset: str, dst: Union[str, Path]) -> bool:
+        """已保存过该资源时把 dst 链接到已有文件
+
+        Returns:
+            是否已生成 dst；False 时调用方应正常下载
+        """
+        dst = Path(dst)
+        src = self.lookup(aweme_id, asset)
+        if src is None or src == dst:
+            return False
+        try:
+            method = link_file(src, dst)
+        except OSError as e:
+            logger.warning(f"复用已下载文件失败 {src} -> {dst}: {e}")
+            return False
+        size = src.stat().st_size
+        with self._lock:
+            self.linked += 1
+            self.linked_bytes += size
+        logger.info(f"复用已下载文件({method}): {src} -> {dst}")
+        return True
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+JSON 编解码
+安装了 orjson 时使用 orjson（直接解析响应字节、直接输出字节），
+否则回退到标准库 json；两种实现的输出语义一致：
+UTF-8 不转义中文，indent 时缩进 2 个空格
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# orjson.JSONDecodeError 是其子类，捕获该异常即可兼容两种实现
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND = 'orjson' if ORJSON_AVAILABLE else 'json'
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """解析 JSON，data 可以是响应的原始字节或字符串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节
+
+    Args:
+        indent: True 时缩进 2 个空格（用于写入文件），否则为紧凑格式（用于存库）
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    """序列化为字符串"""
+    return dumps(obj, indent).decode('utf-8')
+
+
+def dump_file(path: Union[str, Path], obj: Any, indent: bool = True) -> None:
+    """写入 JSON 文件（默认缩进），直接写字节，不经过文本编码层"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent))
+
+
+# 对象结束且其后为数组分隔符或数组结束，是元素结束位置的候选
+_OBJECT_END = re.compile(rb'\}(?=\s*[,\]])')
+
+
+def array_item_spans(data: bytes, key: str, count: int) -> Optional[List[Tuple[int, int]]]:
+    """在原始 JSON 字节中定位 key 对应数组的前 count 个对象元素
+
+    不构建任何对象：以正则找出候选的对象结束位置，用括号计数确定每个元素的边界。
+    返回各元素的 (起始, 结束) 偏移，data[start:end] 即该元素的原始 JSON；
+    找不到数组、元素数量不足或字符串中的括号导致计数失衡时返回 None，
+    调用方应回退到解析后再序列化。
+    """
+    match = re.search(rb'"' + re.escape(key.encode('utf-8')) + rb'"\s*:\s*\[', data)
+    if match is None:
+        return None
+    ends = _OBJECT_END.finditer(data, match.end())
+    spans = []
+    pos = match.end()
+    for _ in range(count):
+        start = data.find(b'{', pos)
+        if start < 0:
+            return None
+        balance = 0
+        counted = start
+        for end_match in ends:
+            end = end_match.end()
+            if end <= start:
+                continue
+            balance += data.count(b'{', counted, end) - data.count(b'}', counted, end)
+            counted = end
+            if balance == 0:
+                break
+        else:
+            return None
+        spans.append((start, end))
+        pos = end
+    return spans
+
+
+if __name__ == '__main__':
+    import time
+
+    sample = {
+        'aweme_id': '7300000000000000000', 'desc': '测试作品 #话题', 'create_time': 1700000000,
+        'author': {'nickname': '作者', 'avatar': {'url_list': ['https://p3.douyinpic.com/a.jpeg'] * 3}},
+        'statistics': {'digg_count': 12345, 'comment_count': 67, 'share_count': 8},
+        'images': [{'width': 1080, 'height': 1920, 'url_list': ['https://p9.douyinpic.com/i.jpeg'] * 3}] * 4,
+    }
+    page = json.dumps({'status_code': 0, 'aweme_list': [sample] * 35}, ensure_ascii=False).encode('utf-8')
+
+    # 两种实现的结果一致
+    assert loads(page) == json.loads(page)
+    spans = array_item_spans(page, 'aweme_list', 35)
+    assert [json.loads(page[a:b]) for a, b in spans] == json.loads(page)['aweme_list']
+    assert json.loads(dumps(sample, True)) == sample
+    assert dumps(sample, True).decode('utf-8') == json.dumps(sample, ensure_ascii=False, indent=2)
+
+    n = 2000
+    start = time.perf_counter()
+    for _ in range(n):
+        json.loads(page.decode('utf-8'))
+        json.dumps(sample, ensure_ascii=False, indent=2).encode('utf-8')
+    stdlib = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n):
+        loads(page)
+        dumps(sample, True)
+    current = time.perf_counter() - start
+    print(f"后端: {BACKEND}  标准库: {stdlib * 1000 / n:.3f}ms/页  当前: {current * 1000 / n:.3f}ms/页")
+
+    start = time.perf_counter()
+    for _ in range(n):
+        array_item_spans(page, 'aweme_list', 35)
+    print(f"定位原始元素: {(time.perf_counter() - start) * 1000 / n:.3f}ms/页")
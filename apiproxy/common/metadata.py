@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+作品元数据汇总存储
+一个目录（用户/合集/音乐）下的所有作品元数据追加写入同一个 JSON Lines 文件，
+可选 gzip / zstd 压缩，并维护 aweme_id -> 偏移 的索引文件用于随机读取，
+代替每个作品一个 JSON 文件
+"""
+
+import gzip
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from apiproxy.common import jsonlib
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = {None: '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+
+class MetadataSink:
+    """追加写入的元数据文件
+
+    每条记录独立压缩为一个 gzip member / zstd frame（多个拼接仍是合法的压缩文件，
+    可以直接用 zcat / zstdcat 读取），索引文件每行记录 "aweme_id 偏移 长度"，
+    读取单条记录时只需 seek 后解压该段。写入先在内存中累积，
+    每 flush_every 条或距上次落盘超过 flush_interval 秒时写入磁盘；后者由
+    定时器保证，即使之后不再有写入（例如下载进度停在某一页），未落盘的
+    记录最多延迟 flush_interval 秒写入。
+    """
+
+    def __init__(self, directory: Union[str, Path], name: str = 'metadata', compression: Optional[str] = None,
+                 flush_every: int = 50, flush_interval: float = 5.0, level: int = 6):
+        if compression in ('none', ''):
+            compression = None
+        if compression not in SUFFIXES:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            logger.warning("zstandard 未安装，元数据改用 gzip 压缩: pip install zstandard")
+            compression = 'gzip'
+
+        self.directory = Path(directory)
+        self.compression = compression
+        self.path = self.directory / f"{name}{SUFFIXES[compression]}"
+        self.index_path = self.directory / f"{name}.idx"
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.level = level
+        self._compressor = zstandard.ZstdCompressor(level=level) if compression == 'zstd' else None
+
+        self._file = None
+        self._index_file = None
+        self._offset = 0
+        self._pending = []
+        self._pending_index = []
+        self._last_flush = time.monotonic()
+        # 有未落盘记录时启动的定时落盘
+        self._timer: Optional[threading.Timer] = None
+        # 已写入的记录，用于去重与随机读取（首次需要时从索引文件加载）
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ 写入
+
+    def _open(self) -> None:
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'ab')
+            self._index_file = open(self.index_path, 'a', encoding='utf-8')
+            self._offset = self._file.seek(0, os.SEEK_END)
+
+    def _encode(self, line: bytes) -> bytes:
+        if self.compression == 'gzip':
+            return gzip.compress(line, compresslevel=self.level, mtime=0)
+        if self.compression == 'zstd':
+            return self._compressor.compress(line)
+        return line
+
+    def write(self, aweme_id: str, record: Union[dict, bytes, memoryview]) -> bool:
+        """追加一条记录，已存在的 aweme_id 不重复写入
+
+        Args:
+            record: 作品数据字典，或接口返回的原始 JSON 字节
+        Returns:
+            是否写入
+        """
+        if isinstance(record, (bytes, bytearray, memoryview)):
+            # JSON 字符串内不会出现原始换行，去掉格式化产生的换行即为单行
+            line = bytes(record).translate(None, b'\r\n')
+        else:
+            line = jsonlib.dumps(record)
+        aweme_id = str(aweme_id)
+
+        with self._lock:
+            index = self._load_index()
+            if aweme_id in index:
+                return False
+            self._open()
+            data = self._encode(line + b'\n')
+            index[aweme_id] = (self._offset, len(data))
+            self._pending.append(data)
+            self._pending_index.append(f"{aweme_id} {self._offset} {len(data)}\n")
+            self._offset += len(data)
+            if (len(self._pending) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._file is not None:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            # 先写数据再写索引，中断时索引最多缺少最后几条
+            self._file.write(b''.join(self._pending))
+            self._file.flush()
+            self._index_file.write(''.join(self._pending_index))
+            self._index_file.flush()
+            self._pending.clear()
+            self._pending_index.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._index_file.close()
+                self._file = None
+                self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------ 读取
+
+    def _load_index(self) -> Dict[str, Tuple[int, int]]:
+        if self._index is None:
+            self._index = {}
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 3:
+                            self._index[parts[0]] = (int(parts[1]), int(parts[2]))
+            except FileNotFoundError:
+                pass
+        return self._index
+
+    def __contains__(self, aweme_id) -> bool:
+        with self._lock:
+            return str(aweme_id) in self._load_index()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    def get(self, aweme_id) -> Optional[Any]:
+        """按 aweme_id 读取一条记录，不存在时返回 None"""
+        with self._lock:
+            entry = self._load_index().get(str(aweme_id))
+            if entry is None:
+                return None
+            # 读取尚未落盘的记录前先写入
+            self._open()
+            self._flush()
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        if self.compression == 'gzip':
+            data = gzip.decompress(data)
+        elif self.compression == 'zstd':
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return jsonlib.loads(data)
+
+
+class MetadataSinks:
+    """按目录复用 MetadataSink，统一关闭"""
+
+    def __init__(self, name: str = 'metadata', compression: Optional[str] = None, flush_every: int = 50):
+        self.name = name
+        self.compression = compression
+        self.flush_every = flush_every
+        self._sinks: Dict[Path, MetadataSink] = {}
+        self._lock = threading.Lock()
+
+    def get(self, directory: Union[str, Path]) -> MetadataSink:
+        directory = Path(directory)
+        with self._lock:
+            sink = self._sinks.get(directory)
+            if sink is None:
+                sink = MetadataSink(directory, self.name, self.compression, self.flush_every)
+                self._sinks[directory] = sink
+            return sink
+
+    def close(self, directory: Union[str, Path, None] = None) -> None:
+        """关闭指定目录的存储，不指定时全部关闭"""
+        with self._lock:
+            if directory is None:
+                sinks = list(self._sinks.values())
+                self._sinks.clear()
+            else:
+                sink = self._sinks.pop(Path(directory), None)
+                sinks = [sink] if sink is not None else []
+        for sink in sinks:
+            sink.close()
+
+
+if __name__ == '__main__':
+    pass
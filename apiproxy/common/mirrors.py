@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CDN 镜像统计
+接口返回的 url_list 通常包含多个 CDN 镜像，按主机记录响应耗时，
+下次优先选择历史表现更好的镜像
+"""
+
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class MirrorStats:
+    """按主机记录首字节耗时的指数加权平均（EWMA），线程安全"""
+
+    def __init__(self, alpha: float = 0.3, failure_penalty: float = 10.0):
+        self.alpha = alpha
+        # 请求失败时按该耗时(秒)计入，使不可用的镜像排到后面
+        self.failure_penalty = failure_penalty
+        self._latency: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc
+
+    def record(self, url: str, seconds: float) -> None:
+        """记录一次成功请求的首字节耗时"""
+        key = self.host(url)
+        with self._lock:
+            previous = self._latency.get(key)
+            if previous is None:
+                self._latency[key] = seconds
+            else:
+                self._latency[key] = previous + self.alpha * (seconds - previous)
+
+    def record_failure(self, url: str) -> None:
+        """记录一次失败请求"""
+        self.record(url, self.failure_penalty)
+
+    def latency(self, url: str) -> Optional[float]:
+        with self._lock:
+            return self._latency.get(self.host(url))
+
+    def order(self, urls: List[str]) -> List[str]:
+        """按历史耗时排序同一质量的镜像
+
+        urls 应为同一资源、同一质量的候选地址，第一个视为首选：
+        首选镜像的主机还没有记录时保持在最前；有记录的主机按耗时排序，
+        没有记录的主机排在有记录的之后，保持接口返回的原始顺序
+        （由对冲请求在首选镜像变慢时获得数据）。
+        """
+        candidates = [url for url in dict.fromkeys(urls or []) if url]
+        if not candidates:
+            return []
+        with self._lock:
+            latency = {url: self._latency.get(self.host(url)) for url in candidates}
+        pinned = [] if latency[candidates[0]] is not None else candidates[:1]
+        rest = candidates[len(pinned):]
+        measured = sorted((url for url in rest if latency[url] is not None), key=latency.__getitem__)
+        unseen = [url for url in rest if latency[url] is None]
+        return pinned + measured + unseen
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._latency)
+
+
+# 进程内共享，V1 和 V2 下载器共用同一份镜像统计
+mirror_stats = MirrorStats()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+背景音乐缓存
+热门音乐会被一个主页下的大量作品重复使用，按音乐 ID / uri 只下载一次，
+保存在缓存目录中并链接到各作品目录；缓存总大小超过上限时淘汰最久未使用的音乐
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from apiproxy.common.contentindex import link_file
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.mp3'
+PART_SUFFIX = '.part'
+
+
+def music_key(music: Any) -> Optional[str]:
+    """音乐缓存的 key
+
+    使用播放地址的 uri：接口原始数据与转换后的作品数据（Aweme.music）中都有，
+    两个下载器对同一音乐得到相同的 key；原始数据中没有 uri 时使用音乐 ID。
+
+    Args:
+        music: 作品数据中的 music 字典，或带 uri 属性的 Aweme.music
+    """
+    if isinstance(music, dict):
+        key = (music.get('play_url') or {}).get('uri') or music.get('id_str') or music.get('id')
+    else:
+        key = getattr(music, 'uri', None)
+    return str(key) if key else None
+
+
+class MusicCache:
+    """按音乐 key 缓存音频文件的 LRU 缓存，线程安全
+
+    用法：link(key, dst) 命中时直接生成 dst；未命中时调用方下载到 part_path(key)，
+    再调用 add(key, dst) 放入缓存并生成 dst。
+    缓存文件以硬链接 / reflink / 复制的方式进入作品目录（不使用符号链接），
+    淘汰缓存文件不影响已生成的作品文件。
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> 文件大小，按最近使用排序（最后一个最近使用）
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 命中时节省的下载字节数
+        self.saved_bytes = 0
+        self._load()
+
+    def _load(self) -> None:
+        """按修改时间（每次命中时更新）恢复缓存目录中已有文件的使用顺序"""
+        try:
+            files = [p for p in self.directory.iterdir() if p.suffix == SUFFIX and p.is_file()]
+        except FileNotFoundError:
+            return
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._size += size
+
+    @staticmethod
+    def _name(key) -> str:
+        key = str(key)
+        if re.fullmatch(r'[\w\-]{1,64}', key):
+            return key
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def path(self, key) -> Path:
+        return self.directory / f"{self._name(key)}{SUFFIX}"
+
+    def part_path(self, key) -> Path:
+        """未命中时的下载位置，下载完成后由 add() 移入缓存"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"{self._name(key)}{SUFFIX}{PART_SUFFIX}"
+
+    def link(self, key, dst: Union[str, Path]) -> bool:
+        """缓存命中时生成 dst 并返回 True，未命中返回 False（计入 miss）"""
+        name = self._name(key)
+        with self._lock:
+            size = self._entries.get(name)
+            if size is not None:
+                self._entries.move_to_end(name)
+        path = self.path(key)
+        if size is None or not path.is_file():
+            with self._lock:
+                if size is not None:
+                    self._forget(name)
+                self.misses += 1
+            return False
+        try:
+            link_file(path, dst, symlink=False)
+            os.utime(path)
+        except OSError as e:
+            logger.warning(f"使用缓存音乐失败 {path} -> {dst}: {e}")
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+            self.saved_bytes += size
+        return True
+
+    def add(self, key, dst: Optional[Union[str, Path]] = None) -> bool:
+        """把 part_path(key) 下载好的文件放入缓存，并生成 dst"""
+        name = self._name(key)
+        part, path = self.part_path(key), self.path(key)
+        try:
+            os.replace(part, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"缓存音乐失败 {part}: {e}")
+            return False
+        with self._lock:
+            self._forget(name)
+            self._entries[name] = size
+            self._size += size
+            self._evict(keep=name)
+        if dst is None:
+            return True
+        try:
+            link_file(path, dst, symlink=False)
+            return True
+        except OSError as e:
+            logger.warning(f"使用缓存音乐失败 {path} -> {dst}: {e}")
+            return False
+
+    def _forget(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._size -= size
+
+    def _evict(self, keep: str) -> None:
+        """删除最久未使用的文件直到总大小不超过上限，刚加入的 keep 不淘汰"""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            self._forget(name)
+            self.evictions += 1
+            try:
+                os.remove(self.directory / f"{name}{SUFFIX}")
+            except OSError:
+                pass
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'saved_bytes': self.saved_bytes,
+                'entries': len(self._entries),
+                'size': self._size,
+            }
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+同步请求的连接池会话
+V1 流程（Douyin / Download）共用一个 requests.Session，复用 keep-alive 连接，
+连接失败与 429/5xx 在适配器层面重试
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session(pool_size: int = 10, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """创建带连接池与重试的会话
+
+    Args:
+        pool_size: 每个主机保持的连接数，一般取下载线程数
+        retries: 连接错误、429/5xx 的重试次数
+        backoff: 重试间隔的指数退避系数(秒)
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # 重试用尽时返回最后一次响应，由调用方按状态码处理
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+if __name__ == '__main__':
+    pass
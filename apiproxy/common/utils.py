@@ -14,9 +14,103 @@ import time
 import apiproxy
 
 
+def _rc4_schedule(key: bytes) -> list:
+    """RC4 密钥调度，返回置换后的 S 盒"""
+    d = list(range(256))
+    c = 0
+    for i in range(256):
+        c = (c + d[i] + key[i % len(key)]) & 255
+        d[i], d[c] = d[c], d[i]
+    return d
+
+
+def _rc4_crypt(box: list, data: bytes) -> bytearray:
+    """在 S 盒副本上执行 RC4 伪随机生成并与 data 异或"""
+    d = box[:]
+    result = bytearray(data)
+    t = c = 0
+    for i in range(len(result)):
+        t = (t + 1) & 255
+        c = (c + d[t]) & 255
+        d[t], d[c] = d[c], d[t]
+        result[i] ^= d[(d[t] + d[c]) & 255]
+    return result
+
+
+class XBogusSigner(object):
+    """X-Bogus 签名器
+
+    与 Utils.getXbogus 结果一致（同一时间戳下逐字节相同），但把与请求无关的
+    部分预先算好：UA 盐只在创建时计算一次；混淆步骤的 RC4 密钥固定为 0xff、
+    长度固定为 19 字节，密钥流也是常量，每次签名只剩两次 MD5 和异或。
+    """
+
+    SHORT_STR = "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
+    CANVAS = 1489154074
+    # 标准 base64 字母表到 X-Bogus 字母表的映射（21 字节恰好编码为 28 个字符，无填充）
+    _ALPHABET = str.maketrans(
+        'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/',
+        SHORT_STR[:64]
+    )
+    _KEYSTREAM = int.from_bytes(_rc4_crypt(_rc4_schedule(b'\xff'), bytes(19)), 'big')
+
+    def __init__(self, ua: str = apiproxy.ua):
+        self.ua = ua
+        ua_cipher = _rc4_crypt(_rc4_schedule(b'\x00\x01\x0e'), ua.encode('latin-1'))
+        salt_ua = hashlib.md5(base64.b64encode(ua_cipher)).digest()
+        self._salt_ua = salt_ua[14:16]
+        self._salt_form = {}
+
+    @staticmethod
+    def _salt(data: str) -> bytes:
+        return hashlib.md5(hashlib.md5(data.encode()).digest()).digest()[14:16]
+
+    def sign(self, payload: str, form: str = '', timestamp: int = None) -> str:
+        """计算 X-Bogus 值"""
+        if timestamp is None:
+            timestamp = int(time.time())
+        salt_form = self._salt_form.get(form)
+        if salt_form is None:
+            salt_form = self._salt_form[form] = self._salt(form)
+        salt_payload = self._salt(payload)
+
+        arr1 = bytearray(19)
+        arr1[0:4] = b'\x40\x00\x01\x0e'
+        arr1[4:6] = salt_payload
+        arr1[6:8] = salt_form
+        arr1[8:10] = self._salt_ua
+        arr1[10:14] = (timestamp & 0xffffffff).to_bytes(4, 'big')
+        arr1[14:18] = self.CANVAS.to_bytes(4, 'big')
+        check = 64
+        for i in range(1, 18):
+            check ^= arr1[i]
+        arr1[18] = check
+
+        # 原实现先按奇偶位拆开（arr2）再交错（garbled），两步互逆，结果就是 arr1
+        garbled = (int.from_bytes(arr1, 'big') ^ self._KEYSTREAM).to_bytes(19, 'big')
+        return base64.b64encode(b'\x02\xff' + garbled).decode().translate(self._ALPHABET)
+
+    def sign_params(self, payload: str, form: str = '', timestamp: int = None) -> str:
+        """返回附加了 X-Bogus 的参数串，与 Utils.getXbogus 相同"""
+        return payload + "&X-Bogus=" + self.sign(payload, form, timestamp)
+
+    def sign_many(self, params_list, form: str = '', timestamp: int = None) -> list:
+        """批量签名（分页器一次生成多页请求时使用），整批共用一个时间戳"""
+        if timestamp is None:
+            timestamp = int(time.time())
+        return [self.sign_params(params, form, timestamp) for params in params_list]
+
+
 class Utils(object):
     def __init__(self):
-        pass
+        # 每个 UA 一个签名器
+        self._signers = {}
+
+    def get_signer(self, ua: str = apiproxy.ua) -> XBogusSigner:
+        signer = self._signers.get(ua)
+        if signer is None:
+            signer = self._signers[ua] = XBogusSigner(ua)
+        return signer
 
     def replaceStr(self, filenamestr: str):
         """
@@ -71,9 +165,7 @@ class Utils(object):
             return j
 
     def getXbogus(self, payload, form='', ua=apiproxy.ua):
-        xbogus = self.get_xbogus(payload, ua, form)
-        params = payload + "&X-Bogus=" + xbogus
-        return params
+        return self.get_signer(ua).sign_params(payload, form)
 
     def get_xbogus(self, payload, ua, form):
         short_str = "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
@@ -183,4 +275,30 @@ class Utils(object):
 
 
 if __name__ == "__main__":
-    pass
+    # 签名性能对比：python -m apiproxy.common.utils
+    import timeit
+
+    from apiproxy.douyin.paginator import build_params
+
+    u = Utils()
+    signer = u.get_signer()
+    payloads = [build_params(sec_user_id='MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek',
+                             count=35, max_cursor=i) for i in range(200)]
+    ts = int(time.time())
+
+    # 校验：固定时间戳下与原实现逐字节一致
+    real_time = time.time
+    time.time = lambda: ts
+    try:
+        legacy = [p + "&X-Bogus=" + u.get_xbogus(p, apiproxy.ua, '') for p in payloads]
+    finally:
+        time.time = real_time
+    assert signer.sign_many(payloads, timestamp=ts) == legacy
+
+    n = 5
+    t_legacy = timeit.timeit(lambda: [u.get_xbogus(p, apiproxy.ua, '') for p in payloads], number=n)
+    t_signer = timeit.timeit(lambda: signer.sign_many(payloads), number=n)
+    per = n * len(payloads)
+    print(f"原实现:   {t_legacy / per * 1e6:8.1f} us/次")
+    print(f"签名器:   {t_signer / per * 1e6:8.1f} us/次")
+    print(f"加速比:   {t_legacy / t_signer:8.1f}x")
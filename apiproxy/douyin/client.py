@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+抖音接口异步客户端
+覆盖 urls.py 中的作品、用户、喜欢、合集、音乐、直播接口，统一使用一个
+连接池会话、一套 X-Bogus 签名和一种错误类型；列表接口以异步迭代器返回
+"""
+
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import aiohttp
+
+from apiproxy.common import jsonlib
+from apiproxy.douyin import douyin_headers
+from apiproxy.douyin.urls import Urls
+from apiproxy.douyin.paginator import WEB_COMMON_PARAMS, build_params, sign_url, paginate
+
+logger = logging.getLogger(__name__)
+
+class RawResponse(namedtuple('RawResponse', ['status_code', 'content', 'url'])):
+    """同步调用返回的简化响应，字段与 requests.Response 同名"""
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+
+class DouyinAPIError(Exception):
+    """接口请求失败：网络错误、HTTP 状态码异常、空响应或 status_code 非 0"""
+
+    def __init__(self, message: str, url: str = '', status: Optional[int] = None,
+                 status_code: Optional[int] = None):
+        super().__init__(message)
+        self.url = url
+        # HTTP 状态码
+        self.status = status
+        # 接口返回的 status_code
+        self.status_code = status_code
+
+
+class DouyinAsyncClient:
+    """抖音接口异步客户端
+
+    可以传入外部的 aiohttp 会话共用连接池（由外部负责关闭），
+    也可以由客户端自己创建，此时使用完需调用 close()。
+
+    同步代码可通过 get_sync() 调用：客户端已绑定事件循环（传入 loop 或在某个循环中
+    使用过）时，请求会被投递到该循环执行；否则启动一个后台线程运行私有事件循环。
+    外部会话只能在创建它的事件循环中使用，传入外部会话时必须同时传入 loop。
+    """
+
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None, headers: Optional[Dict] = None,
+                 prefetch: int = 1, rate_limiter=None, timeout: float = 10, limit_per_host: int = 4,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.urls = Urls()
+        self.headers = headers if headers is not None else douyin_headers
+        self.prefetch = prefetch
+        self.rate_limiter = rate_limiter
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limit_per_host = limit_per_host
+        self._session = session
+        self._owns_session = session is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = loop
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ------------------------------------------------------------------ 请求
+
+    async def fetch(self, url: str) -> RawResponse:
+        """请求原始响应，网络错误转换为 DouyinAPIError"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        # 未安装 brotli 时 aiohttp 无法解压 br，固定为 gzip/deflate
+        headers = {**self.headers, 'accept-encoding': 'gzip, deflate'}
+        try:
+            async with self.session.get(url, headers=headers, timeout=self.timeout) as response:
+                content = await response.read()
+                return RawResponse(response.status, content, str(response.url))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise DouyinAPIError(f"请求失败: {e!r}", url=url) from e
+
+    async def request(self, url: str, check_status: bool = True) -> Dict[str, Any]:
+        """请求并解析 JSON
+
+        Args:
+            url: 已签名的完整地址
+            check_status: 是否要求接口返回 status_code == 0
+        """
+        data, _ = await self.request_raw(url, check_status)
+        return data
+
+    async def request_raw(self, url: str, check_status: bool = True) -> Tuple[Dict[str, Any], bytes]:
+        """同 request()，同时返回响应的原始字节"""
+        response = await self.fetch(url)
+        if response.status_code != 200:
+            raise DouyinAPIError(f"HTTP {response.status_code}", url=url, status=response.status_code)
+        if not response.content:
+            raise DouyinAPIError("响应内容为空", url=url, status=response.status_code)
+        try:
+            data = jsonlib.loads(response.content)
+        except jsonlib.JSONDecodeError as e:
+            raise DouyinAPIError(f"JSON解析失败: {e}", url=url, status=response.status_code) from e
+        if check_status and data.get('status_code') != 0:
+            raise DouyinAPIError(data.get('status_msg') or '未知错误', url=url,
+                                 status=response.status_code, status_code=data.get('status_code'))
+        return data, response.content
+
+    async def get_json(self, api_url: str, check_status: bool = True, **fields) -> Dict[str, Any]:
+        """拼接公共参数、签名后请求接口"""
+        return await self.request(sign_url(api_url, build_params(**fields)), check_status)
+
+    async def get_json_raw(self, api_url: str, check_status: bool = True, **fields) -> Tuple[Dict[str, Any], bytes]:
+        """同 get_json()，同时返回响应的原始字节"""
+        return await self.request_raw(sign_url(api_url, build_params(**fields)), check_status)
+
+    def get_sync(self, url: str) -> RawResponse:
+        """供同步代码调用的 fetch()"""
+        if self._loop is None:
+            if not self._owns_session:
+                # 外部会话绑定在创建它的循环上，不能由私有循环驱动
+                raise RuntimeError("客户端使用外部会话但未绑定事件循环，请在创建时传入 loop")
+            self._start_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError("不能在客户端所在的事件循环中同步调用，请使用 await fetch()")
+        return asyncio.run_coroutine_threadsafe(self.fetch(url), self._loop).result()
+
+    def close_sync(self):
+        """关闭 get_sync() 启动的后台事件循环"""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    def _start_loop(self):
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, name='douyin-client', daemon=True)
+        self._thread.start()
+        self._loop = loop
+
+    # ------------------------------------------------------------------ 单条数据
+
+    async def aweme_detail(self, aweme_id: str) -> Dict[str, Any]:
+        """作品详情（POST_DETAIL），返回 aweme_detail"""
+        params = build_params(aweme_id=aweme_id) + '&update_version_code=170400'
+        data = await self.request(sign_url(self.urls.POST_DETAIL, params))
+        if not data.get('aweme_detail'):
+            raise DouyinAPIError("响应中缺少aweme_detail字段", url=self.urls.POST_DETAIL)
+        return data['aweme_detail']
+
+    async def user_detail(self, sec_uid: str) -> Dict[str, Any]:
+        """用户详细信息（USER_DETAIL），返回完整响应（含 user 字段）"""
+        return await self.get_json(self.urls.USER_DETAIL, sec_user_id=sec_uid)
+
+    async def live_info(self, web_rid: str) -> Dict[str, Any]:
+        """直播间信息（LIVE）"""
+        # 直播接口参数顺序与其他接口不同：aid 在前，device_platform=web
+        common = WEB_COMMON_PARAMS.split('&', 2)[2]
+        params = f'aid=6383&device_platform=web&web_rid={web_rid}&{common}'
+        return await self.request(sign_url(self.urls.LIVE, params))
+
+    async def live_reflow(self, room_id: str) -> Dict[str, Any]:
+        """分享链接直播间信息（LIVE2），用于获取 web_rid"""
+        params = f'live_id=1&room_id={room_id}&app_id=1128'
+        return await self.request(sign_url(self.urls.LIVE2, params), check_status=False)
+
+    # ------------------------------------------------------------------ 分页接口
+
+    async def user_post_page(self, sec_uid: str, max_cursor: int = 0, count: int = 35) -> Dict[str, Any]:
+        """用户作品（USER_POST）一页"""
+        return await self.get_json(self.urls.USER_POST, sec_user_id=sec_uid, count=count, max_cursor=max_cursor)
+
+    async def user_like_page(self, sec_uid: str, max_cursor: int = 0, count: int = 35) -> Dict[str, Any]:
+        """用户喜欢一页，USER_FAVORITE_A 失败时改用 USER_FAVORITE_B"""
+        try:
+            return await self.get_json(self.urls.USER_FAVORITE_A, sec_user_id=sec_uid, count=count, max_cursor=max_cursor)
+        except DouyinAPIError as e:
+            logger.debug(f"喜欢接口A失败，改用接口B: {e}")
+            return await self.get_json(self.urls.USER_FAVORITE_B, sec_user_id=sec_uid, count=count, max_cursor=max_cursor)
+
+    async def mix_page(self, mix_id: str, cursor: int = 0, count: int = 35) -> Dict[str, Any]:
+        """合集作品（USER_MIX）一页"""
+        return await self.get_json(self.urls.USER_MIX, check_status=False, mix_id=mix_id, cursor=cursor, count=count)
+
+    async def user_mix_list_page(self, sec_uid: str, cursor: int = 0, count: int = 35) -> Dict[str, Any]:
+        """用户合集列表（USER_MIX_LIST）一页"""
+        return await self.get_json(self.urls.USER_MIX_LIST, sec_user_id=sec_uid, count=count, cursor=cursor)
+
+    async def music_page(self, music_id: str, cursor: int = 0, count: int = 35) -> Dict[str, Any]:
+        """音乐作品（MUSIC）一页"""
+        return await self.get_json(self.urls.MUSIC, check_status=False, music_id=music_id, cursor=cursor, count=count)
+
+    def _iterate(self, fetch_page, list_field: str = 'aweme_list', cursor_field: str = 'cursor') -> AsyncIterator[Dict]:
+        return paginate(fetch_page, list_field=list_field, cursor_field=cursor_field,
+                        prefetch=self.prefetch, rate_limiter=self.rate_limiter)
+
+    def iter_user_posts(self, sec_uid: str, count: int = 35) -> AsyncIterator[Dict]:
+        return self._iterate(lambda c: self.user_post_page(sec_uid, c, count), cursor_field='max_cursor')
+
+    def iter_user_likes(self, sec_uid: str, count: int = 35) -> AsyncIterator[Dict]:
+        return self._iterate(lambda c: self.user_like_page(sec_uid, c, count), cursor_field='max_cursor')
+
+    def iter_mix_awemes(self, mix_id: str, count: int = 35) -> AsyncIterator[Dict]:
+        return self._iterate(lambda c: self.mix_page(mix_id, c, count))
+
+    def iter_user_mixes(self, sec_uid: str, count: int = 35) -> AsyncIterator[Dict]:
+        return self._iterate(lambda c: self.user_mix_list_page(sec_uid, c, count), list_field='mix_infos')
+
+    def iter_music_awemes(self, music_id: str, count: int = 35) -> AsyncIterator[Dict]:
+        return self._iterate(lambda c: self.music_page(music_id, c, count))
+
+
+if __name__ == '__main__':
+    pass
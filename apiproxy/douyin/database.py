@@ -2,29 +2,345 @@
 # -*- coding: utf-8 -*-
 
 
+import logging
+import os
+import queue
 import sqlite3
-import json
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from apiproxy.common import jsonlib
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# rawdata 的存储格式由内容自身区分：文本为未压缩的 JSON，
+# 字节以 zstd 帧魔数或 zlib 头开头时为对应的压缩数据
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSIONS = (None, 'zlib', 'zstd')
+
+
+# 表结构版本，记录在 PRAGMA user_version 中
+SCHEMA_VERSION = 2
+
+# 各表以 来源 + aweme_id 组合唯一：同一作品可以被多个用户喜欢、出现在多个合集/音乐下，
+# 唯一约束同时作为查询使用的索引
+_TABLES = {
+    't_user_post': """CREATE TABLE if not exists t_user_post (
+                        id integer primary key autoincrement,
+                        sec_uid varchar(200),
+                        aweme_id integer,
+                        rawdata blob,
+                        unique (sec_uid, aweme_id)
+                    );""",
+    't_user_like': """CREATE TABLE if not exists t_user_like (
+                        id integer primary key autoincrement,
+                        sec_uid varchar(200),
+                        aweme_id integer,
+                        rawdata blob,
+                        unique (sec_uid, aweme_id)
+                    );""",
+    't_mix': """CREATE TABLE if not exists t_mix (
+                        id integer primary key autoincrement,
+                        sec_uid varchar(200),
+                        mix_id varchar(200),
+                        aweme_id integer,
+                        rawdata blob,
+                        unique (sec_uid, mix_id, aweme_id)
+                    );""",
+    't_music': """CREATE TABLE if not exists t_music (
+                        id integer primary key autoincrement,
+                        music_id varchar(200),
+                        aweme_id integer,
+                        rawdata blob,
+                        unique (music_id, aweme_id)
+                    );""",
+}
+
+# zstd 共享字典，按字典 ID 保存，压缩帧中记录所用字典的 ID
+_DICT_TABLE = """CREATE TABLE if not exists t_zstd_dict (
+                        dict_id integer primary key,
+                        data blob
+                    );"""
+
+# 需要重建的表与复制的列，重复行只保留最早的一条
+_REBUILD = [
+    ('t_user_post', 'sec_uid, aweme_id, rawdata'),
+    ('t_user_like', 'sec_uid, aweme_id, rawdata'),
+    ('t_mix', 'sec_uid, mix_id, aweme_id, rawdata'),
+    ('t_music', 'music_id, aweme_id, rawdata'),
+]
+
+# 各版本的升级：(表结构中已包含即说明无需重建的片段, 表列表)
+# 版本 0 -> 1：aweme_id 单列唯一改为组合唯一，t_mix 增加唯一约束；
+# 版本 1 -> 2：rawdata 由 json（NUMERIC 亲和性）改为 blob，压缩数据按原样保存
+_MIGRATIONS = {
+    1: ('unique (', _REBUILD),
+    2: ('rawdata blob', _REBUILD),
+}
+
+
+# 各增量类型对应的表与所有者列
+_OWNERS = {
+    'post': ('t_user_post', ('sec_uid',)),
+    'like': ('t_user_like', ('sec_uid',)),
+    'mix': ('t_mix', ('sec_uid', 'mix_id')),
+    'music': ('t_music', ('music_id',)),
+}
 
 
 class DataBase(object):
-    def __init__(self):
-        self.conn = sqlite3.connect('data.db')
+    """增量下载记录
+
+    使用 WAL 日志与 synchronous=NORMAL：写入不阻塞读取，提交时不再每次 fsync。
+    SQL 语句为固定字符串，由 sqlite3 的语句缓存复用编译结果；
+    *_many 接口一次事务写入一整页作品。
+    各表以来源 + aweme_id 组合唯一，查询走唯一索引，旧版数据库打开时原地升级。
+    rawdata 按 compression 压缩后以 BLOB 保存，读取时按内容自动识别并解压，
+    新旧格式的行可以共存；compact() 把旧行改写为当前格式并回收空间。
+    """
+
+    def __init__(self, path: str = 'data.db', compression: Optional[str] = 'zlib', level: Optional[int] = None):
+        if compression in ('none', ''):
+            compression = None
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            logger.warning("zstandard 未安装，数据库改用 zlib 压缩: pip install zstandard")
+            compression = 'zlib'
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.conn = sqlite3.connect(path, cached_statements=64)
         self.cursor = self.conn.cursor()
+        self.configure()
+        self._load_dictionaries()
+        version = self.cursor.execute("PRAGMA user_version;").fetchone()[0]
         self.create_user_post_table()
         self.create_user_like_table()
         self.create_mix_table()
         self.create_music_table()
+        if version < SCHEMA_VERSION:
+            self.migrate(version)
 
-    def create_user_post_table(self):
-        sql = """CREATE TABLE if not exists t_user_post (
-                        id integer primary key autoincrement,
-                        sec_uid varchar(200),
-                        aweme_id integer unique, 
-                        rawdata json
-                    );"""
+    def configure(self):
+        try:
+            self.cursor.execute("PRAGMA journal_mode=WAL;")
+            self.cursor.execute("PRAGMA synchronous=NORMAL;")
+            self.cursor.execute("PRAGMA temp_store=MEMORY;")
+        except Exception as e:
+            pass
+
+    def _table_sql(self, table: str) -> str:
+        row = self.cursor.execute("select sql from sqlite_master where type='table' and name=?;", (table,)).fetchone()
+        return row[0] if row else ''
+
+    def migrate(self, version: int):
+        """从 version 升级到 SCHEMA_VERSION
+
+        SQLite 不能修改已有的约束，旧表在一个事务中重建：
+        旧表改名 -> 按新结构建表 -> 复制数据（insert or ignore 去重）-> 删除旧表；
+        已是新结构的表（新建的数据库、或前一个版本的升级已重建）直接跳过。
+        """
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            marker, tables = _MIGRATIONS[target]
+            script = ["BEGIN;"]
+            for table, columns in tables:
+                if marker in self._table_sql(table).lower():
+                    continue
+                script.append(f"ALTER TABLE {table} RENAME TO {table}_old;")
+                script.append(_TABLES[table])
+                script.append(f"INSERT OR IGNORE INTO {table} ({columns}) "
+                              f"SELECT {columns} FROM {table}_old ORDER BY id;")
+                script.append(f"DROP TABLE {table}_old;")
+            script.append(f"PRAGMA user_version={target};")
+            script.append("COMMIT;")
+            self.conn.executescript("\n".join(script))
+
+    # ------------------------------------------------------------------ rawdata 编解码
+
+    def _load_dictionaries(self):
+        """加载已保存的 zstd 字典，最近训练的一个用于压缩"""
+        self._dicts: Dict[int, Any] = {}
+        self._decompressors: Dict[int, Any] = {}
+        self._dict_id = 0
+        try:
+            self.cursor.execute(_DICT_TABLE)
+            rows = self.cursor.execute("select dict_id, data from t_zstd_dict order by rowid;").fetchall()
+        except Exception as e:
+            rows = []
+        if ZSTD_AVAILABLE:
+            for dict_id, data in rows:
+                self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+                self._dict_id = dict_id
+        self._set_compressor()
+
+    def _set_compressor(self):
+        self._compressor = None
+        if self.compression == 'zstd':
+            level = self.level if self.level is not None else 3
+            dict_data = self._dicts.get(self._dict_id)
+            self._compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+
+    def encode(self, data: dict):
+        """序列化并按当前方式压缩"""
+        return self._compress(jsonlib.dumps(data))
+
+    def _compress(self, raw: bytes):
+        if self.compression == 'zstd':
+            return self._compressor.compress(raw)
+        if self.compression == 'zlib':
+            return zlib.compress(raw, self.level if self.level is not None else 6)
+        return raw.decode('utf-8')
+
+    def decode(self, value) -> Optional[str]:
+        """还原 rawdata 为 JSON 文本，自动识别未压缩 / zlib / zstd（含字典）"""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:4] == ZSTD_MAGIC:
+            return self._zstd_decompress(value).decode('utf-8')
+        if len(value) >= 2 and value[0] == 0x78 and ((value[0] << 8) | value[1]) % 31 == 0:
+            return zlib.decompress(value).decode('utf-8')
+        return value.decode('utf-8')
 
+    def _zstd_decompress(self, value: bytes) -> bytes:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("数据库中有 zstd 压缩的数据，需要安装 zstandard: pip install zstandard")
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._dicts.get(dict_id) if dict_id else None)
+            self._decompressors[dict_id] = decompressor
+        return decompressor.decompress(value)
+
+    def _is_current(self, value) -> bool:
+        """rawdata 是否已是当前的存储格式"""
+        if self.compression is None:
+            return isinstance(value, str)
+        if isinstance(value, str):
+            return False
+        value = bytes(value)
+        if self.compression == 'zlib':
+            return value[:4] != ZSTD_MAGIC and value[:1] == b'\x78'
+        return value[:4] == ZSTD_MAGIC and zstandard.get_frame_parameters(value).dict_id == self._dict_id
+
+    def _decode_row(self, row):
+        if row is None:
+            return None
+        return row[:-1] + (self.decode(row[-1]),)
+
+    # ------------------------------------------------------------------ 压缩整理
+
+    def train_dictionary(self, dict_size: int = 112640, samples: int = 2000) -> int:
+        """用库中已有的作品数据训练 zstd 共享字典，返回字典 ID（样本不足时返回 0）"""
+        if self.compression != 'zstd':
+            return 0
+        sample_data = []
+        per_table = max(1, samples // len(_TABLES))
+        for table in _TABLES:
+            rows = self.conn.execute(f"select rawdata from {table} order by random() limit ?;", (per_table,))
+            sample_data.extend(self.decode(row[0]).encode('utf-8') for row in rows if row[0] is not None)
+        try:
+            trained = zstandard.train_dictionary(dict_size, sample_data)
+        except Exception as e:
+            logger.warning(f"训练 zstd 字典失败（样本 {len(sample_data)} 条），不使用字典: {e}")
+            return 0
+        dict_id = trained.dict_id()
+        with self.conn:
+            self.conn.execute("insert or replace into t_zstd_dict (dict_id, data) values(?,?);",
+                              (dict_id, trained.as_bytes()))
+        self._dicts[dict_id] = trained
+        self._dict_id = dict_id
+        self._set_compressor()
+        return dict_id
+
+    def _file_size(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p))
+
+    def compact(self, train_dictionary: bool = False, batch: int = 500) -> Dict[str, int]:
+        """把不是当前格式的 rawdata 改写为当前格式，然后 VACUUM 回收空间
+
+        Args:
+            train_dictionary: zstd 时先用已有数据训练共享字典，所有行改用该字典压缩
+        Returns:
+            {'rows': 改写的行数, 'before': 整理前文件大小, 'after': 整理后文件大小}
+        """
+        before = self._file_size()
+        if train_dictionary:
+            self.train_dictionary()
+        rewritten = 0
+        for table in _TABLES:
+            last_id = 0
+            while True:
+                rows = self.conn.execute(f"select id, rawdata from {table} where id > ? order by id limit ?;",
+                                         (last_id, batch)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates = [(self._compress(self.decode(raw).encode('utf-8')), row_id)
+                           for row_id, raw in rows if raw is not None and not self._is_current(raw)]
+                if updates:
+                    with self.conn:
+                        self.conn.executemany(f"update {table} set rawdata=? where id=?;", updates)
+                    rewritten += len(updates)
+        # 所有行都已是当前格式，当前字典以外的字典不再需要
+        keep = self._dict_id if self.compression == 'zstd' else 0
+        with self.conn:
+            self.conn.execute("delete from t_zstd_dict where dict_id != ?;", (keep,))
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        self.conn.execute("VACUUM;")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        return {'rows': rewritten, 'before': before, 'after': self._file_size()}
+
+    def close(self):
         try:
-            self.cursor.execute(sql)
+            self.conn.commit()
+            self.conn.close()
+        except Exception as e:
+            pass
+
+    def _insert_many(self, sql: str, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """一个事务写入多行，返回写入的行数"""
+        try:
+            with self.conn:
+                return self.conn.executemany(sql, rows).rowcount
+        except Exception as e:
+            return 0
+
+    def _owner_where(self, context: str) -> Tuple[str, str]:
+        table, columns = _OWNERS[context]
+        where = " and ".join(f"{c}=?" for c in columns)
+        return table, f"{where} and typeof(aweme_id)='integer'"
+
+    def count_aweme_ids(self, context: str, *owner: str) -> int:
+        """某个所有者已记录的作品数，context 为 post/like/mix/music"""
+        table, where = self._owner_where(context)
+        try:
+            return self.cursor.execute(f"select count(*) from {table} where {where};", owner).fetchone()[0]
+        except Exception as e:
+            return 0
+
+    def get_aweme_ids(self, context: str, *owner: str) -> List[int]:
+        """某个所有者已记录的全部 aweme_id（升序，按唯一索引顺序读取）"""
+        table, where = self._owner_where(context)
+        try:
+            rows = self.conn.execute(f"select aweme_id from {table} where {where} order by aweme_id;", owner)
+            return [row[0] for row in rows]
+        except Exception as e:
+            return []
+
+    def create_user_post_table(self):
+        try:
+            self.cursor.execute(_TABLES['t_user_post'])
             self.conn.commit()
         except Exception as e:
             pass
@@ -34,31 +350,28 @@ class DataBase(object):
 
         try:
             self.cursor.execute(sql, (sec_uid, aweme_id))
-            self.conn.commit()
             res = self.cursor.fetchone()
-            return res
+            return self._decode_row(res)
         except Exception as e:
             pass
 
     def insert_user_post(self, sec_uid: str, aweme_id: int, data: dict):
-        insertsql = """insert into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        insertsql = """insert or ignore into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
+            self.cursor.execute(insertsql, (sec_uid, aweme_id, self.encode(data)))
             self.conn.commit()
         except Exception as e:
             pass
 
-    def create_user_like_table(self):
-        sql = """CREATE TABLE if not exists t_user_like (
-                        id integer primary key autoincrement,
-                        sec_uid varchar(200),
-                        aweme_id integer unique,
-                        rawdata json
-                    );"""
+    def insert_user_posts_many(self, sec_uid: str, items: Iterable[Tuple[int, dict]]) -> int:
+        """批量写入用户作品，items 为 (aweme_id, data)，已存在的忽略"""
+        insertsql = """insert or ignore into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        return self._insert_many(insertsql, ((sec_uid, aweme_id, self.encode(data)) for aweme_id, data in items))
 
+    def create_user_like_table(self):
         try:
-            self.cursor.execute(sql)
+            self.cursor.execute(_TABLES['t_user_like'])
             self.conn.commit()
         except Exception as e:
             pass
@@ -68,32 +381,28 @@ class DataBase(object):
 
         try:
             self.cursor.execute(sql, (sec_uid, aweme_id))
-            self.conn.commit()
             res = self.cursor.fetchone()
-            return res
+            return self._decode_row(res)
         except Exception as e:
             pass
 
     def insert_user_like(self, sec_uid: str, aweme_id: int, data: dict):
-        insertsql = """insert into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        insertsql = """insert or ignore into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
+            self.cursor.execute(insertsql, (sec_uid, aweme_id, self.encode(data)))
             self.conn.commit()
         except Exception as e:
             pass
 
-    def create_mix_table(self):
-        sql = """CREATE TABLE if not exists t_mix (
-                        id integer primary key autoincrement,
-                        sec_uid varchar(200),
-                        mix_id varchar(200),
-                        aweme_id integer,
-                        rawdata json
-                    );"""
+    def insert_user_likes_many(self, sec_uid: str, items: Iterable[Tuple[int, dict]]) -> int:
+        """批量写入用户喜欢，items 为 (aweme_id, data)，已存在的忽略"""
+        insertsql = """insert or ignore into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        return self._insert_many(insertsql, ((sec_uid, aweme_id, self.encode(data)) for aweme_id, data in items))
 
+    def create_mix_table(self):
         try:
-            self.cursor.execute(sql)
+            self.cursor.execute(_TABLES['t_mix'])
             self.conn.commit()
         except Exception as e:
             pass
@@ -103,31 +412,28 @@ class DataBase(object):
 
         try:
             self.cursor.execute(sql, (sec_uid, mix_id, aweme_id))
-            self.conn.commit()
             res = self.cursor.fetchone()
-            return res
+            return self._decode_row(res)
         except Exception as e:
             pass
 
     def insert_mix(self, sec_uid: str, mix_id: str, aweme_id: int, data: dict):
-        insertsql = """insert into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);"""
+        insertsql = """insert or ignore into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, mix_id, aweme_id, json.dumps(data)))
+            self.cursor.execute(insertsql, (sec_uid, mix_id, aweme_id, self.encode(data)))
             self.conn.commit()
         except Exception as e:
             pass
 
-    def create_music_table(self):
-        sql = """CREATE TABLE if not exists t_music (
-                        id integer primary key autoincrement,
-                        music_id varchar(200),
-                        aweme_id integer unique,
-                        rawdata json
-                    );"""
+    def insert_mix_many(self, sec_uid: str, mix_id: str, items: Iterable[Tuple[int, dict]]) -> int:
+        """批量写入合集作品，items 为 (aweme_id, data)，已存在的忽略"""
+        insertsql = """insert or ignore into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);"""
+        return self._insert_many(insertsql, ((sec_uid, mix_id, aweme_id, self.encode(data)) for aweme_id, data in items))
 
+    def create_music_table(self):
         try:
-            self.cursor.execute(sql)
+            self.cursor.execute(_TABLES['t_music'])
             self.conn.commit()
         except Exception as e:
             pass
@@ -137,21 +443,204 @@ class DataBase(object):
 
         try:
             self.cursor.execute(sql, (music_id, aweme_id))
-            self.conn.commit()
             res = self.cursor.fetchone()
-            return res
+            return self._decode_row(res)
         except Exception as e:
             pass
 
     def insert_music(self, music_id: str, aweme_id: int, data: dict):
-        insertsql = """insert into t_music (music_id, aweme_id, rawdata) values(?,?,?);"""
+        insertsql = """insert or ignore into t_music (music_id, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (music_id, aweme_id, json.dumps(data)))
+            self.cursor.execute(insertsql, (music_id, aweme_id, self.encode(data)))
             self.conn.commit()
         except Exception as e:
             pass
 
+    def insert_music_many(self, music_id: str, items: Iterable[Tuple[int, dict]]) -> int:
+        """批量写入音乐作品，items 为 (aweme_id, data)，已存在的忽略"""
+        insertsql = """insert or ignore into t_music (music_id, aweme_id, rawdata) values(?,?,?);"""
+        return self._insert_many(insertsql, ((music_id, aweme_id, self.encode(data)) for aweme_id, data in items))
+
+    def insert_many(self, context: str, owner: Tuple[str, ...], items: Iterable[Tuple[int, dict]]) -> int:
+        """按增量类型批量写入，owner 依次为 sec_uid / sec_uid, mix_id / music_id"""
+        if context == 'post':
+            return self.insert_user_posts_many(owner[0], items)
+        if context == 'like':
+            return self.insert_user_likes_many(owner[0], items)
+        if context == 'mix':
+            return self.insert_mix_many(owner[0], owner[1], items)
+        if context == 'music':
+            return self.insert_music_many(owner[0], items)
+        raise ValueError(f"未知的增量类型: {context}")
+
+
+class DataBaseWriter:
+    """后台写入线程
+
+    调用方把记录放入有界队列：put_nowait() 队列满时抛出 queue.Full，
+    由调用方决定如何等待；put() 阻塞等待空位，形成背压。
+    写入线程使用自己的连接，每 batch_size 条或距上次写入超过 flush_interval 秒时
+    按 (类型, 所有者) 分组一次事务写入。close() 写完队列中所有记录后才返回。
+    写入线程异常退出（如无法打开数据库）时 error 记录原因，之后的 put 抛出
+    RuntimeError，等待中的 flush() / close() 随即返回而不会一直阻塞。
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+    # 阻塞等待时检查写入线程是否仍在运行的间隔（秒）
+    _POLL = 0.5
+
+    def __init__(self, path: str = 'data.db', compression: Optional[str] = 'zlib', batch_size: int = 100,
+                 flush_interval: float = 0.5, max_queue: int = 10000):
+        self.path = path
+        self.compression = compression
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.error: Optional[BaseException] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = threading.Thread(target=self._run, name='DataBaseWriter', daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _check(self) -> None:
+        if self._closed or not self.alive:
+            raise RuntimeError(f"DataBaseWriter 已关闭: {self.error}" if self.error else "DataBaseWriter 已关闭")
+
+    def _put(self, item) -> None:
+        """阻塞放入队列；写入线程退出后不再等待"""
+        while True:
+            try:
+                self._queue.put(item, timeout=self._POLL)
+                return
+            except queue.Full:
+                if not self.alive:
+                    raise RuntimeError("DataBaseWriter 写入线程已退出")
+
+    def put(self, context: str, owner: Tuple[str, ...], aweme_id: int, data: dict) -> None:
+        """排队写入一条记录，context 为 post/like/mix/music；队列满时等待空位"""
+        self._check()
+        self._put((context, tuple(owner), aweme_id, data))
+
+    def put_nowait(self, context: str, owner: Tuple[str, ...], aweme_id: int, data: dict) -> None:
+        """排队写入一条记录，队列满时抛出 queue.Full"""
+        self._check()
+        self._queue.put_nowait((context, tuple(owner), aweme_id, data))
+
+    def _wait(self, done: threading.Event) -> None:
+        while not done.wait(self._POLL):
+            if not self.alive:
+                return
+
+    def flush(self) -> None:
+        """等待此前排队的记录全部写入"""
+        if self._closed or not self.alive:
+            return
+        done = threading.Event()
+        try:
+            self._put((self._FLUSH, done))
+        except RuntimeError:
+            return
+        self._wait(done)
+
+    def close(self) -> None:
+        """写完所有排队的记录并结束写入线程"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._put((self._STOP, None))
+        except RuntimeError:
+            pass
+        self._thread.join()
+
+    def _write(self, db: DataBase, pending: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[int, dict]]]) -> None:
+        for (context, owner), items in pending.items():
+            try:
+                self.written += db.insert_many(context, owner, items)
+            except Exception as e:
+                logger.warning(f"写入增量记录失败 {context} {owner}: {e}")
+        pending.clear()
+
+    def _release_waiters(self) -> None:
+        """线程退出时唤醒队列中仍在等待的 flush()"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item[0] is self._FLUSH:
+                item[1].set()
+
+    def _run(self) -> None:
+        db = None
+        pending: Dict[Tuple[str, Tuple[str, ...]], List[Tuple[int, dict]]] = {}
+        count = 0
+        deadline = None
+        try:
+            db = DataBase(self.path, self.compression)
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item[0] is not self._FLUSH and item[0] is not self._STOP:
+                    context, owner, aweme_id, data = item
+                    pending.setdefault((context, owner), []).append((aweme_id, data))
+                    count += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    if count < self.batch_size and time.monotonic() < deadline:
+                        continue
+
+                # 达到条数、超时、收到 flush / 停止请求时写入
+                self._write(db, pending)
+                count = 0
+                deadline = None
+                if item is not None and item[0] is self._FLUSH:
+                    item[1].set()
+                elif item is not None and item[0] is self._STOP:
+                    break
+        except Exception as e:
+            self.error = e
+            logger.error(f"增量记录写入线程异常退出: {e}")
+        finally:
+            if db is not None:
+                self._write(db, pending)
+                db.close()
+            self._release_waiters()
+
 
 if __name__ == '__main__':
-    pass
+    import tempfile
+
+    # 对比：原实现（回滚日志、synchronous=FULL、每行提交）与 WAL + 每页批量提交
+    n, page = 3000, 35
+    sample = {'aweme_id': '0', 'desc': '测试作品', 'statistics': {'digg_count': 1}, 'url_list': ['https://p3.x/a.jpeg'] * 3}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DataBase(os.path.join(tmp, 'before.db'))
+        db.cursor.execute("PRAGMA journal_mode=DELETE;")
+        db.cursor.execute("PRAGMA synchronous=FULL;")
+        start = time.perf_counter()
+        for i in range(n):
+            if not db.get_user_post('sec', i):
+                db.insert_user_post('sec', i, sample)
+        before = n / (time.perf_counter() - start)
+        db.close()
+
+        db = DataBase(os.path.join(tmp, 'after.db'))
+        start = time.perf_counter()
+        for first in range(0, n, page):
+            ids = range(first, min(first + page, n))
+            db.insert_user_posts_many('sec', [(i, sample) for i in ids if not db.get_user_post('sec', i)])
+        after = n / (time.perf_counter() - start)
+        db.close()
+
+    print(f"每行提交: {before:.0f} 条/秒  WAL + 每页提交: {after:.0f} 条/秒  ({after / before:.1f}x)")
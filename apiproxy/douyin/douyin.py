@@ -6,18 +6,24 @@ import re
 import requests
 import json
 import time
-import copy
 # from tenacity import retry, stop_after_attempt, wait_exponential
-from typing import Tuple, Optional
+from typing import Callable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
 from requests.exceptions import RequestException
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
 from rich.console import Console
 
 from apiproxy.douyin import douyin_headers
 from apiproxy.douyin.urls import Urls
-from apiproxy.douyin.result import Result
+from apiproxy.douyin.result import Result, AwemeConverter
+from apiproxy.douyin.model import Aweme
 from apiproxy.douyin.database import DataBase
-from apiproxy.common import utils
+from apiproxy.douyin.seen import SeenIndex
+from apiproxy.douyin.paginator import build_params, sign_url
+from apiproxy.douyin.resolver import ShortLinkResolver
+from apiproxy.douyin.client import DouyinAsyncClient
+from apiproxy.common import utils, jsonlib
+from apiproxy.common.session import create_session
 import sys
 import os
 # 添加项目根目录到系统路径，确保可以正确导入utils模块
@@ -29,16 +35,51 @@ console = Console()
 
 class Douyin(object):
 
-    def __init__(self, database=False):
+    def __init__(self, database=False, database_path: str = 'data.db', database_compression: Optional[str] = 'zlib',
+                 resolver: Optional[ShortLinkResolver] = None,
+                 client: Optional[DouyinAsyncClient] = None, session: Optional[requests.Session] = None,
+                 compact_model: bool = False, keep_json: bool = False):
         self.urls = Urls()
+        # 连接池会话，未使用异步客户端时所有接口请求复用其 keep-alive 连接
+        self.session = session if session is not None else create_session()
+        # 可选的异步客户端：设置后接口请求经由其连接池发出
+        self.client = client
+        # 分享链接解析（只跟随重定向，结果缓存到磁盘）
+        self.resolver = resolver if resolver is not None else ShortLinkResolver()
         self.result = Result()
+        # 作品数据转换器；与 self.result 一样每个实例一份，图片字段按转换顺序跨作品保留
+        self.converter = AwemeConverter()
+        # 列表接口返回紧凑的 Aweme 对象而不是模板字典，大账号枚举时显著节省内存
+        self.compact_model = compact_model
+        # 紧凑模式下是否附带压缩的完整转换结果，只在要输出 JSON 时打开
+        self.keep_json = keep_json
         self.database = database
         if database:
-            self.db = DataBase()
+            self.db = DataBase(database_path, database_compression)
+            # 增量判断使用内存映射的已下载索引，不再逐个查询数据库
+            self.seen = SeenIndex(self.db)
         # 用于设置重复请求某个接口的最大时间
         self.timeout = 10
         self.console = Console()  # 也可以在实例中创建console
 
+    def _mark_seen(self, rows, context: str, *owner: str):
+        """新写入数据库的作品同时加入已下载索引"""
+        seen = self.seen.get(context, *owner)
+        for aweme_id, _ in rows:
+            seen.add(aweme_id)
+
+    def close(self):
+        """保存已下载索引并关闭数据库"""
+        if self.database:
+            self.seen.close()
+            self.db.close()
+
+    def _get(self, url: str, timeout: Optional[float] = None):
+        """请求接口，返回带 status_code / text 的响应"""
+        if self.client is not None:
+            return self.client.get_sync(url)
+        return self.session.get(url=url, headers=douyin_headers, timeout=timeout)
+
     # 从分享链接中提取网址
     def getShareLink(self, string):
         # findall() 查找匹配正则表达式的字符串
@@ -57,7 +98,7 @@ class Douyin(object):
         key_type = None
 
         try:
-            r = requests.get(url=url, headers=douyin_headers)
+            final_url = self.resolver.resolve(url, headers=douyin_headers, session=self.session)
         except Exception as e:
             print('[  错误  ]:输入链接有误！\r')
             return key_type, key
@@ -69,15 +110,16 @@ class Douyin(object):
         # https://www.iesdouyin.com/share/user/MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek?did=MS4wLjABAAAA1DICF9-A9M_CiGqAJZdsnig5TInVeIyPdc2QQdGrq58xUgD2w6BqCHovtqdIDs2i&iid=MS4wLjABAAAAomGWi4n2T0H9Ab9x96cUZoJXaILk4qXOJlJMZFiK6b_aJbuHkjN_f0mBzfy91DX1&with_sec_did=1&sec_uid=MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek&from_ssr=1&u_code=j8a5173b&timestamp=1674540164&ecom_share_track_params=%7B%22is_ec_shopping%22%3A%221%22%2C%22secuid%22%3A%22MS4wLjABAAAA-jD2lukp--I21BF8VQsmYUqJDbj3FmU-kGQTHl2y1Cw%22%2C%22enter_from%22%3A%22others_homepage%22%2C%22share_previous_page%22%3A%22others_homepage%22%7D&utm_source=copy&utm_campaign=client_share&utm_medium=android&app=aweme
         # 合集
         # https://www.douyin.com/collection/7093490319085307918
-        urlstr = str(r.request.path_url)
+        parsed = urlparse(final_url)
+        urlstr = parsed.path + ('?' + parsed.query if parsed.query else '')
 
         if "/user/" in urlstr:
             # 获取用户 sec_uid
-            if '?' in r.request.path_url:
-                for one in re.finditer(r'user\/([\d\D]*)([?])', str(r.request.path_url)):
+            if '?' in urlstr:
+                for one in re.finditer(r'user\/([\d\D]*)([?])', urlstr):
                     key = one.group(1)
             else:
-                for one in re.finditer(r'user\/([\d\D]*)', str(r.request.path_url)):
+                for one in re.finditer(r'user\/([\d\D]*)', urlstr):
                     key = one.group(1)
             key_type = "user"
         elif "/video/" in urlstr:
@@ -104,12 +146,12 @@ class Douyin(object):
             key1 = re.findall('reflow/(\d+)?', urlstr)[0]
             url = self.urls.LIVE2 + utils.getXbogus(
                 f'live_id=1&room_id={key1}&app_id=1128')
-            res = requests.get(url, headers=douyin_headers)
-            resjson = json.loads(res.text)
+            res = self._get(url)
+            resjson = jsonlib.loads(res.content)
             key = resjson['data']['room']['owner']['web_rid']
             key_type = "live"
-        elif "live.douyin.com" in r.url:
-            key = r.url.replace('https://live.douyin.com/', '')
+        elif "live.douyin.com" in final_url:
+            key = final_url.replace('https://live.douyin.com/', '')
             key_type = "live"
 
         if key is None or key_type is None:
@@ -165,17 +207,17 @@ class Douyin(object):
                     # 单作品接口返回 'aweme_detail'
                     # 主页作品接口返回 'aweme_list'->['aweme_detail']
                     # 更新API参数以适应最新接口要求
-                    detail_params = f'aweme_id={aweme_id}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50&update_version_code=170400'
-                    jx_url = self.urls.POST_DETAIL + utils.getXbogus(detail_params)
+                    detail_params = build_params(aweme_id=aweme_id) + '&update_version_code=170400'
+                    jx_url = sign_url(self.urls.POST_DETAIL, detail_params)
 
-                    response = requests.get(url=jx_url, headers=douyin_headers, timeout=10)
+                    response = self._get(jx_url, timeout=10)
 
                     # 检查响应是否为空
                     if len(response.text) == 0:
                         logger.warning("单个视频接口返回空响应")
                         return {}
 
-                    datadict = json.loads(response.text)
+                    datadict = jsonlib.loads(response.content)
 
                     # 添加调试信息
                     logger.info(f"单个视频API响应状态: {datadict.get('status_code') if datadict else 'None'}")
@@ -195,9 +237,6 @@ class Douyin(object):
                         logger.warning(f"重复请求该接口{self.timeout}s, 仍然未获取到数据")
                         return {}
 
-            # 清空self.awemeDict
-            self.result.clearDict(self.result.awemeDict)
-
             # 默认为视频
             awemeType = 0
             try:
@@ -208,9 +247,7 @@ class Douyin(object):
                 logger.warning("接口中未找到 images")
 
             # 转换成我们自己的格式
-            self.result.dataConvert(awemeType, self.result.awemeDict, datadict['aweme_detail'])
-
-            return self.result.awemeDict
+            return self.converter.convert(datadict['aweme_detail'], awemeType)
 
         except Exception as e:
             logger.warning(f"单个视频接口异常: {str(e)}")
@@ -231,6 +268,13 @@ class Douyin(object):
         logger.warning("备用方案暂未实现")
         return {}
 
+    @staticmethod
+    def _time_range(start_time: str, end_time: str) -> Tuple[str, str]:
+        """补全时间范围，end_time 为 now 时取今天"""
+        if end_time == "now":
+            end_time = time.strftime("%Y-%m-%d")
+        return start_time or "1970-01-01", end_time or "2099-12-31"
+
     # 传入 url 支持 https://www.iesdouyin.com 与 https://v.douyin.com
     # mode : post | like 模式选择 like为用户点赞 post为用户发布
     def getUserInfo(self, sec_uid, mode="post", count=35, number=0, increase=False, start_time="", end_time=""):
@@ -246,23 +290,10 @@ class Douyin(object):
         """
         if sec_uid is None:
             return None
+        if mode not in ("post", "like"):
+            self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
+            return None
 
-        # 处理时间范围
-        if end_time == "now":
-            end_time = time.strftime("%Y-%m-%d")
-        
-        if not start_time:
-            start_time = "1970-01-01"
-        if not end_time:
-            end_time = "2099-12-31"
-
-        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
-        
-        max_cursor = 0
-        awemeList = []
-        total_fetched = 0
-        filtered_count = 0
-        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -276,134 +307,164 @@ class Douyin(object):
                 f"[cyan]📥 正在获取{mode}作品列表...", 
                 total=None  # 总数未知，使用无限进度条
             )
-            
-            while True:
-                try:
-                    # 构建请求URL - 添加更多必需参数
-                    base_params = f'sec_user_id={sec_uid}&count={count}&max_cursor={max_cursor}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
+            return list(self.iterUserInfo(
+                sec_uid, mode, count, number, increase, start_time, end_time,
+                on_page=lambda total: progress.update(fetch_task, description=f"[cyan]📥 已获取: {total}个作品")
+            ))
 
-                    if mode == "post":
-                        url = self.urls.USER_POST + utils.getXbogus(base_params)
-                    elif mode == "like":
-                        # 尝试备用like接口
-                        try:
-                            url = self.urls.USER_FAVORITE_A + utils.getXbogus(base_params)
-                        except:
-                            # 如果主接口失败，尝试备用接口
-                            url = self.urls.USER_FAVORITE_B + utils.getXbogus(base_params)
-                    else:
-                        self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
-                        return None
+    def iterUserInfo(self, sec_uid, mode="post", count=35, number=0, increase=False, start_time="", end_time="",
+                     on_page: Optional[Callable[[int], None]] = None) -> Iterator:
+        """逐页获取用户作品的生成器，参数同 getUserInfo
 
-                    # 发送请求
-                    res = requests.get(url=url, headers=douyin_headers, timeout=10)
+        每取回一页就产出该页中通过时间过滤、数量限制和增量检查的作品，
+        调用方可以边获取边下载。on_page 在每页返回后以已获取总数调用。
+        """
+        if sec_uid is None:
+            return
+        if mode not in ("post", "like"):
+            self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
+            return
 
-                    # 检查HTTP状态码
-                    if res.status_code != 200:
-                        self.console.print(f"[red]❌ HTTP请求失败: {res.status_code}[/]")
-                        break
+        start_time, end_time = self._time_range(start_time, end_time)
+        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
+        
+        max_cursor = 0
+        yielded = 0
+        total_fetched = 0
+        filtered_count = 0
+
+        while True:
+            try:
+                # 构建请求URL - 添加更多必需参数
+                base_params = build_params(sec_user_id=sec_uid, count=count, max_cursor=max_cursor)
 
+                if mode == "post":
+                    url = sign_url(self.urls.USER_POST, base_params)
+                else:
+                    # 尝试备用like接口
                     try:
-                        datadict = json.loads(res.text)
-                    except json.JSONDecodeError as e:
-                        self.console.print(f"[red]❌ JSON解析失败: {str(e)}[/]")
-                        self.console.print(f"[yellow]🔍 响应内容: {res.text[:500]}...[/]")
-                        self.console.print(f"[yellow]🔍 请求URL: {url}[/]")
-                        self.console.print(f"[yellow]🔍 模式: {mode}[/]")
-
-                        # 检查是否是空响应或权限问题
-                        if not res.text.strip():
-                            self.console.print(f"[yellow]💡 提示: {mode}模式可能需要特殊权限或该用户的{mode}列表不公开[/]")
-                        elif "登录" in res.text or "login" in res.text.lower():
-                            self.console.print(f"[yellow]💡 提示: {mode}模式需要登录状态[/]")
-                        elif "权限" in res.text or "permission" in res.text.lower():
-                            self.console.print(f"[yellow]💡 提示: {mode}模式权限不足[/]")
-                        break
-                    
-                    # 处理返回数据
-                    if not datadict or datadict.get("status_code") != 0:
-                        self.console.print(f"[red]❌ API请求失败: {datadict.get('status_msg', '未知错误')}[/]")
-                        # 打印详细的响应信息用于调试
-                        self.console.print(f"[yellow]🔍 响应状态码: {datadict.get('status_code') if datadict else 'None'}[/]")
-                        self.console.print(f"[yellow]🔍 响应内容: {str(datadict)[:200]}...[/]")
-                        break
+                        url = sign_url(self.urls.USER_FAVORITE_A, base_params)
+                    except:
+                        # 如果主接口失败，尝试备用接口
+                        url = sign_url(self.urls.USER_FAVORITE_B, base_params)
 
-                    # 检查aweme_list字段是否存在
-                    if "aweme_list" not in datadict:
-                        self.console.print(f"[red]❌ 响应中缺少aweme_list字段[/]")
-                        self.console.print(f"[yellow]🔍 可用字段: {list(datadict.keys())}[/]")
-                        break
+                # 发送请求
+                res = self._get(url, timeout=10)
 
-                    current_count = len(datadict["aweme_list"])
-                    total_fetched += current_count
-                    
-                    # 更新进度显示
-                    progress.update(
-                        fetch_task, 
-                        description=f"[cyan]📥 已获取: {total_fetched}个作品"
-                    )
+                # 检查HTTP状态码
+                if res.status_code != 200:
+                    self.console.print(f"[red]❌ HTTP请求失败: {res.status_code}[/]")
+                    break
 
-                    # 在处理作品时添加时间过滤
-                    for aweme in datadict["aweme_list"]:
-                        create_time = time.strftime(
-                            "%Y-%m-%d", 
-                            time.localtime(int(aweme.get("create_time", 0)))
-                        )
-                        
-                        # 时间过滤
-                        if not (start_time <= create_time <= end_time):
-                            filtered_count += 1
-                            continue
-
-                        # 数量限制检查
-                        if number > 0 and len(awemeList) >= number:
-                            self.console.print(f"[green]✅ 已达到限制数量: {number}[/]")
-                            return awemeList
-                            
-                        # 增量更新检查
-                        if self.database:
-                            if mode == "post":
-                                if self.db.get_user_post(sec_uid=sec_uid, aweme_id=aweme['aweme_id']):
-                                    if increase and aweme['is_top'] == 0:
-                                        self.console.print("[green]✅ 增量更新完成[/]")
-                                        return awemeList
-                                else:
-                                    self.db.insert_user_post(sec_uid=sec_uid, aweme_id=aweme['aweme_id'], data=aweme)
-                            elif mode == "like":
-                                if self.db.get_user_like(sec_uid=sec_uid, aweme_id=aweme['aweme_id']):
-                                    if increase and aweme['is_top'] == 0:
-                                        self.console.print("[green]✅ 增量更新完成[/]")
-                                        return awemeList
-                            else:
-                                self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
-                                return None
+                try:
+                    datadict = jsonlib.loads(res.content)
+                except json.JSONDecodeError as e:
+                    self.console.print(f"[red]❌ JSON解析失败: {str(e)}[/]")
+                    self.console.print(f"[yellow]🔍 响应内容: {res.text[:500]}...[/]")
+                    self.console.print(f"[yellow]🔍 请求URL: {url}[/]")
+                    self.console.print(f"[yellow]🔍 模式: {mode}[/]")
+
+                    # 检查是否是空响应或权限问题
+                    if not res.text.strip():
+                        self.console.print(f"[yellow]💡 提示: {mode}模式可能需要特殊权限或该用户的{mode}列表不公开[/]")
+                    elif "登录" in res.text or "login" in res.text.lower():
+                        self.console.print(f"[yellow]💡 提示: {mode}模式需要登录状态[/]")
+                    elif "权限" in res.text or "permission" in res.text.lower():
+                        self.console.print(f"[yellow]💡 提示: {mode}模式权限不足[/]")
+                    break
+                
+                # 处理返回数据
+                if not datadict or datadict.get("status_code") != 0:
+                    self.console.print(f"[red]❌ API请求失败: {datadict.get('status_msg', '未知错误')}[/]")
+                    # 打印详细的响应信息用于调试
+                    self.console.print(f"[yellow]🔍 响应状态码: {datadict.get('status_code') if datadict else 'None'}[/]")
+                    self.console.print(f"[yellow]🔍 响应内容: {str(datadict)[:200]}...[/]")
+                    break
+
+                # 检查aweme_list字段是否存在
+                if "aweme_list" not in datadict:
+                    self.console.print(f"[red]❌ 响应中缺少aweme_list字段[/]")
+                    self.console.print(f"[yellow]🔍 可用字段: {list(datadict.keys())}[/]")
+                    break
 
-                        # 转换数据格式
-                        aweme_data = self._convert_aweme_data(aweme)
-                        if aweme_data:
-                            awemeList.append(aweme_data)
+                total_fetched += len(datadict["aweme_list"])
+                if on_page is not None:
+                    on_page(total_fetched)
+
+                # 先处理整页（时间过滤、数量限制、增量检查），新作品一次事务入库，再逐个产出
+                page_awemes = []
+                new_rows = []
+                finished = False
+                for aweme in datadict["aweme_list"]:
+                    create_time = time.strftime(
+                        "%Y-%m-%d",
+                        time.localtime(int(aweme.get("create_time", 0)))
+                    )
 
-                    # 检查是否还有更多数据
-                    if not datadict["has_more"]:
-                        self.console.print(f"[green]✅ 已获取全部作品: {total_fetched}个[/]")
+                    # 时间过滤
+                    if not (start_time <= create_time <= end_time):
+                        filtered_count += 1
+                        continue
+
+                    # 数量限制检查
+                    if number > 0 and yielded + len(page_awemes) >= number:
+                        self.console.print(f"[green]✅ 已达到限制数量: {number}[/]")
+                        finished = True
                         break
-                    
-                    # 更新游标
-                    max_cursor = datadict["max_cursor"]
-                    
-                except Exception as e:
-                    self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+
+                    # 增量更新检查
+                    if self.database:
+                        if mode == "post":
+                            if aweme['aweme_id'] in self.seen.get('post', sec_uid):
+                                if increase and aweme['is_top'] == 0:
+                                    self.console.print("[green]✅ 增量更新完成[/]")
+                                    finished = True
+                                    break
+                            else:
+                                new_rows.append((aweme['aweme_id'], aweme))
+                        else:
+                            if aweme['aweme_id'] in self.seen.get('like', sec_uid):
+                                if increase and aweme['is_top'] == 0:
+                                    self.console.print("[green]✅ 增量更新完成[/]")
+                                    finished = True
+                                    break
+
+                    # 转换数据格式
+                    aweme_data = self._convert_aweme_data(aweme)
+                    if aweme_data:
+                        page_awemes.append(aweme_data)
+
+                if new_rows:
+                    self.db.insert_user_posts_many(sec_uid, new_rows)
+                    self._mark_seen(new_rows, 'post', sec_uid)
+                for aweme_data in page_awemes:
+                    yielded += 1
+                    yield aweme_data
+                if finished:
+                    return
+
+                # 检查是否还有更多数据
+                if not datadict.get("has_more"):
+                    self.console.print(f"[green]✅ 已获取全部作品: {total_fetched}个[/]")
                     break
+            
+                # 更新游标
+                max_cursor = datadict.get("max_cursor", 0)
 
-        return awemeList
+            except Exception as e:
+                self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+                break
+
+        if filtered_count > 0:
+            self.console.print(f"[yellow]⚠️  已过滤 {filtered_count} 个不在时间范围内的作品[/]")
 
     def _convert_aweme_data(self, aweme):
         """转换作品数据格式"""
         try:
-            self.result.clearDict(self.result.awemeDict)
             aweme_type = 1 if aweme.get("images") else 0
-            self.result.dataConvert(aweme_type, self.result.awemeDict, aweme)
-            return copy.deepcopy(self.result.awemeDict)
+            if self.compact_model:
+                return Aweme.from_raw(aweme, aweme_type, self.keep_json, self.converter)
+            return self.converter.convert(aweme, aweme_type)
         except Exception as e:
             logger.error(f"数据转换错误: {str(e)}")
             return None
@@ -418,8 +479,8 @@ class Douyin(object):
                 live_params = f'aid=6383&device_platform=web&web_rid={web_rid}&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
                 live_api = self.urls.LIVE + utils.getXbogus(live_params)
 
-                response = requests.get(live_api, headers=douyin_headers)
-                live_json = json.loads(response.text)
+                response = self._get(live_api)
+                live_json = jsonlib.loads(response.content)
                 if live_json != {} and live_json['status_code'] == 0:
                     break
             except Exception as e:
@@ -499,22 +560,6 @@ class Douyin(object):
         if mix_id is None:
             return None
 
-        # 处理时间范围
-        if end_time == "now":
-            end_time = time.strftime("%Y-%m-%d")
-        
-        if not start_time:
-            start_time = "1970-01-01"
-        if not end_time:
-            end_time = "2099-12-31"
-
-        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
-
-        cursor = 0
-        awemeList = []
-        total_fetched = 0
-        filtered_count = 0
-
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -528,89 +573,122 @@ class Douyin(object):
                 "[cyan]📥 正在获取合集作品...",
                 total=None
             )
+            return list(self.iterMixInfo(
+                mix_id, count, number, increase, sec_uid, start_time, end_time,
+                on_page=lambda total: progress.update(fetch_task, description=f"[cyan]📥 已获取: {total}个作品")
+            ))
+
+    def iterMixInfo(self, mix_id, count=35, number=0, increase=False, sec_uid="", start_time="", end_time="",
+                    on_page: Optional[Callable[[int], None]] = None) -> Iterator:
+        """逐页获取合集作品的生成器，参数同 getMixInfo，用法见 iterUserInfo"""
+        if mix_id is None:
+            return
 
-            while True:  # 外层循环
-                try:
-                    mix_params = f'mix_id={mix_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
-                    url = self.urls.USER_MIX + utils.getXbogus(mix_params)
-
-                    res = requests.get(url=url, headers=douyin_headers, timeout=10)
+        start_time, end_time = self._time_range(start_time, end_time)
+        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
 
-                    # 检查HTTP状态码
-                    if res.status_code != 200:
-                        self.console.print(f"[red]❌ 合集HTTP请求失败: {res.status_code}[/]")
-                        break
+        cursor = 0
+        yielded = 0
+        total_fetched = 0
+        filtered_count = 0
 
-                    try:
-                        datadict = json.loads(res.text)
-                    except json.JSONDecodeError as e:
-                        self.console.print(f"[red]❌ 合集JSON解析失败: {str(e)}[/]")
-                        self.console.print(f"[yellow]🔍 响应内容: {res.text[:500]}...[/]")
-                        break
+        while True:  # 外层循环
+            try:
+                mix_params = build_params(mix_id=mix_id, cursor=cursor, count=count)
+                url = sign_url(self.urls.USER_MIX, mix_params)
 
-                    if not datadict:
-                        self.console.print("[red]❌ 获取合集数据失败[/]")
-                        break
+                res = self._get(url, timeout=10)
 
-                    if datadict.get("status_code") != 0:
-                        self.console.print(f"[red]❌ 合集API请求失败: {datadict.get('status_msg', '未知错误')}[/]")
-                        break
+                # 检查HTTP状态码
+                if res.status_code != 200:
+                    self.console.print(f"[red]❌ 合集HTTP请求失败: {res.status_code}[/]")
+                    break
 
-                    if "aweme_list" not in datadict:
-                        self.console.print(f"[red]❌ 合集响应中缺少aweme_list字段[/]")
-                        self.console.print(f"[yellow]🔍 可用字段: {list(datadict.keys())}[/]")
-                        break
+                try:
+                    datadict = jsonlib.loads(res.content)
+                except json.JSONDecodeError as e:
+                    self.console.print(f"[red]❌ 合集JSON解析失败: {str(e)}[/]")
+                    self.console.print(f"[yellow]🔍 响应内容: {res.text[:500]}...[/]")
+                    break
 
-                    for aweme in datadict["aweme_list"]:
-                        create_time = time.strftime(
-                            "%Y-%m-%d",
-                            time.localtime(int(aweme.get("create_time", 0)))
-                        )
+                if not datadict:
+                    self.console.print("[red]❌ 获取合集数据失败[/]")
+                    break
 
-                        # 时间过滤
-                        if not (start_time <= create_time <= end_time):
-                            filtered_count += 1
-                            continue
+                if datadict.get("status_code") != 0:
+                    self.console.print(f"[red]❌ 合集API请求失败: {datadict.get('status_msg', '未知错误')}[/]")
+                    break
 
-                        # 数量限制检查
-                        if number > 0 and len(awemeList) >= number:
-                            return awemeList  # 使用return替代break
+                if "aweme_list" not in datadict:
+                    self.console.print(f"[red]❌ 合集响应中缺少aweme_list字段[/]")
+                    self.console.print(f"[yellow]🔍 可用字段: {list(datadict.keys())}[/]")
+                    break
 
-                        # 增量更新检查
-                        if self.database:
-                            if self.db.get_mix(sec_uid=sec_uid, mix_id=mix_id, aweme_id=aweme['aweme_id']):
-                                if increase and aweme['is_top'] == 0:
-                                    return awemeList  # 使用return替代break
-                            else:
-                                self.db.insert_mix(sec_uid=sec_uid, mix_id=mix_id, aweme_id=aweme['aweme_id'], data=aweme)
+                total_fetched += len(datadict["aweme_list"])
+                if on_page is not None:
+                    on_page(total_fetched)
+
+                # 先处理整页，新作品一次事务入库，再逐个产出
+                page_awemes = []
+                new_rows = []
+                finished = False
+                for aweme in datadict["aweme_list"]:
+                    create_time = time.strftime(
+                        "%Y-%m-%d",
+                        time.localtime(int(aweme.get("create_time", 0)))
+                    )
 
-                        # 转换数据
-                        aweme_data = self._convert_aweme_data(aweme)
-                        if aweme_data:
-                            awemeList.append(aweme_data)
+                    # 时间过滤
+                    if not (start_time <= create_time <= end_time):
+                        filtered_count += 1
+                        continue
 
-                    # 检查是否还有更多数据
-                    if not datadict.get("has_more"):
-                        self.console.print(f"[green]✅ 已获取全部作品[/]")
+                    # 数量限制检查
+                    if number > 0 and yielded + len(page_awemes) >= number:
+                        finished = True
                         break
 
-                    # 更新游标
-                    cursor = datadict.get("cursor", 0)
-                    total_fetched += len(datadict["aweme_list"])
-                    progress.update(fetch_task, description=f"[cyan]📥 已获取: {total_fetched}个作品")
-
-                except Exception as e:
-                    self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
-                    # 添加更详细的错误信息
-                    if 'datadict' in locals():
-                        self.console.print(f"[yellow]🔍 最后一次响应: {str(datadict)[:300]}...[/]")
+                    # 增量更新检查
+                    if self.database:
+                        if aweme['aweme_id'] in self.seen.get('mix', sec_uid, mix_id):
+                            if increase and aweme['is_top'] == 0:
+                                finished = True
+                                break
+                        else:
+                            new_rows.append((aweme['aweme_id'], aweme))
+
+                    # 转换数据
+                    aweme_data = self._convert_aweme_data(aweme)
+                    if aweme_data:
+                        page_awemes.append(aweme_data)
+
+                if new_rows:
+                    self.db.insert_mix_many(sec_uid, mix_id, new_rows)
+                    self._mark_seen(new_rows, 'mix', sec_uid, mix_id)
+                for aweme_data in page_awemes:
+                    yielded += 1
+                    yield aweme_data
+                if finished:
+                    return
+
+                # 检查是否还有更多数据
+                if not datadict.get("has_more"):
+                    self.console.print(f"[green]✅ 已获取全部作品[/]")
                     break
 
+                # 更新游标
+                cursor = datadict.get("cursor", 0)
+
+            except Exception as e:
+                self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+                # 添加更详细的错误信息
+                if 'datadict' in locals():
+                    self.console.print(f"[yellow]🔍 最后一次响应: {str(datadict)[:300]}...[/]")
+                break
+
         if filtered_count > 0:
             self.console.print(f"[yellow]⚠️  已过滤 {filtered_count} 个不在时间范围内的作品[/]")
 
-        return awemeList
-
     def getUserAllMixInfo(self, sec_uid, count=35, number=0):
         print('[  提示  ]:正在请求的用户 id = %s\r\n' % sec_uid)
         if sec_uid is None:
@@ -634,10 +712,10 @@ class Douyin(object):
             while True:
                 # 接口不稳定, 有时服务器不返回数据, 需要重新获取
                 try:
-                    mix_list_params = f'sec_user_id={sec_uid}&count={count}&cursor={cursor}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
-                    url = self.urls.USER_MIX_LIST + utils.getXbogus(mix_list_params)
+                    mix_list_params = build_params(sec_user_id=sec_uid, count=count, cursor=cursor)
+                    url = sign_url(self.urls.USER_MIX_LIST, mix_list_params)
 
-                    res = requests.get(url=url, headers=douyin_headers, timeout=10)
+                    res = self._get(url, timeout=10)
 
                     # 检查HTTP状态码
                     if res.status_code != 200:
@@ -647,19 +725,19 @@ class Douyin(object):
                     try:
                         # 尝试直接解析，如果失败则检查是否为压缩格式
                         try:
-                            datadict = json.loads(res.text)
+                            datadict = jsonlib.loads(res.content)
                         except json.JSONDecodeError:
                             # 可能是压缩响应，尝试手动解压
                             content_encoding = res.headers.get('content-encoding', '').lower()
                             if content_encoding == 'gzip':
                                 import gzip
                                 content = gzip.decompress(res.content).decode('utf-8')
-                                datadict = json.loads(content)
+                                datadict = jsonlib.loads(content)
                             elif content_encoding == 'br':
                                 try:
                                     import brotli
                                     content = brotli.decompress(res.content).decode('utf-8')
-                                    datadict = json.loads(content)
+                                    datadict = jsonlib.loads(content)
                                 except ImportError:
                                     self.console.print("[red]❌ 需要安装brotli库来处理br压缩: pip install brotli[/]")
                                     raise
@@ -724,16 +802,21 @@ class Douyin(object):
         return mixIdNameDict
 
     def getMusicInfo(self, music_id: str, count=35, number=0, increase=False):
-        print('[  提示  ]:正在请求的音乐集合 id = %s\r\n' % music_id)
         if music_id is None:
             return None
+        return list(self.iterMusicInfo(music_id, count, number, increase))
+
+    def iterMusicInfo(self, music_id: str, count=35, number=0, increase=False) -> Iterator:
+        """逐页获取音乐(原声)下作品的生成器，参数同 getMusicInfo，用法见 iterUserInfo"""
+        print('[  提示  ]:正在请求的音乐集合 id = %s\r\n' % music_id)
+        if music_id is None:
+            return
         if number <= 0:
             numflag = False
         else:
             numflag = True
 
         cursor = 0
-        awemeList = []
         increaseflag = False
         numberis0 = False
 
@@ -748,10 +831,10 @@ class Douyin(object):
             while True:
                 # 接口不稳定, 有时服务器不返回数据, 需要重新获取
                 try:
-                    music_params = f'music_id={music_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
-                    url = self.urls.MUSIC + utils.getXbogus(music_params)
+                    music_params = build_params(music_id=music_id, cursor=cursor, count=count)
+                    url = sign_url(self.urls.MUSIC, music_params)
 
-                    res = requests.get(url=url, headers=douyin_headers, timeout=10)
+                    res = self._get(url, timeout=10)
 
                     # 检查HTTP状态码
                     if res.status_code != 200:
@@ -759,7 +842,7 @@ class Douyin(object):
                         break
 
                     try:
-                        datadict = json.loads(res.text)
+                        datadict = jsonlib.loads(res.content)
                     except json.JSONDecodeError as e:
                         self.console.print(f"[red]❌ 音乐JSON解析失败: {str(e)}[/]")
                         self.console.print(f"[yellow]🔍 响应内容: {res.text[:500]}...[/]")
@@ -786,9 +869,11 @@ class Douyin(object):
                     end = time.time()  # 结束时间
                     if end - start > self.timeout:
                         print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                        return awemeList
-
+                        return
 
+            # 先处理整页，新作品一次事务入库，再逐个产出
+            page_awemes = []
+            new_rows = []
             for aweme in datadict["aweme_list"]:
                 if self.database:
                     # 退出条件
@@ -797,11 +882,11 @@ class Douyin(object):
                     if increase and numflag and numberis0 and increaseflag:
                         break
                     # 增量更新, 找到非置顶的最新的作品发布时间
-                    if self.db.get_music(music_id=music_id, aweme_id=aweme['aweme_id']) is not None:
+                    if aweme['aweme_id'] in self.seen.get('music', music_id):
                         if increase and aweme['is_top'] == 0:
                             increaseflag = True
                     else:
-                        self.db.insert_music(music_id=music_id, aweme_id=aweme['aweme_id'], data=aweme)
+                        new_rows.append((aweme['aweme_id'], aweme))
 
                     # 退出条件
                     if increase and numflag is False and increaseflag:
@@ -817,9 +902,6 @@ class Douyin(object):
                     if number == 0:
                         numberis0 = True
 
-                # 清空self.awemeDict
-                self.result.clearDict(self.result.awemeDict)
-
                 # 默认为视频
                 awemeType = 0
                 try:
@@ -829,10 +911,15 @@ class Douyin(object):
                     print("[  警告  ]:接口中未找到 images\r")
 
                 # 转换成我们自己的格式
-                self.result.dataConvert(awemeType, self.result.awemeDict, aweme)
+                if self.compact_model:
+                    page_awemes.append(Aweme.from_raw(aweme, awemeType, self.keep_json, self.converter))
+                else:
+                    page_awemes.append(self.converter.convert(aweme, awemeType))
 
-                if self.result.awemeDict is not None and self.result.awemeDict != {}:
-                    awemeList.append(copy.deepcopy(self.result.awemeDict))
+            if new_rows:
+                self.db.insert_music_many(music_id, new_rows)
+                self._mark_seen(new_rows, 'music', music_id)
+            yield from page_awemes
 
             if self.database:
                 if increase and numflag is False and increaseflag:
@@ -859,7 +946,6 @@ class Douyin(object):
             else:
                 print("\r\n[  提示  ]:[音乐集合] 第 " + str(times) + " 次请求成功...\r\n")
 
-        return awemeList
 
     def getUserDetailInfo(self, sec_uid):
         if sec_uid is None:
@@ -870,11 +956,11 @@ class Douyin(object):
         while True:
             # 接口不稳定, 有时服务器不返回数据, 需要重新获取
             try:
-                user_detail_params = f'sec_user_id={sec_uid}&device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1&version_code=170400&version_name=17.4.0&cookie_enabled=true&screen_width=1920&screen_height=1080&browser_language=zh-CN&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0&browser_online=true&engine_name=Blink&engine_version=122.0.0.0&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
-                url = self.urls.USER_DETAIL + utils.getXbogus(user_detail_params)
+                user_detail_params = build_params(sec_user_id=sec_uid)
+                url = sign_url(self.urls.USER_DETAIL, user_detail_params)
 
-                res = requests.get(url=url, headers=douyin_headers)
-                datadict = json.loads(res.text)
+                res = self._get(url)
+                datadict = jsonlib.loads(res.content)
 
                 if datadict is not None and datadict["status_code"] == 0:
                     return datadict
@@ -3,12 +3,12 @@
 
 
 import os
-import json
+import itertools
 import time
 import requests
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
-from typing import List, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 # import asyncio  # 暂时注释掉
 # import aiohttp  # 暂时注释掉
@@ -20,13 +20,22 @@ from rich.text import Text
 from rich import print as rprint
 
 from apiproxy.douyin import douyin_headers
-from apiproxy.common import utils
+from apiproxy.douyin.model import Aweme
+from apiproxy.common import utils, jsonlib
+from apiproxy.common.mirrors import mirror_stats
+from apiproxy.common.session import create_session
+from apiproxy.common.metadata import MetadataSinks
+from apiproxy.common.contentindex import ContentIndex
+from apiproxy.common.musiccache import MusicCache, music_key
 
 logger = logging.getLogger("douyin_downloader")
 console = Console()
 
 class Download(object):
-    def __init__(self, thread=5, music=True, cover=True, avatar=True, resjson=True, folderstyle=True):
+    def __init__(self, thread=5, music=True, cover=True, avatar=True, resjson=True, folderstyle=True,
+                 segments=4, segment_threshold=20 * 1024 * 1024, session: Optional[requests.Session] = None,
+                 json_mode='file', json_compression: Optional[str] = None, json_flush_every=50, dedup=True,
+                 music_cache: Optional[Union[str, Path]] = None, music_cache_bytes=512 * 1024 * 1024):
         self.thread = thread
         self.music = music
         self.cover = cover
@@ -45,96 +54,141 @@ class Download(object):
         self.retry_times = 3
         self.chunk_size = 8192
         self.timeout = 30
-
-    def _download_media(self, url: str, path: Path, desc: str) -> bool:
-        """通用下载方法，处理所有类型的媒体下载"""
+        # 大文件分段下载：超过 segment_threshold 字节的文件拆成 segments 个 Range 并行获取
+        self.segments = max(1, int(segments))
+        self.segment_threshold = segment_threshold
+        # 连接池会话：下载线程与分段连接复用 keep-alive 连接，连接错误与 5xx 由适配器重试
+        self.session = session if session is not None else create_session(max(self.thread, self.segments))
+        # 作品 JSON 的保存方式：file 为每个作品一个文件，jsonl 为每个下载目录（用户/合集/音乐）一个汇总文件
+        self.metadata = MetadataSinks(compression=json_compression, flush_every=json_flush_every) \
+            if json_mode == 'jsonl' else None
+        # 同一作品在主页作品/喜欢/合集/音乐中重复出现时，链接到已下载的文件而不是重新下载
+        self.content_index = ContentIndex() if dedup else None
+        # 背景音乐缓存目录：同一音乐只下载一次，链接到各作品目录
+        self.music_cache = MusicCache(music_cache, music_cache_bytes) if music_cache else None
+
+    def _download_media(self, urls: List[str], path: Path, desc: str, key: Optional[Tuple[str, str]] = None) -> bool:
+        """通用下载方法，处理所有类型的媒体下载
+
+        urls 为同一资源的候选镜像，按顺序尝试，前一个镜像失败时切换到下一个
+        （只做故障切换，不像 downloader.py 那样并行对冲慢镜像）；key 为 (aweme_id, 资源名)，该资源已在其他目录下载过时直接链接
+        """
+        index = self.content_index if key is not None else None
         if path.exists():
             self.console.print(f"[cyan]⏭️  跳过已存在: {desc}[/]")
+            if index is not None:
+                index.record(*key, path)
             return True
-            
-        # 使用新的断点续传下载方法替换原有的下载逻辑
-        return self.download_with_resume(url, path, desc)
 
-    def _get_first_url(self, url_list: list) -> str:
-        """安全地获取URL列表中的第一个URL"""
-        if isinstance(url_list, list) and len(url_list) > 0:
-            return url_list[0]
-        return None
+        if index is not None and index.link(*key, path):
+            self.console.print(f"[cyan]🔗 复用已下载: {desc}[/]")
+            return True
 
-    def _download_media_files(self, aweme: dict, path: Path, name: str, desc: str) -> None:
+        # 使用新的断点续传下载方法替换原有的下载逻辑
+        for i, url in enumerate(urls):
+            if self.download_with_resume(url, path, desc):
+                if index is not None:
+                    index.record(*key, path)
+                return True
+            if i + 1 < len(urls):
+                logger.info(f"切换到下一个镜像 ({i + 2}/{len(urls)}): {desc}")
+        return False
+
+    def _download_music(self, aweme: Aweme, urls: List[str], path: Path, desc: str) -> bool:
+        """下载背景音乐，启用音乐缓存时同一音乐只下载一次"""
+        key = music_key(aweme.music)
+        if self.music_cache is None or not key or path.exists():
+            return self._download_media(urls, path, desc, (aweme.aweme_id, 'music'))
+        if self.music_cache.link(key, path):
+            self.console.print(f"[cyan]🎵 使用缓存音乐: {desc}[/]")
+            return True
+        # 下载到缓存的临时文件（中断后可断点续传），完成后放入缓存
+        part = self.music_cache.part_path(key)
+        if not any(self.download_with_resume(url, part, desc) for url in urls):
+            return False
+        return self.music_cache.add(key, path)
+
+    def _get_urls(self, url_list: Sequence[str]) -> List[str]:
+        """获取候选镜像URL，按各主机的历史响应耗时排序"""
+        if isinstance(url_list, (list, tuple)):
+            return mirror_stats.order(url_list)
+        return []
+
+    def _download_media_files(self, aweme: Aweme, path: Path, name: str, desc: str) -> None:
         """下载所有媒体文件"""
         try:
             # 下载视频或图集
-            if aweme["awemeType"] == 0:  # 视频
+            if aweme.awemeType == 0:  # 视频
                 video_path = path / f"{name}_video.mp4"
-                url_list = aweme.get("video", {}).get("play_addr", {}).get("url_list", [])
-                if url := self._get_first_url(url_list):
-                    if not self._download_media(url, video_path, f"[视频]{desc}"):
+                if urls := self._get_urls(aweme.video.url_list):
+                    if not self._download_media(urls, video_path, f"[视频]{desc}", (aweme.aweme_id, 'video')):
                         raise Exception("视频下载失败")
                 else:
                     logger.warning(f"视频URL为空: {desc}")
 
-            elif aweme["awemeType"] == 1:  # 图集
-                for i, image in enumerate(aweme.get("images", [])):
-                    url_list = image.get("url_list", [])
-                    if url := self._get_first_url(url_list):
+            elif aweme.awemeType == 1:  # 图集
+                for i, image in enumerate(aweme.images):
+                    if urls := self._get_urls(image.url_list):
                         image_path = path / f"{name}_image_{i}.jpeg"
-                        if not self._download_media(url, image_path, f"[图集{i+1}]{desc}"):
+                        if not self._download_media(urls, image_path, f"[图集{i+1}]{desc}", (aweme.aweme_id, f'image_{i}')):
                             raise Exception(f"图片{i+1}下载失败")
                     else:
                         logger.warning(f"图片{i+1} URL为空: {desc}")
 
             # 下载音乐
             if self.music:
-                url_list = aweme.get("music", {}).get("play_url", {}).get("url_list", [])
-                if url := self._get_first_url(url_list):
-                    music_name = utils.replaceStr(aweme["music"]["title"])
+                if urls := self._get_urls(aweme.music.url_list):
+                    music_name = utils.replaceStr(aweme.music_title)
                     music_path = path / f"{name}_music_{music_name}.mp3"
-                    if not self._download_media(url, music_path, f"[音乐]{desc}"):
+                    if not self._download_music(aweme, urls, music_path, f"[音乐]{desc}"):
                         self.console.print(f"[yellow]⚠️  音乐下载失败: {desc}[/]")
 
             # 下载封面
-            if self.cover and aweme["awemeType"] == 0:
-                url_list = aweme.get("video", {}).get("cover", {}).get("url_list", [])
-                if url := self._get_first_url(url_list):
+            if self.cover and aweme.awemeType == 0:
+                if urls := self._get_urls(aweme.cover.url_list):
                     cover_path = path / f"{name}_cover.jpeg"
-                    if not self._download_media(url, cover_path, f"[封面]{desc}"):
+                    if not self._download_media(urls, cover_path, f"[封面]{desc}", (aweme.aweme_id, 'cover')):
                         self.console.print(f"[yellow]⚠️  封面下载失败: {desc}[/]")
 
             # 下载头像
             if self.avatar:
-                url_list = aweme.get("author", {}).get("avatar", {}).get("url_list", [])
-                if url := self._get_first_url(url_list):
+                if urls := self._get_urls(aweme.author.avatar.url_list):
                     avatar_path = path / f"{name}_avatar.jpeg"
-                    if not self._download_media(url, avatar_path, f"[头像]{desc}"):
+                    if not self._download_media(urls, avatar_path, f"[头像]{desc}", (aweme.aweme_id, 'avatar')):
                         self.console.print(f"[yellow]⚠️  头像下载失败: {desc}[/]")
 
         except Exception as e:
             raise Exception(f"下载失败: {str(e)}")
 
-    def awemeDownload(self, awemeDict: dict, savePath: Path) -> None:
-        """下载单个作品的所有内容"""
+    def awemeDownload(self, awemeDict: Union[dict, Aweme], savePath: Path) -> None:
+        """下载单个作品的所有内容，awemeDict 可以是模板字典或 Aweme 对象"""
         if not awemeDict:
             logger.warning("无效的作品数据")
             return
             
         try:
+            aweme = awemeDict if isinstance(awemeDict, Aweme) else Aweme.from_dict(awemeDict)
+
             # 创建保存目录
             save_path = Path(savePath)
             save_path.mkdir(parents=True, exist_ok=True)
             
             # 构建文件名
-            file_name = f"{awemeDict['create_time']}_{utils.replaceStr(awemeDict['desc'])}"
+            file_name = f"{aweme.create_time}_{utils.replaceStr(aweme.desc)}"
             aweme_path = save_path / file_name if self.folderstyle else save_path
             aweme_path.mkdir(exist_ok=True)
             
             # 保存JSON数据
             if self.resjson:
-                self._save_json(aweme_path / f"{file_name}_result.json", awemeDict)
+                data = awemeDict.to_dict() if isinstance(awemeDict, Aweme) else awemeDict
+                if self.metadata is not None:
+                    self.metadata.get(save_path).write(aweme.aweme_id, data)
+                else:
+                    self._save_json(aweme_path / f"{file_name}_result.json", data)
                 
             # 下载媒体文件
             desc = file_name[:30]
-            self._download_media_files(awemeDict, aweme_path, file_name, desc)
+            self._download_media_files(aweme, aweme_path, file_name, desc)
                 
         except Exception as e:
             logger.error(f"处理作品时出错: {str(e)}")
@@ -142,12 +196,22 @@ class Download(object):
     def _save_json(self, path: Path, data: dict) -> None:
         """保存JSON数据"""
         try:
-            with open(path, "w", encoding='utf-8') as f:
-                json.dump(data, ensure_ascii=False, indent=2, fp=f)
+            jsonlib.dump_file(path, data)
         except Exception as e:
             logger.error(f"保存JSON失败: {path}, 错误: {str(e)}")
 
-    def userDownload(self, awemeList: List[dict], savePath: Path):
+    def userDownload(self, awemeList: Iterable[Union[dict, Aweme]], savePath: Path):
+        """批量下载作品
+
+        awemeList 可以是列表，也可以是 Douyin.iterUserInfo 等生成器：
+        此时边获取边下载，总数在下载结束后才能确定。
+        """
+        streaming = not isinstance(awemeList, (list, tuple))
+        if streaming:
+            # 先取到第一项（即第一页）再显示下载面板
+            iterator = iter(awemeList)
+            first = next(iterator, None)
+            awemeList = itertools.chain((first,), iterator) if first is not None else ()
         if not awemeList:
             self.console.print("[yellow]⚠️  没有找到可下载的内容[/]")
             return
@@ -156,14 +220,14 @@ class Download(object):
         save_path.mkdir(parents=True, exist_ok=True)
 
         start_time = time.time()
-        total_count = len(awemeList)
+        total_count = None if streaming else len(awemeList)
         success_count = 0
         
         # 显示下载信息面板
         self.console.print(Panel(
             Text.assemble(
                 ("下载配置\n", "bold cyan"),
-                (f"总数: {total_count} 个作品\n", "cyan"),
+                (f"总数: {'边获取边下载' if streaming else f'{total_count} 个作品'}\n", "cyan"),
                 (f"线程: {self.thread}\n", "cyan"),
                 (f"保存路径: {save_path}\n", "cyan"),
             ),
@@ -177,13 +241,22 @@ class Download(object):
                 total=total_count
             )
             
-            for aweme in awemeList:
-                try:
-                    self.awemeDownload(awemeDict=aweme, savePath=save_path)
-                    success_count += 1
-                    self.progress.update(download_task, advance=1)
-                except Exception as e:
-                    self.console.print(f"[red]❌ 下载失败: {str(e)}[/]")
+            processed = 0
+            try:
+                for aweme in awemeList:
+                    processed += 1
+                    try:
+                        self.awemeDownload(awemeDict=aweme, savePath=save_path)
+                        success_count += 1
+                        self.progress.update(download_task, advance=1)
+                    except Exception as e:
+                        self.console.print(f"[red]❌ 下载失败: {str(e)}[/]")
+            finally:
+                if self.metadata is not None:
+                    self.metadata.close(save_path)
+
+        if streaming:
+            total_count = processed
 
         # 显示下载完成统计
         end_time = time.time()
@@ -197,24 +270,61 @@ class Download(object):
                 (f"成功: {success_count}/{total_count}\n", "green"),
                 (f"用时: {minutes}分{seconds}秒\n", "green"),
                 (f"保存位置: {save_path}\n", "green"),
+                (f"本次运行复用已下载文件: {self.content_index.linked} 个, "
+                 f"{self.content_index.linked_bytes / 1024 / 1024:.1f}MB\n", "green")
+                if self.content_index is not None and self.content_index.linked else "",
+                (f"音乐缓存: 命中 {self.music_cache.hits} / 未命中 {self.music_cache.misses}, "
+                 f"节省 {self.music_cache.saved_bytes / 1024 / 1024:.1f}MB\n", "green")
+                if self.music_cache is not None else "",
             ),
             title="下载统计",
             border_style="green"
         ))
 
     def download_with_resume(self, url: str, filepath: Path, desc: str) -> bool:
-        """支持断点续传的下载方法"""
-        file_size = filepath.stat().st_size if filepath.exists() else 0
+        """支持断点续传的下载方法
+
+        先写入 filepath.part（中断后从其大小处续传），完成后改名为 filepath，
+        filepath 存在即表示下载完整。
+        """
+        part_path = filepath.with_name(filepath.name + '.part')
+        file_size = part_path.stat().st_size if part_path.exists() else 0
         headers = {'Range': f'bytes={file_size}-'} if file_size > 0 else {}
+        # 大文件按字节范围多连接并行下载，只在首次完整请求时根据响应头尝试一次
+        try_segments = True
 
         for attempt in range(self.retry_times):
             try:
-                response = requests.get(url, headers={**douyin_headers, **headers},
-                                     stream=True, timeout=self.timeout)
+                start = time.monotonic()
+                try:
+                    response = self.session.get(url, headers={**douyin_headers, **headers},
+                                                stream=True, timeout=self.timeout)
+                except requests.exceptions.RequestException:
+                    mirror_stats.record_failure(url)
+                    raise
 
                 if response.status_code not in (200, 206):
+                    response.close()
+                    mirror_stats.record_failure(url)
                     raise Exception(f"HTTP {response.status_code}")
-
+                mirror_stats.record(url, time.monotonic() - start)
+
+                if try_segments and file_size == 0:
+                    try_segments = False
+                    total = self._segment_size(response)
+                    if total:
+                        if self._download_segmented(response, filepath, total, desc):
+                            return True
+                        # 首个响应已被分段下载读取了一部分，重新请求整个文件
+                        logger.info(f"分段下载不可用，改用单连接: {desc}")
+                        response = self.session.get(url, headers=douyin_headers, stream=True, timeout=self.timeout)
+                        if response.status_code != 200:
+                            response.close()
+                            raise Exception(f"HTTP {response.status_code}")
+
+                if file_size > 0 and response.status_code == 200:
+                    # 服务器忽略了 Range，从头重新写入
+                    file_size = 0
                 total_size = int(response.headers.get('content-length', 0)) + file_size
                 mode = 'ab' if file_size > 0 else 'wb'
 
@@ -222,7 +332,7 @@ class Download(object):
                     task = self.progress.add_task(f"[cyan]⬇️  {desc}", total=total_size)
                     self.progress.update(task, completed=file_size)  # 更新断点续传的进度
 
-                    with open(filepath, mode) as f:
+                    with open(part_path, mode) as f:
                         try:
                             for chunk in response.iter_content(chunk_size=self.chunk_size):
                                 if chunk:
@@ -232,10 +342,12 @@ class Download(object):
                                requests.exceptions.ChunkedEncodingError,
                                Exception) as chunk_error:
                             # 网络中断，记录当前文件大小，下次从这里继续
-                            current_size = filepath.stat().st_size if filepath.exists() else 0
+                            response.close()
+                            current_size = part_path.stat().st_size if part_path.exists() else 0
                             logger.warning(f"下载中断，已下载 {current_size} 字节: {str(chunk_error)}")
                             raise chunk_error
 
+                os.replace(part_path, filepath)
                 return True
 
             except Exception as e:
@@ -250,11 +362,81 @@ class Download(object):
                     logger.info(f"等待 {wait_time} 秒后重试...")
                     time.sleep(wait_time)
                     # 重新计算文件大小，准备断点续传
-                    file_size = filepath.stat().st_size if filepath.exists() else 0
+                    file_size = part_path.stat().st_size if part_path.exists() else 0
                     headers = {'Range': f'bytes={file_size}-'} if file_size > 0 else {}
 
         return False
 
+    def _segment_size(self, response) -> int:
+        """响应可以分段下载时返回文件大小，否则返回 0
+
+        要求 200 响应带 Content-Length、声明 Accept-Ranges: bytes、未压缩，且大小超过阈值。
+        """
+        if self.segments <= 1 or response.status_code != 200:
+            return 0
+        headers = response.headers
+        if headers.get('Accept-Ranges', '').lower() != 'bytes' or 'Content-Encoding' in headers:
+            return 0
+        length = headers.get('Content-Length', '')
+        size = int(length) if length.isdigit() else 0
+        return size if size >= self.segment_threshold else 0
+
+    def _download_segmented(self, response, filepath: Path, size: int, desc: str) -> bool:
+        """多连接分段下载
+
+        第一个分段直接读取已打开的 response，其余分段向重定向后的同一地址
+        发 Range 请求。预分配完整大小的 .seg 文件（与单连接续传的 .part 区分，
+        避免把预分配的空洞当作已下载部分），每个线程用独立的文件句柄
+        定位到各自偏移量写入，全部完成后改名。任一分段失败时返回 False。
+        """
+        url = response.url
+        tmp_path = filepath.with_name(filepath.name + '.seg')
+        step = -(-size // self.segments)
+        ranges = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.truncate(size)
+
+            with self.progress:
+                task = self.progress.add_task(f"[cyan]⬇️  {desc}", total=size)
+
+                def fetch(start: int, end: int) -> bool:
+                    if start == 0:
+                        part = response
+                    else:
+                        part = self.session.get(url, headers={**douyin_headers, 'Range': f'bytes={start}-{end}'},
+                                                stream=True, timeout=self.timeout)
+                    with part:
+                        if start and part.status_code != 206:
+                            return False
+                        limit = end - start + 1
+                        written = 0
+                        with open(tmp_path, 'r+b') as f:
+                            f.seek(start)
+                            for chunk in part.iter_content(chunk_size=self.chunk_size):
+                                if chunk:
+                                    chunk = chunk[:limit - written]
+                                    written += f.write(chunk)
+                                    self.progress.update(task, advance=len(chunk))
+                                    if written >= limit:
+                                        break
+                    return written == limit
+
+                with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                    results = list(executor.map(lambda r: fetch(*r), ranges))
+
+            if all(results):
+                os.replace(tmp_path, filepath)
+                return True
+        except Exception as e:
+            logger.warning(f"分段下载失败 {desc}: {str(e)}")
+        finally:
+            response.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
+
 
 class DownloadManager:
     def __init__(self, max_workers=3):
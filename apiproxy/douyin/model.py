@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+紧凑的作品数据模型
+只保存下载流程用到的字段（__slots__，无实例字典）；需要写 JSON 时可附带
+压缩后的完整转换结果；可与 Result 模板形式的字典互相转换
+"""
+
+import zlib
+from typing import Optional, Tuple
+
+from apiproxy.common import jsonlib
+from apiproxy.douyin.result import AwemeConverter
+
+# 没有指定转换器时使用（to_dict 与未指定转换器的 from_raw）
+_converter = AwemeConverter()
+
+
+class MediaRef(object):
+    """一个媒体资源：uri 与候选镜像地址"""
+    __slots__ = ('uri', 'url_list')
+
+    def __init__(self, uri: str = '', url_list: Tuple[str, ...] = ()):
+        self.uri = uri
+        self.url_list = url_list
+
+    @classmethod
+    def from_dict(cls, data) -> 'MediaRef':
+        if not isinstance(data, dict):
+            return cls()
+        url_list = data.get('url_list') or ()
+        return cls(data.get('uri') or '', tuple(url_list) if isinstance(url_list, list) else ())
+
+    def to_dict(self) -> dict:
+        return {'uri': self.uri, 'url_list': list(self.url_list)}
+
+    def __bool__(self):
+        return bool(self.url_list)
+
+    def __repr__(self):
+        return f'MediaRef({self.uri!r}, {len(self.url_list)} urls)'
+
+
+class Author(object):
+    """作者"""
+    __slots__ = ('uid', 'sec_uid', 'nickname', 'avatar')
+
+    def __init__(self, uid: str = '', sec_uid: str = '', nickname: str = '', avatar: Optional[MediaRef] = None):
+        self.uid = uid
+        self.sec_uid = sec_uid
+        self.nickname = nickname
+        self.avatar = avatar if avatar is not None else MediaRef()
+
+    def __repr__(self):
+        return f'Author({self.nickname!r}, {self.sec_uid!r})'
+
+
+class Aweme(object):
+    """作品
+
+    字段与 Result.awemeDict 中下载流程用到的部分一一对应：
+    create_time 为格式化后的字符串，video 为无水印播放地址（play_addr），
+    images 为图集各图片，music 为音乐播放地址。
+    """
+    __slots__ = ('aweme_id', 'awemeType', 'create_time', 'desc', 'author', 'video', 'cover',
+                 'images', 'music', 'music_title', 'mix_id', 'mix_name', '_json')
+
+    def __init__(self, aweme_id: str = '', awemeType: int = 0, create_time: str = '', desc: str = '',
+                 author: Optional[Author] = None, video: Optional[MediaRef] = None,
+                 cover: Optional[MediaRef] = None, images: Tuple[MediaRef, ...] = (),
+                 music: Optional[MediaRef] = None, music_title: str = '',
+                 mix_id: str = '', mix_name: str = '', json: Optional[bytes] = None):
+        self.aweme_id = aweme_id
+        self.awemeType = awemeType
+        self.create_time = create_time
+        self.desc = desc
+        self.author = author if author is not None else Author()
+        self.video = video if video is not None else MediaRef()
+        self.cover = cover if cover is not None else MediaRef()
+        self.images = images
+        self.music = music if music is not None else MediaRef()
+        self.music_title = music_title
+        self.mix_id = mix_id
+        self.mix_name = mix_name
+        # 完整的转换结果（zlib 压缩的 JSON），只在输出 JSON 时解析
+        self._json = json
+
+    @classmethod
+    def from_raw(cls, raw: dict, awemeType: int, keep_json: bool = False,
+                 converter: Optional[AwemeConverter] = None) -> 'Aweme':
+        """由接口原始数据创建，字段取值规则与 AwemeConverter 相同
+
+        keep_json 为 True 时保留压缩后的完整转换结果（只在要输出 JSON 时需要），
+        to_dict() 原样返回；转换结果只有模板字段，比原始接口数据小得多。
+        converter 为调用方按顺序使用的转换器（见 AwemeConverter 的图片字段说明）。
+        """
+        data = (converter or _converter).convert(raw, awemeType)
+        aweme = cls.from_dict(data)
+        if keep_json:
+            aweme._json = zlib.compress(jsonlib.dumps(data), 1)
+        return aweme
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Aweme':
+        """由 Result.awemeDict 形式的字典创建"""
+        author = data.get('author') or {}
+        video = data.get('video') or {}
+        music = data.get('music') or {}
+        mix_info = data.get('mix_info') or {}
+        return cls(
+            aweme_id=str(data.get('aweme_id') or ''),
+            awemeType=data.get('awemeType', 0),
+            create_time=data.get('create_time') or '',
+            desc=data.get('desc') or '',
+            author=Author(
+                uid=str(author.get('uid') or ''),
+                sec_uid=author.get('sec_uid') or '',
+                nickname=author.get('nickname') or '',
+                avatar=MediaRef.from_dict(author.get('avatar')),
+            ),
+            video=MediaRef.from_dict(video.get('play_addr')),
+            cover=MediaRef.from_dict(video.get('cover')),
+            images=tuple(MediaRef.from_dict(image) for image in data.get('images') or ()),
+            music=MediaRef.from_dict(music.get('play_url')),
+            music_title=music.get('title') or '',
+            mix_id=str(mix_info.get('mix_id') or ''),
+            mix_name=mix_info.get('mix_name') or '',
+        )
+
+    def to_dict(self) -> dict:
+        """转换为 Result.awemeDict 形式的字典
+
+        保留了完整转换结果时与直接转换的结果完全相同，否则只包含模型中的字段，
+        其余字段为模板默认值。
+        """
+        if self._json is not None:
+            return jsonlib.loads(zlib.decompress(self._json))
+
+        data = _converter.convert({}, self.awemeType)
+        data['aweme_id'] = self.aweme_id
+        data['create_time'] = self.create_time
+        data['desc'] = self.desc
+        data['author']['uid'] = self.author.uid
+        data['author']['sec_uid'] = self.author.sec_uid
+        data['author']['nickname'] = self.author.nickname
+        data['author']['avatar'].update(self.author.avatar.to_dict())
+        if self.awemeType == 0:
+            data['video']['play_addr'] = self.video.to_dict()
+            data['video']['cover'].update(self.cover.to_dict())
+        data['images'] = [image.to_dict() for image in self.images]
+        data['music']['play_url'].update(self.music.to_dict())
+        data['music']['title'] = self.music_title
+        data['mix_info']['mix_id'] = self.mix_id
+        data['mix_info']['mix_name'] = self.mix_name
+        return data
+
+    def __repr__(self):
+        return f'Aweme({self.aweme_id!r}, type={self.awemeType}, desc={self.desc[:20]!r})'
+
+
+if __name__ == '__main__':
+    # 内存对比：python -m apiproxy.douyin.model
+    import os
+    import tracemalloc
+
+    thumb = {"height": 720, "uri": "100x100/aweme-avatar/x", "width": 720,
+             "url_list": ["https://p3.douyinpic.com/100x100/a.jpeg", "https://p9.douyinpic.com/100x100/a.jpeg"]}
+
+    def make_raw(i):
+        # 真实接口的单个作品约 10KB，大部分是下载用不到的字段，这里用随机串填充
+        return {
+            "aweme_id": str(7000000000000000000 + i), "desc": "作品%d" % i, "create_time": 1700000000 + i,
+            "author": {"avatar_thumb": thumb, "nickname": "n", "sec_uid": "MS4w", "uid": "1"},
+            "music": {"play_url": {"uri": "p", "url_key": "k", "url_list": ["pl"]}, "title": "t"},
+            "video": {"bit_rate": [{"play_addr": {"uri": "v0200", "url_list": ["https://v1/play"]}}],
+                      "cover": thumb},
+            "statistics": {"digg_count": i}, "images": None, "extra": os.urandom(3000).hex(),
+        }
+
+    def measure(name, build):
+        tracemalloc.start()
+        items = [build(make_raw(i)) for i in range(10000)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<32}{current / 1024 / 1024:8.1f} MB / {len(items)} 个作品")
+
+    measure("原始数据 dict", lambda raw: raw)
+    measure("转换后的模板 dict", lambda raw: _converter.convert(raw, 0))
+    measure("Aweme", lambda raw: Aweme.from_raw(raw, 0))
+    measure("Aweme + 压缩原始数据（旧）", lambda raw: (Aweme.from_raw(raw, 0), zlib.compress(jsonlib.dumps(raw), 1)))
+    measure("Aweme(keep_json=True)", lambda raw: Aweme.from_raw(raw, 0, keep_json=True))
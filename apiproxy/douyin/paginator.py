@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+列表接口公共逻辑
+统一的请求参数、X-Bogus 签名，以及带预取的异步游标分页器
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from apiproxy.common import utils
+
+logger = logging.getLogger(__name__)
+
+# 网页端公共参数（与浏览器请求保持一致）
+WEB_COMMON_PARAMS = (
+    'device_platform=webapp&aid=6383&channel=channel_pc_web&pc_client_type=1'
+    '&version_code=170400&version_name=17.4.0&cookie_enabled=true'
+    '&screen_width=1920&screen_height=1080&browser_language=zh-CN'
+    '&browser_platform=MacIntel&browser_name=Chrome&browser_version=122.0.0.0'
+    '&browser_online=true&engine_name=Blink&engine_version=122.0.0.0'
+    '&os_name=Mac&os_version=10.15.7&cpu_core_num=8&device_memory=8'
+    '&platform=PC&downlink=10&effective_type=4g&round_trip_time=50'
+)
+
+
+def build_params(**fields) -> str:
+    """拼接接口参数：业务字段在前，公共参数在后"""
+    head = '&'.join(f'{key}={value}' for key, value in fields.items())
+    return f'{head}&{WEB_COMMON_PARAMS}' if head else WEB_COMMON_PARAMS
+
+
+def sign_url(api_url: str, params: str) -> str:
+    """拼接接口地址并附加 X-Bogus 签名"""
+    return api_url + utils.getXbogus(params)
+
+
+async def paginate(
+    fetch_page: Callable[[Any], Awaitable[Optional[Dict]]],
+    list_field: str = 'aweme_list',
+    cursor_field: str = 'cursor',
+    prefetch: int = 1,
+    rate_limiter=None,
+    cursor: Any = 0
+) -> AsyncIterator[Dict]:
+    """按游标翻页并逐条产出列表项
+
+    后台任务提前请求后续页面，消费方处理第 N 页（例如下载媒体）时
+    第 N+1 页已经在路上，消除翻页之间的空闲等待。
+
+    Args:
+        fetch_page: 根据游标获取一页数据的协程函数，失败时返回 None
+        list_field: 页面中列表字段名（aweme_list / mix_infos）
+        cursor_field: 页面中下一页游标字段名（cursor / max_cursor）
+        prefetch: 预取深度，即消费当前页时最多领先多少页（已取回未消费的与正在
+            请求的合计）；0 表示不预取
+        rate_limiter: 可选限速器，每次请求前调用 acquire()
+        cursor: 起始游标
+
+    提前结束迭代时请调用 aclose()，以便取消后台预取任务。
+    """
+    if prefetch <= 0:
+        while True:
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+            page = await fetch_page(cursor)
+            items = (page or {}).get(list_field) or []
+            for item in items:
+                yield item
+            if not items or not page.get('has_more'):
+                return
+            cursor = page.get(cursor_field, 0)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    # 每请求一页占用一个名额，消费方取走该页时归还：只用有界队列的话，
+    # 队列已满时生产者仍会请求下一页，实际领先 prefetch + 1 页
+    slots = asyncio.Semaphore(prefetch)
+    finished = object()
+
+    async def produce(cursor):
+        try:
+            while True:
+                await slots.acquire()
+                if rate_limiter is not None:
+                    await rate_limiter.acquire()
+                page = await fetch_page(cursor)
+                items = (page or {}).get(list_field) or []
+                if items:
+                    await queue.put(items)
+                if not items or not page.get('has_more'):
+                    break
+                cursor = page.get(cursor_field, 0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(finished)
+
+    producer = asyncio.ensure_future(produce(cursor))
+    try:
+        while True:
+            items = await queue.get()
+            slots.release()
+            if items is finished:
+                break
+            if isinstance(items, Exception):
+                raise items
+            for item in items:
+                yield item
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+
+if __name__ == '__main__':
+    pass
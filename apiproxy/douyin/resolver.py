@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分享链接解析
+只跟随重定向的 Location 头，不下载落地页正文；解析结果写入带有效期的
+磁盘缓存，重复运行同一批链接时无需再次联网
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUS = (301, 302, 303, 307, 308)
+# 只缓存这些短链接域名的解析结果，其他链接的落地地址可能随时变化
+CACHEABLE_HOSTS = ('v.douyin.com',)
+
+
+class RedirectCache:
+    """分享链接 -> 最终URL 的 JSON 磁盘缓存
+
+    写入先在内存中累积，每 flush_every 条或进程退出时落盘一次，
+    通过临时文件 + 改名保证缓存文件完整。
+    """
+
+    def __init__(self, path='short_links.json', ttl: float = 30 * 86400, flush_every: int = 50):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.flush_every = flush_every
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._dirty = 0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logger.warning(f"读取短链接缓存失败，将重新建立: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(url)
+            if entry and time.time() - entry.get('time', 0) < self.ttl:
+                return entry.get('url')
+        return None
+
+    def put(self, url: str, final_url: str) -> None:
+        with self._lock:
+            self._load()[url] = {'url': final_url, 'time': int(time.time())}
+            self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._save()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self) -> None:
+        # 顺便清理过期条目
+        now = time.time()
+        entries = {k: v for k, v in self._entries.items() if now - v.get('time', 0) < self.ttl}
+        self._entries = entries
+        try:
+            if self.path.parent != Path(''):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+        except Exception as e:
+            logger.warning(f"保存短链接缓存失败: {e}")
+
+
+class ShortLinkResolver:
+    """跟随重定向得到分享链接的最终URL
+
+    同步（requests）与异步（aiohttp）两种方式共用同一份缓存。只有短链接域名、
+    确实发生了重定向且最终响应为 2xx/3xx 时才写入缓存，风控页、错误页以及
+    超过 max_redirects 仍在重定向的中间地址不会被缓存。
+    """
+
+    def __init__(self, cache_path='short_links.json', ttl: float = 30 * 86400, max_redirects: int = 10):
+        self.cache = RedirectCache(cache_path, ttl)
+        self.max_redirects = max_redirects
+
+    def resolve(self, url: str, headers: Optional[Dict] = None, timeout: float = 10,
+                session: Optional[requests.Session] = None) -> str:
+        """同步解析，失败时抛出 requests 异常；传入 session 时复用其连接池"""
+        cached = self.cache.get(url)
+        if cached:
+            return cached
+
+        get = session.get if session is not None else requests.get
+        current = url
+        status = None
+        for _ in range(self.max_redirects):
+            response = get(current, headers=headers, allow_redirects=False,
+                           stream=True, timeout=timeout)
+            response.close()
+            location = response.headers.get('Location')
+            status = response.status_code
+            if status not in REDIRECT_STATUS or not location:
+                break
+            current = urljoin(current, location)
+        else:
+            # 重定向次数用尽：current 只是中间地址，不缓存
+            status = None
+
+        self._remember(url, current, status)
+        return current
+
+    async def resolve_async(self, session, url: str, headers: Optional[Dict] = None) -> str:
+        """异步解析，session 为 aiohttp.ClientSession，失败时抛出 aiohttp 异常"""
+        cached = self.cache.get(url)
+        if cached:
+            return cached
+
+        current = url
+        status = None
+        for _ in range(self.max_redirects):
+            async with session.get(current, headers=headers, allow_redirects=False) as response:
+                location = response.headers.get('Location')
+                status = response.status
+            if status not in REDIRECT_STATUS or not location:
+                break
+            current = urljoin(current, location)
+        else:
+            # 重定向次数用尽：current 只是中间地址，不缓存
+            status = None
+
+        self._remember(url, current, status)
+        return current
+
+    def _remember(self, url: str, final_url: str, status: Optional[int]) -> None:
+        """满足缓存条件时记录解析结果"""
+        if final_url == url or status is None or not 200 <= status < 400:
+            return
+        if urlparse(url).hostname not in CACHEABLE_HOSTS:
+            return
+        self.cache.put(url, final_url)
+
+    def flush(self) -> None:
+        self.cache.flush()
+
+
+if __name__ == '__main__':
+    pass
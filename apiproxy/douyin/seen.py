@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+已下载作品的成员索引
+每个 (类型, 所有者) 一个排序的 int64 数组文件，内存映射后二分查找，
+增量判断不再逐个查询数据库；数据库仍是唯一的权威记录，索引文件与其不一致时从数据库重建
+"""
+
+import hashlib
+import heapq
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from apiproxy.douyin.database import DataBase
+
+ITEM_SIZE = array('q').itemsize
+
+
+class SeenSet:
+    """排序的 aweme_id 数组（本机字节序 int64）
+
+    磁盘部分只读映射，本次运行新增的 id 先放在内存集合中，save() 时合并写回。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = None
+        self._mmap = None
+        self._view = None
+        self._ids = ()
+        self._added = set()
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        size = os.fstat(f.fileno()).st_size
+        if size < ITEM_SIZE:
+            f.close()
+            return
+        self._file = f
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._ids = self._view[:size - size % ITEM_SIZE].cast('q')
+
+    def _release(self) -> None:
+        # 先释放所有视图才能关闭映射
+        if self._view is not None:
+            self._ids.release()
+            self._view.release()
+            self._mmap.close()
+            self._file.close()
+        self._file = self._mmap = self._view = None
+        self._ids = ()
+
+    def __contains__(self, aweme_id) -> bool:
+        try:
+            aweme_id = int(aweme_id)
+        except (TypeError, ValueError):
+            return False
+        if aweme_id in self._added:
+            return True
+        ids = self._ids
+        i = bisect_left(ids, aweme_id)
+        return i < len(ids) and ids[i] == aweme_id
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._added)
+
+    def add(self, aweme_id) -> None:
+        if aweme_id not in self:
+            self._added.add(int(aweme_id))
+
+    def _write(self, ids: Iterable[int]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            array('q', ids).tofile(f)
+        self._release()
+        os.replace(tmp, self.path)
+        self._added.clear()
+        self._open()
+
+    def replace(self, ids: Iterable[int]) -> None:
+        """以 ids（升序、无重复）重写索引文件"""
+        self._write(ids)
+
+    def save(self) -> None:
+        """把本次新增的 id 合并进索引文件"""
+        if self._added:
+            self._write(heapq.merge(self._ids, sorted(self._added)))
+
+    def close(self) -> None:
+        self.save()
+        self._release()
+
+
+class SeenIndex:
+    """按 (类型, 所有者) 管理 SeenSet，首次使用时加载
+
+    索引文件放在数据库旁的 <数据库>.seen 目录；加载时与数据库中该所有者的记录数对比，
+    不一致（首次使用、其他进程写入、上次未正常保存）时用一次查询从数据库重建。
+    """
+
+    def __init__(self, db: DataBase, directory: Optional[Union[str, Path]] = None):
+        self.db = db
+        self.directory = Path(directory) if directory is not None else Path(f"{db.path}.seen")
+        self._sets: Dict[Tuple[str, ...], SeenSet] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, context: str, owner: Tuple[str, ...]) -> Path:
+        digest = hashlib.sha1('\0'.join(owner).encode('utf-8')).hexdigest()[:16]
+        return self.directory / f"{context}-{digest}.i64"
+
+    def get(self, context: str, *owner: str) -> SeenSet:
+        """context 为 post/like/mix/music，owner 依次为 sec_uid / sec_uid, mix_id / music_id"""
+        key = (context,) + tuple(str(o or '') for o in owner)
+        with self._lock:
+            seen = self._sets.get(key)
+            if seen is None:
+                seen = SeenSet(self._path(context, key[1:]))
+                if len(seen) != self.db.count_aweme_ids(context, *key[1:]):
+                    seen.replace(self.db.get_aweme_ids(context, *key[1:]))
+                self._sets[key] = seen
+            return seen
+
+    def save(self) -> None:
+        with self._lock:
+            for seen in self._sets.values():
+                seen.save()
+
+    def close(self) -> None:
+        with self._lock:
+            for seen in self._sets.values():
+                seen.close()
+            self._sets.clear()
+
+
+if __name__ == '__main__':
+    import tempfile
+    import time
+
+    n = 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DataBase(os.path.join(tmp, 'data.db'))
+        ids = [7300000000000000000 + i * 7 for i in range(n)]
+        db.insert_user_posts_many('sec', ((i, {}) for i in ids))
+
+        start = time.perf_counter()
+        hits = sum(1 for i in ids if db.get_user_post('sec', i))
+        query = time.perf_counter() - start
+
+        index = SeenIndex(db)
+        start = time.perf_counter()
+        seen = index.get('post', 'sec')
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        assert sum(1 for i in ids if i in seen) == hits == n
+        lookup = time.perf_counter() - start
+        index.close()
+
+        # 再次运行：索引文件已存在，只做映射与一次计数
+        start = time.perf_counter()
+        index = SeenIndex(db)
+        assert ids[-1] in index.get('post', 'sec')
+        reload = time.perf_counter() - start
+        index.close()
+        db.close()
+
+    print(f"{n} 个作品  逐个查询: {query * 1000:.0f}ms  首次建立索引: {load * 1000:.0f}ms  "
+          f"再次加载: {reload * 1000:.0f}ms  索引查找: {lookup * 1000:.0f}ms")
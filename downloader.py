@@ -7,19 +7,28 @@
 """
 
 import asyncio
+import functools
 import json
 import logging
 import os
+import queue
 import re
 import sys
 import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import yaml
 
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块
+    resource = None
+
 # 第三方库
 try:
     import aiohttp
@@ -43,7 +52,15 @@ from apiproxy.douyin.urls import Urls
 from apiproxy.douyin.result import Result
 from apiproxy.common.utils import Utils
 from apiproxy.douyin.auth.cookie_manager import AutoCookieManager
-from apiproxy.douyin.database import DataBase
+from apiproxy.douyin.database import DataBase, DataBaseWriter
+from apiproxy.douyin.seen import SeenIndex
+from apiproxy.douyin.paginator import paginate
+from apiproxy.common.mirrors import mirror_stats
+from apiproxy.common import jsonlib
+from apiproxy.common.metadata import MetadataSink, MetadataSinks
+from apiproxy.common.musiccache import MusicCache, music_key
+from apiproxy.douyin.resolver import ShortLinkResolver
+from apiproxy.douyin.client import DouyinAsyncClient, DouyinAPIError
 
 # 配置日志
 logging.basicConfig(
@@ -54,6 +71,10 @@ logging.basicConfig(
         logging.StreamHandler()
     ]
 )
+# 作品原始 JSON 中的 aweme_id 字段（字符串或数字）
+_AWEME_ID = re.compile(rb'"aweme_id"\s*:\s*"?(\d+)')
+_ARRAY_END = re.compile(rb'\s*\]')
+
 logger = logging.getLogger(__name__)
 
 # Rich console
@@ -78,6 +99,31 @@ class DownloadStats:
         self.failed = 0
         self.skipped = 0
         self.start_time = time.time()
+        # 传输字节数与缓冲区占用（流式写入）
+        self.bytes_downloaded = 0
+        self.buffer_in_use = 0
+        self.buffer_peak = 0
+        # 事件循环卡顿：被阻塞超过阈值的次数与最大延迟（秒）
+        self.loop_stalls = 0
+        self.loop_lag_max = 0.0
+
+    def acquire_buffer(self, size: int):
+        """登记一个传输缓冲区"""
+        self.buffer_in_use += size
+        self.buffer_peak = max(self.buffer_peak, self.buffer_in_use)
+
+    def release_buffer(self, size: int):
+        """释放传输缓冲区"""
+        self.buffer_in_use -= size
+
+    @property
+    def peak_memory(self) -> int:
+        """进程峰值常驻内存（字节），不支持的平台返回 0"""
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak if sys.platform == 'darwin' else peak * 1024
     
     @property
     def success_rate(self):
@@ -94,7 +140,12 @@ class DownloadStats:
             'failed': self.failed,
             'skipped': self.skipped,
             'success_rate': f"{self.success_rate:.1f}%",
-            'elapsed_time': f"{self.elapsed_time:.1f}s"
+            'elapsed_time': f"{self.elapsed_time:.1f}s",
+            'downloaded_bytes': f"{self.bytes_downloaded / 1024 / 1024:.1f}MB",
+            'buffer_peak': f"{self.buffer_peak / 1024:.0f}KB",
+            'peak_memory': f"{self.peak_memory / 1024 / 1024:.1f}MB" if self.peak_memory else "N/A",
+            'loop_stalls': self.loop_stalls,
+            'loop_lag_max': f"{self.loop_lag_max * 1000:.0f}ms"
         }
 
 
@@ -135,6 +186,59 @@ class RetryManager:
         raise last_error
 
 
+class AwemePool:
+    """作品级并发池
+
+    保持最多 concurrency 个作品同时下载。设置 limit 时，已成功数与在途数
+    之和不会超过 limit：在途任务失败后才会补位提交新作品，因此最终成功数
+    与串行逐个下载时一致。
+    """
+    def __init__(self, concurrency: int, limit: int = 0):
+        self.concurrency = max(1, concurrency)
+        self.limit = limit or 0
+        self.submitted = 0
+        self.succeeded = 0
+        self._pending = set()
+    
+    @property
+    def limit_reached(self) -> bool:
+        return self.limit > 0 and self.succeeded >= self.limit
+    
+    async def submit(self, factory) -> bool:
+        """等待空位后提交任务；数量上限已满足时返回 False
+
+        Args:
+            factory: 无参函数，返回下载单个作品的协程（结果为是否成功）
+        """
+        while True:
+            if self.limit_reached:
+                return False
+            busy = len(self._pending)
+            if busy < self.concurrency and (self.limit <= 0 or self.succeeded + busy < self.limit):
+                break
+            await self._wait_any()
+        
+        self.submitted += 1
+        self._pending.add(asyncio.ensure_future(factory()))
+        return True
+    
+    async def join(self) -> int:
+        """等待全部在途任务完成，返回成功数"""
+        while self._pending:
+            await self._wait_any()
+        return self.succeeded
+    
+    async def _wait_any(self):
+        done, self._pending = await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                logger.error(f"作品下载任务异常: {task.exception()}")
+            elif task.result():
+                self.succeeded += 1
+
+
 class UnifiedDownloader:
     """统一下载器"""
     
@@ -158,11 +262,78 @@ class UnifiedDownloader:
         # 增量下载与数据库
         self.increase_cfg: Dict[str, Any] = self.config.get('increase', {}) or {}
         self.enable_database: bool = bool(self.config.get('database', True))
-        self.db: Optional[DataBase] = DataBase() if self.enable_database else None
+        self.db: Optional[DataBase] = DataBase(
+            self.config.get('database_path', 'data.db'),
+            self.config.get('database_compression', 'zlib') or None
+        ) if self.enable_database else None
+        # 增量判断使用内存映射的已下载索引，不再逐个查询数据库
+        self.seen: Optional[SeenIndex] = SeenIndex(self.db) if self.db else None
+        # 增量记录由后台线程批量写入，不在事件循环中执行 sqlite 提交
+        self.db_writer: Optional[DataBaseWriter] = DataBaseWriter(
+            self.db.path,
+            self.db.compression,
+            batch_size=int(self.config.get('database_batch_size', 100)),
+            flush_interval=float(self.config.get('database_flush_ms', 500)) / 1000
+        ) if self.db else None
         
         # 保存路径
         self.save_path = Path(self.config.get('path', './Downloaded'))
         self.save_path.mkdir(parents=True, exist_ok=True)
+
+        # 连接池：API 与 CDN 分开，延迟到事件循环内创建，run() 结束时关闭
+        self.network_cfg: Dict[str, Any] = self.config.get('network', {}) or {}
+        # 流式写入的分块大小，即单个传输占用的最大缓冲字节数
+        self.chunk_size = int(self.config.get('chunk_size', 64 * 1024))
+        # 单个作品内资源（视频/音乐/封面/图片）的并发下载数
+        self.media_concurrency = max(1, int(self.config.get('media_concurrency', 4)))
+        # 同时下载的作品数（用户主页/喜欢/合集/音乐列表）
+        self.concurrency = max(1, int(self.config.get('concurrency', 3)))
+        # 列表接口预取的页数（0 表示不预取）
+        self.prefetch_pages = max(0, int(self.config.get('prefetch_pages', 1)))
+        # 大文件分段下载：超过阈值(MB)的文件拆成 segments 个 Range 并行获取
+        self.segments = max(1, int(self.config.get('segments', 4)))
+        self.segment_threshold = int(float(self.config.get('segment_threshold_mb', 20)) * 1024 * 1024)
+        # CDN 镜像对冲：首选镜像超过 hedge_delay 秒仍未送达前 hedge_probe_kb KB 时并行请求下一个镜像，
+        # 既覆盖迟迟不返回响应头，也覆盖响应了但起步速度太慢；0 表示只在失败时切换
+        self.hedge_delay = float(self.config.get('hedge_delay', 1.0))
+        self.hedge_probe = max(0, int(float(self.config.get('hedge_probe_kb', 256)) * 1024))
+        self.mirror_stats = mirror_stats
+        # 分享链接解析缓存：短链接 -> 最终URL，有效期 redirect_cache_days 天
+        self.resolver = ShortLinkResolver(
+            self.config.get('redirect_cache', 'short_links.json'),
+            ttl=float(self.config.get('redirect_cache_days', 30)) * 86400
+        )
+        self._api_session: Optional[aiohttp.ClientSession] = None
+        self._cdn_session: Optional[aiohttp.ClientSession] = None
+        self._api_client: Optional[DouyinAsyncClient] = None
+        # 同步 Douyin 客户端在独立线程池中执行，避免阻塞事件循环
+        self.blocking_workers = max(1, int(self.config.get('blocking_workers', 4)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._blocking_semaphore: Optional[asyncio.Semaphore] = None
+        # 作品 JSON 直接写入接口返回的原始字节，跳过解析后再序列化
+        self.json_raw = bool(self.config.get('json_raw', False)) and bool(self.config.get('json', True))
+        # aweme_id -> (解析出的作品字典, 原始 JSON 切片)，写入后移除，超出上限时淘汰最早的
+        self._raw_awemes: OrderedDict = OrderedDict()
+        # 上限默认覆盖预取中的页、正在下载的页及并发余量（每页 35 个作品）
+        self.raw_cache_size = max(1, int(self.config.get('json_raw_cache', 0) or
+                                         self.concurrency * (self.prefetch_pages + 2) * 35))
+        # 作品 JSON 的保存方式：file 为每个作品一个文件，jsonl 为每个下载任务一个汇总文件
+        # （保存在 <path>/_metadata/<任务>/，任务结束即关闭，打开的文件数不随作者数增长）
+        self.json_mode = str(self.config.get('json_mode', 'file')).lower()
+        self.metadata: Optional[MetadataSinks] = None
+        if self.json_mode == 'jsonl':
+            self.metadata = MetadataSinks(
+                compression=self.config.get('json_compression') or None,
+                flush_every=int(self.config.get('json_flush_every', 50))
+            )
+        # 背景音乐缓存：同一音乐只下载一次，链接到各作品目录
+        self.music_cache: Optional[MusicCache] = None
+        if self.config.get('music_cache', True):
+            self.music_cache = MusicCache(
+                self.save_path / '.music_cache',
+                max_bytes=int(float(self.config.get('music_cache_mb', 512)) * 1024 * 1024)
+            )
+        self._music_locks: Dict[str, asyncio.Lock] = {}
         
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
@@ -193,6 +364,105 @@ class UnifiedDownloader:
         
         return config
     
+    def _create_session(self, limit_per_host: int,
+                        timeout: Optional[aiohttp.ClientTimeout] = None) -> aiohttp.ClientSession:
+        """创建带连接池的会话（keep-alive + DNS 缓存）"""
+        connector = aiohttp.TCPConnector(
+            limit=int(self.network_cfg.get('limit', 100)),
+            limit_per_host=limit_per_host,
+            ttl_dns_cache=int(self.network_cfg.get('dns_ttl', 300)),
+            keepalive_timeout=float(self.network_cfg.get('keepalive_timeout', 30)),
+            enable_cleanup_closed=True
+        )
+        if timeout is None:
+            return aiohttp.ClientSession(connector=connector)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    @property
+    def api_session(self) -> aiohttp.ClientSession:
+        """API 接口会话（www.douyin.com / iesdouyin.com）"""
+        if self._api_session is None or self._api_session.closed:
+            self._api_session = self._create_session(int(self.network_cfg.get('api_limit_per_host', 4)))
+        return self._api_session
+
+    @property
+    def cdn_session(self) -> aiohttp.ClientSession:
+        """媒体文件会话（视频/图片/音乐 CDN）"""
+        if self._cdn_session is None or self._cdn_session.closed:
+            # 大文件不设总超时（默认 300 秒会中断慢速的长下载），只限制建连与两次读取之间的间隔，
+            # 卡住的镜像连接会报错而不是无限期挂起
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=float(self.network_cfg.get('cdn_connect_timeout', 10)),
+                sock_read=float(self.network_cfg.get('cdn_read_timeout', 30))
+            )
+            self._cdn_session = self._create_session(int(self.network_cfg.get('cdn_limit_per_host', 8)), timeout)
+        return self._cdn_session
+
+    @property
+    def api_client(self) -> DouyinAsyncClient:
+        """抖音接口客户端（共用 API 连接池、请求头与限速器）"""
+        if self._api_client is None:
+            self._api_client = DouyinAsyncClient(
+                session=self.api_session,
+                headers=self.headers,
+                prefetch=self.prefetch_pages,
+                rate_limiter=self.rate_limiter,
+                # api_session 属于当前事件循环，同步调用（get_sync）也必须投递到这里
+                loop=asyncio.get_running_loop()
+            )
+        return self._api_client
+
+    async def close(self):
+        """关闭连接池"""
+        for session in (self._api_session, self._cdn_session):
+            if session is not None and not session.closed:
+                await session.close()
+        self._api_session = None
+        self._cdn_session = None
+        self._api_client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.resolver.flush()
+        if self.metadata is not None:
+            self.metadata.close()
+        # 先写完所有增量记录，再保存已下载索引
+        if self.db_writer is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.db_writer.close)
+            self.db_writer = None
+        if self.seen is not None:
+            self.seen.save()
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """在线程池中执行阻塞调用
+
+        同时执行的调用数不超过 blocking_workers，超出的调用在事件循环里
+        等待（可被取消），而不是堆积在线程池队列中。
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.blocking_workers,
+                                                thread_name_prefix='douyin-api')
+            self._blocking_semaphore = asyncio.Semaphore(self.blocking_workers)
+        loop = asyncio.get_running_loop()
+        async with self._blocking_semaphore:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _watch_loop(self, interval: float = 0.1, threshold: float = 0.25):
+        """监测事件循环卡顿
+
+        定时休眠并比较实际唤醒时间，延迟超过 threshold 秒计为一次卡顿。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = loop.time() - start - interval
+            if lag > threshold:
+                self.stats.loop_stalls += 1
+                logger.debug(f"事件循环被阻塞 {lag * 1000:.0f}ms")
+            self.stats.loop_lag_max = max(self.stats.loop_lag_max, lag)
+
     def _build_cookie_string(self) -> str:
         """构建Cookie字符串"""
         if isinstance(self.cookies, str):
@@ -267,9 +537,8 @@ class UnifiedDownloader:
         """解析短链接"""
         if 'v.douyin.com' in url:
             try:
-                # 使用同步请求获取重定向
-                response = requests.get(url, headers=self.headers, allow_redirects=True, timeout=10)
-                final_url = response.url
+                # 只跟随重定向，不下载落地页，结果走磁盘缓存
+                final_url = await self.resolver.resolve_async(self.api_session, url, headers=self.headers)
                 logger.info(f"解析短链接: {url} -> {final_url}")
                 return final_url
             except Exception as e:
@@ -356,50 +625,51 @@ class UnifiedDownloader:
         if not self.db:
             return False
         aweme_id = self._get_aweme_id_from_info(info)
-        if not aweme_id:
+        if not aweme_id or not aweme_id.isdigit() or not self.increase_cfg.get(context, False):
             return False
 
         try:
-            if context == 'post' and self.increase_cfg.get('post', False):
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                return bool(self.db.get_user_post(sec, int(aweme_id)) if aweme_id.isdigit() else None)
-            if context == 'like' and self.increase_cfg.get('like', False):
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                return bool(self.db.get_user_like(sec, int(aweme_id)) if aweme_id.isdigit() else None)
-            if context == 'mix' and self.increase_cfg.get('mix', False):
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                mid = mix_id or ''
-                return bool(self.db.get_mix(sec, mid, int(aweme_id)) if aweme_id.isdigit() else None)
-            if context == 'music' and self.increase_cfg.get('music', False):
-                mid = music_id or ''
-                return bool(self.db.get_music(mid, int(aweme_id)) if aweme_id.isdigit() else None)
+            owner = self._increment_owner(context, info, mix_id, music_id, sec_uid)
+            return aweme_id in self.seen.get(context, *owner)
         except Exception:
             return False
-        return False
 
-    def _record_increment(self, context: str, info: Dict, mix_id: Optional[str] = None, music_id: Optional[str] = None, sec_uid: Optional[str] = None):
-        """下载成功后写入数据库记录"""
+    def _increment_owner(self, context: str, info: Dict, mix_id: Optional[str] = None, music_id: Optional[str] = None, sec_uid: Optional[str] = None) -> Tuple[str, ...]:
+        """增量记录的所有者：post/like 为 sec_uid，mix 为 (sec_uid, mix_id)，music 为 music_id"""
+        if context == 'music':
+            return (music_id or '',)
+        sec = sec_uid or self._get_sec_uid_from_info(info) or ''
+        if context == 'mix':
+            return (sec, mix_id or '')
+        return (sec,)
+
+    async def _record_increment(self, context: str, info: Dict, mix_id: Optional[str] = None, music_id: Optional[str] = None, sec_uid: Optional[str] = None):
+        """下载成功后写入数据库记录
+
+        记录交给写入线程；队列已满（写入线程跟不上）时只让当前作品在线程池中
+        等待空位，不阻塞事件循环。
+        """
         if not self.db:
             return
         aweme_id = self._get_aweme_id_from_info(info)
         if not aweme_id or not aweme_id.isdigit():
             return
+        if context not in ('post', 'like', 'mix', 'music'):
+            return
+        owner = self._increment_owner(context, info, mix_id, music_id, sec_uid)
+        # 已下载索引立即更新，与数据库写入互不影响
         try:
-            if context == 'post':
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                self.db.insert_user_post(sec, int(aweme_id), info)
-            elif context == 'like':
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                self.db.insert_user_like(sec, int(aweme_id), info)
-            elif context == 'mix':
-                sec = sec_uid or self._get_sec_uid_from_info(info) or ''
-                mid = mix_id or ''
-                self.db.insert_mix(sec, mid, int(aweme_id), info)
-            elif context == 'music':
-                mid = music_id or ''
-                self.db.insert_music(mid, int(aweme_id), info)
-        except Exception:
-            pass
+            self.seen.get(context, *owner).add(aweme_id)
+        except Exception as e:
+            logger.warning(f"更新已下载索引失败 {context} {aweme_id}: {e}")
+        record = (context, owner, int(aweme_id), info)
+        try:
+            try:
+                self.db_writer.put_nowait(*record)
+            except queue.Full:
+                await asyncio.get_running_loop().run_in_executor(None, self.db_writer.put, *record)
+        except Exception as e:
+            logger.warning(f"写入增量记录失败 {context} {aweme_id}: {e}")
     
     async def download_single_video(self, url: str, progress=None) -> bool:
         """下载单个视频/图文"""
@@ -468,7 +738,7 @@ class UnifiedDownloader:
             from apiproxy.douyin.douyin import Douyin
             
             # 创建 Douyin 实例
-            dy = Douyin(database=False)
+            dy = Douyin(database=False, resolver=self.resolver, client=self.api_client)
             
             # 设置我们的 cookies 到 douyin_headers
             if hasattr(self, 'cookies') and self.cookies:
@@ -479,8 +749,8 @@ class UnifiedDownloader:
                     logger.info(f"设置 Cookie 到 Douyin 类: {cookie_str[:100]}...")
             
             try:
-                # 使用现有的成功实现
-                result = dy.getAwemeInfo(video_id)
+                # 使用现有的成功实现（同步请求，放到线程池执行）
+                result = await self._run_blocking(dy.getAwemeInfo, video_id)
                 if result:
                     logger.info(f"Douyin 类成功获取视频信息: {result.get('desc', '')[:30]}")
                     return result
@@ -510,36 +780,35 @@ class UnifiedDownloader:
                 'Connection': 'keep-alive'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(fallback_url, headers=headers, timeout=15) as response:
-                    logger.info(f"备用接口响应状态: {response.status}")
-                    if response.status != 200:
-                        logger.error(f"备用接口请求失败，状态码: {response.status}")
-                        return None
+            async with self.api_session.get(fallback_url, headers=headers, timeout=15) as response:
+                logger.info(f"备用接口响应状态: {response.status}")
+                if response.status != 200:
+                    logger.error(f"备用接口请求失败，状态码: {response.status}")
+                    return None
                     
-                    text = await response.text()
-                    logger.info(f"备用接口响应内容长度: {len(text)}")
+                text = await response.text()
+                logger.info(f"备用接口响应内容长度: {len(text)}")
                     
-                    if not text:
-                        logger.error("备用接口响应为空")
-                        return None
+                if not text:
+                    logger.error("备用接口响应为空")
+                    return None
                     
-                    try:
-                        data = json.loads(text)
-                        logger.info(f"备用接口返回数据: {data}")
+                try:
+                    data = jsonlib.loads(text)
+                    logger.info(f"备用接口返回数据: {data}")
                         
-                        item_list = (data or {}).get('item_list') or []
-                        if item_list:
-                            aweme_detail = item_list[0]
-                            logger.info("备用接口成功获取视频信息")
-                            return aweme_detail
-                        else:
-                            logger.error("备用接口返回的数据中没有 item_list")
+                    item_list = (data or {}).get('item_list') or []
+                    if item_list:
+                        aweme_detail = item_list[0]
+                        logger.info("备用接口成功获取视频信息")
+                        return aweme_detail
+                    else:
+                        logger.error("备用接口返回的数据中没有 item_list")
                             
-                    except json.JSONDecodeError as e:
-                        logger.error(f"备用接口JSON解析失败: {e}")
-                        logger.error(f"原始响应内容: {text}")
-                        return None
+                except json.JSONDecodeError as e:
+                    logger.error(f"备用接口JSON解析失败: {e}")
+                    logger.error(f"原始响应内容: {text}")
+                    return None
                         
         except Exception as e:
             logger.error(f"备用接口获取视频信息失败: {e}")
@@ -556,8 +825,25 @@ class UnifiedDownloader:
         ]
         return '&'.join(params)
     
-    async def _download_media_files(self, video_info: Dict, progress=None) -> bool:
-        """下载媒体文件"""
+    def _open_metadata(self, context: str, owner: str = '') -> Optional[MetadataSink]:
+        """取得下载任务（post/like/mix/music + 所有者ID，单个作品为 video）的元数据汇总文件"""
+        if self.metadata is None:
+            return None
+        name = f"{context}_{owner}" if owner else context
+        return self.metadata.get(self.save_path / '_metadata' / name)
+
+    def _close_metadata(self, sink: Optional[MetadataSink]) -> None:
+        """下载任务结束时关闭其元数据文件"""
+        if sink is not None:
+            self.metadata.close(sink.directory)
+
+    async def _download_media_files(self, video_info: Dict, progress=None,
+                                    metadata: Optional[MetadataSink] = None) -> bool:
+        """下载媒体文件
+
+        metadata 为所属下载任务的元数据汇总文件（json_mode 为 jsonl 时），
+        不指定时写入单个作品共用的汇总文件。
+        """
         try:
             # 判断类型
             is_image = bool(video_info.get('images'))
@@ -585,48 +871,60 @@ class UnifiedDownloader:
             save_dir = self.save_path / author_name / folder_name
             save_dir.mkdir(parents=True, exist_ok=True)
             
-            success = True
+            # 收集本作品的全部资源，统一并发下载
+            # (候选镜像URL列表, 保存路径, 成功日志, 是否影响作品的成功状态, 音乐缓存key)
+            assets = []
             
             if is_image:
                 # 下载图文（无水印）
                 images = video_info.get('images', [])
                 for i, img in enumerate(images):
-                    img_url = self._get_best_quality_url(img.get('url_list', []))
-                    if img_url:
+                    img_urls = self._get_best_quality_urls(img.get('url_list', []))
+                    if img_urls:
                         file_path = save_dir / f"image_{i+1}.jpg"
-                        if await self._download_file(img_url, file_path):
-                            logger.info(f"下载图片 {i+1}/{len(images)}: {file_path.name}")
-                        else:
-                            success = False
+                        assets.append((img_urls, file_path, f"下载图片 {i+1}/{len(images)}: {file_path.name}", True, None))
             else:
                 # 下载视频（无水印）
-                video_url = self._get_no_watermark_url(video_info)
-                if video_url:
+                video_urls = self._get_no_watermark_urls(video_info)
+                if video_urls:
                     file_path = save_dir / f"{folder_name}.mp4"
-                    if await self._download_file(video_url, file_path):
-                        logger.info(f"下载视频: {file_path.name}")
-                    else:
-                        success = False
+                    assets.append((video_urls, file_path, f"下载视频: {file_path.name}", True, None))
                 
                 # 下载音频
                 if self.config.get('music', True):
-                    music_url = self._get_music_url(video_info)
-                    if music_url:
+                    music_urls = self._get_music_urls(video_info)
+                    if music_urls:
                         file_path = save_dir / f"{folder_name}_music.mp3"
-                        await self._download_file(music_url, file_path)
+                        assets.append((music_urls, file_path, None, False, music_key(video_info.get('music'))))
             
             # 下载封面
             if self.config.get('cover', True):
-                cover_url = self._get_cover_url(video_info)
-                if cover_url:
+                cover_urls = self._get_cover_urls(video_info)
+                if cover_urls:
                     file_path = save_dir / f"{folder_name}_cover.jpg"
-                    await self._download_file(cover_url, file_path)
+                    assets.append((cover_urls, file_path, None, False, None))
+            
+            semaphore = asyncio.Semaphore(self.media_concurrency)
+            results = await asyncio.gather(*[
+                self._download_asset(semaphore, urls, file_path, message, key)
+                for urls, file_path, message, _, key in assets
+            ])
+            # 音乐、封面失败不影响作品的成功状态
+            success = all(ok for ok, (_, _, _, required, _) in zip(results, assets) if required)
             
             # 保存JSON数据
             if self.config.get('json', True):
-                json_path = save_dir / f"{folder_name}_data.json"
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(video_info, f, ensure_ascii=False, indent=2)
+                aweme_id = str(video_info.get('aweme_id'))
+                aweme, raw = self._raw_awemes.pop(aweme_id, (None, None))
+                # 只有同一个字典对象（即直接来自该列表页）才使用原始数据
+                record = raw if aweme is video_info else video_info
+                if self.metadata is not None:
+                    (metadata or self._open_metadata('video')).write(aweme_id, record)
+                elif record is raw:
+                    with open(save_dir / f"{folder_name}_data.json", 'wb') as f:
+                        f.write(raw)
+                else:
+                    jsonlib.dump_file(save_dir / f"{folder_name}_data.json", video_info)
             
             return success
             
@@ -634,8 +932,38 @@ class UnifiedDownloader:
             logger.error(f"下载媒体文件失败: {e}")
             return False
     
-    def _get_no_watermark_url(self, video_info: Dict) -> Optional[str]:
-        """获取无水印视频URL"""
+    async def _download_asset(self, semaphore: asyncio.Semaphore, urls: List[str], file_path: Path, message: Optional[str] = None,
+                              music_key: Optional[str] = None) -> bool:
+        """在作品级信号量限制下下载单个资源，music_key 不为空时经过音乐缓存"""
+        async with semaphore:
+            if music_key and self.music_cache is not None:
+                ok = await self._download_cached_music(music_key, urls, file_path)
+            else:
+                ok = await self._download_file(urls, file_path)
+        if ok and message:
+            logger.info(message)
+        return ok
+
+    async def _download_cached_music(self, music_key: str, urls: List[str], file_path: Path) -> bool:
+        """背景音乐只下载一次到缓存，再链接到作品目录
+
+        同一音乐的并发请求按 key 串行：第一个下载，其余等待后直接命中缓存。
+        """
+        if file_path.exists():
+            return True
+        lock = self._music_locks.setdefault(music_key, asyncio.Lock())
+        async with lock:
+            if self.music_cache.link(music_key, file_path):
+                return True
+            part = self.music_cache.part_path(music_key)
+            # 上次中断留下的半个文件会被当成已存在而跳过，先删除
+            part.unlink(missing_ok=True)
+            if not await self._download_file(urls, part):
+                return False
+            return self.music_cache.add(music_key, file_path)
+
+    def _get_no_watermark_urls(self, video_info: Dict) -> List[str]:
+        """获取无水印视频的候选镜像URL"""
         try:
             # 优先使用play_addr_h264
             play_addr = video_info.get('video', {}).get('play_addr_h264') or \
@@ -645,78 +973,307 @@ class UnifiedDownloader:
                 url_list = play_addr.get('url_list', [])
                 if url_list:
                     # 替换URL以获取无水印版本
-                    url = url_list[0]
-                    url = url.replace('playwm', 'play')
-                    url = url.replace('720p', '1080p')
-                    return url
+                    return self.mirror_stats.order(
+                        [url.replace('playwm', 'play').replace('720p', '1080p') for url in url_list])
             
             # 备用：download_addr
             download_addr = video_info.get('video', {}).get('download_addr')
             if download_addr:
-                url_list = download_addr.get('url_list', [])
-                if url_list:
-                    return url_list[0]
+                return self.mirror_stats.order(download_addr.get('url_list', []))
                     
         except Exception as e:
             logger.error(f"获取无水印URL失败: {e}")
         
-        return None
+        return []
     
-    def _get_best_quality_url(self, url_list: List[str]) -> Optional[str]:
-        """获取最高质量的URL"""
+    def _get_best_quality_urls(self, url_list: List[str]) -> List[str]:
+        """获取候选镜像URL，最高质量的排在最前
+
+        镜像耗时排序只在同一质量的地址之间进行，不会让更快的低质量地址排到前面。
+        """
         if not url_list:
-            return None
+            return []
         
         # 优先选择包含特定关键词的URL
         for keyword in ['1080', 'origin', 'high']:
-            for url in url_list:
-                if keyword in url:
-                    return url
+            best = [url for url in url_list if keyword in url]
+            if best:
+                rest = [url for url in url_list if keyword not in url]
+                return self.mirror_stats.order(best) + self.mirror_stats.order(rest)
         
-        # 返回第一个
-        return url_list[0]
+        return self.mirror_stats.order(url_list)
     
-    def _get_music_url(self, video_info: Dict) -> Optional[str]:
-        """获取音乐URL"""
+    def _get_music_urls(self, video_info: Dict) -> List[str]:
+        """获取音乐的候选镜像URL"""
         try:
             music = video_info.get('music', {})
             play_url = music.get('play_url', {})
-            url_list = play_url.get('url_list', [])
-            return url_list[0] if url_list else None
+            return self.mirror_stats.order(play_url.get('url_list', []))
         except:
-            return None
+            return []
     
-    def _get_cover_url(self, video_info: Dict) -> Optional[str]:
-        """获取封面URL"""
+    def _get_cover_urls(self, video_info: Dict) -> List[str]:
+        """获取封面的候选镜像URL"""
         try:
             cover = video_info.get('video', {}).get('cover', {})
             url_list = cover.get('url_list', [])
-            return self._get_best_quality_url(url_list)
+            return self._get_best_quality_urls(url_list)
         except:
-            return None
+            return []
     
-    async def _download_file(self, url: str, save_path: Path) -> bool:
-        """下载文件"""
+    async def _download_file(self, urls, save_path: Path) -> bool:
+        """下载文件
+
+        urls 为同一资源的候选镜像列表（也可以是单个URL），已由 _get_*_urls
+        按质量与历史耗时排好序，按此顺序对冲请求，取最先响应的镜像。
+        """
+        if isinstance(urls, str):
+            urls = [urls]
         try:
             if save_path.exists():
                 logger.info(f"文件已存在，跳过: {save_path.name}")
                 return True
+            if not urls:
+                return False
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        with open(save_path, 'wb') as f:
-                            f.write(content)
-                        return True
-                    else:
-                        logger.error(f"下载失败，状态码: {response.status}")
-                        return False
+            opened = await self._open_hedged(urls)
+            if opened is None:
+                return False
+            response, head = opened
+            async with response:
+                # 大文件按字节范围多连接并行下载：由对冲胜出的响应头决定，不额外探测
+                size = self._segment_size(response)
+                if not size:
+                    await self._stream_to_file(response, save_path, head)
+                    return True
+                if await self._download_segmented(response, save_path, size, head):
+                    return True
+
+            # 首个响应已被分段下载读取了一部分，重新请求整个文件
+            logger.info(f"分段下载不可用，改用单连接: {save_path.name}")
+            opened = await self._open_hedged(urls)
+            if opened is None:
+                return False
+            response, head = opened
+            async with response:
+                await self._stream_to_file(response, save_path, head)
+            return True
                         
         except Exception as e:
-            logger.error(f"下载文件失败 {url}: {e}")
+            logger.error(f"下载文件失败 {urls[0] if urls else ''}: {e}")
             return False
     
+    async def _open_hedged(self, urls: List[str]):
+        """对冲请求多个镜像，返回最先送达开头 hedge_probe 字节的 (response, 已读取的开头)
+
+        先请求排在最前的镜像，超过 hedge_delay 秒仍未读完开头（没有响应头、
+        起步速度过慢或请求失败）时再启动下一个镜像并行竞争，胜出后取消其余
+        请求。即最低起步速度为 hedge_probe / hedge_delay；文件比 hedge_probe 小
+        时读完即胜出。各镜像读完开头的耗时计入 mirror_stats，影响后续的镜像
+        排序。调用方需把返回的开头字节写在响应体之前。全部失败时返回 None。
+        """
+        # 胜出镜像读完开头的耗时
+        winner_latency = None
+
+        async def open_one(url: str):
+            nonlocal winner_latency
+            start = time.monotonic()
+            try:
+                response = await self.cdn_session.get(url, headers=self.headers)
+            except asyncio.CancelledError:
+                # 被更快的镜像淘汰：至少与胜出镜像一样慢，否则刚启动就被取消的镜像
+                # 会得到接近 0 的耗时而排到最前；没有胜出者（整体被取消）时不计入
+                if winner_latency is not None:
+                    self.mirror_stats.record(url, max(time.monotonic() - start, winner_latency))
+                raise
+            except Exception:
+                self.mirror_stats.record_failure(url)
+                raise
+            if response.status != 200:
+                response.release()
+                self.mirror_stats.record_failure(url)
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=response.reason or ''
+                )
+            try:
+                head = await self._read_head(response)
+            except asyncio.CancelledError:
+                response.release()
+                if winner_latency is not None:
+                    self.mirror_stats.record(url, max(time.monotonic() - start, winner_latency))
+                raise
+            except Exception:
+                response.release()
+                self.mirror_stats.record_failure(url)
+                raise
+            elapsed = time.monotonic() - start
+            self.mirror_stats.record(url, elapsed)
+            if winner_latency is None:
+                winner_latency = elapsed
+            return response, head
+
+        remaining = list(urls)
+        pending = set()
+        winner = None
+        last_error = None
+        try:
+            while winner is None and (remaining or pending):
+                if remaining:
+                    pending.add(asyncio.ensure_future(open_one(remaining.pop(0))))
+                # 对冲关闭时只在失败后才尝试下一个镜像
+                timeout = self.hedge_delay if remaining and self.hedge_delay > 0 else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                    elif winner is None:
+                        winner = task.result()
+                    else:
+                        task.result()[0].release()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                for result in results:
+                    if isinstance(result, tuple):
+                        result[0].release()
+
+        if winner is None:
+            status = getattr(last_error, 'status', None)
+            if status:
+                logger.error(f"下载失败，状态码: {status}")
+            elif last_error is not None:
+                logger.error(f"下载失败: {last_error}")
+        return winner
+
+    async def _read_head(self, response) -> bytes:
+        """读取响应体开头的 hedge_probe 字节（响应体更短时读到结束为止）"""
+        if self.hedge_probe <= 0:
+            return b''
+        try:
+            return await response.content.readexactly(self.hedge_probe)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+    
+    async def _stream_to_file(self, response, save_path: Path, head: bytes = b'') -> int:
+        """将响应分块写入文件，head 为已从响应中读出的开头
+
+        先写入 .part 临时文件，完成后再改名，避免中断留下的残缺文件
+        被当作已下载。
+        """
+        tmp_path = save_path.with_name(save_path.name + '.part')
+        try:
+            with open(tmp_path, 'wb') as f:
+                written = await self._copy_stream(response, f, head=head)
+            os.replace(tmp_path, save_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return written
+
+    async def _copy_stream(self, response, f, limit: Optional[int] = None, head: bytes = b'') -> int:
+        """把响应体写入已打开的文件（从当前位置开始），limit 不为空时最多写入 limit 字节
+
+        head 为对冲时已读出的开头，先于剩余响应体写入。复用一块固定大小的
+        缓冲区（通过 memoryview 拼接小块），单个传输占用的内存不超过 chunk_size
+        （不含 head）。
+        """
+        chunk_size = self.chunk_size
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        filled = 0
+        written = 0
+
+        def put(chunk) -> bool:
+            """写入一块数据，达到 limit 时返回 True"""
+            nonlocal filled, written
+            data = memoryview(chunk)
+            if limit is not None:
+                data = data[:limit - written - filled]
+            while data:
+                n = min(len(data), chunk_size - filled)
+                view[filled:filled + n] = data[:n]
+                filled += n
+                data = data[n:]
+                if filled == chunk_size:
+                    f.write(view)
+                    written += filled
+                    filled = 0
+            return limit is not None and written + filled >= limit
+
+        self.stats.acquire_buffer(chunk_size)
+        try:
+            if not (head and put(head)):
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    if put(chunk):
+                        break
+            if filled:
+                f.write(view[:filled])
+                written += filled
+        finally:
+            view.release()
+            self.stats.release_buffer(chunk_size)
+
+        self.stats.bytes_downloaded += written
+        return written
+
+    def _segment_size(self, response) -> int:
+        """响应可以分段下载时返回文件大小，否则返回 0
+
+        要求 200 响应带 Content-Length、声明 Accept-Ranges: bytes、未压缩，且大小超过阈值。
+        """
+        if self.segments <= 1 or response.status != 200:
+            return 0
+        if response.headers.get('Accept-Ranges', '').lower() != 'bytes' or 'Content-Encoding' in response.headers:
+            return 0
+        size = response.content_length or 0
+        return size if size >= self.segment_threshold else 0
+
+    async def _download_segmented(self, response, save_path: Path, size: int, head: bytes = b'') -> bool:
+        """多连接分段下载
+
+        第一个分段直接读取已打开的 response（head 为已读出的开头），其余分段向重定向后的同一地址
+        发 Range 请求。预分配完整大小的 .part 文件，每个分段用独立的文件句柄
+        定位到各自偏移量写入，全部完成后改名。任一分段被服务器忽略 Range
+        或长度不符时返回 False，由调用方退回单连接下载。
+        """
+        url = str(response.url)
+        tmp_path = save_path.with_name(save_path.name + '.part')
+        step = -(-size // self.segments)
+        ranges = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.truncate(size)
+            results = await asyncio.gather(
+                self._write_range(response, tmp_path, *ranges[0], head=head),
+                *[self._download_range(url, tmp_path, start, end) for start, end in ranges[1:]]
+            )
+            if all(results):
+                os.replace(tmp_path, save_path)
+                return True
+        except Exception as e:
+            logger.warning(f"分段下载失败 {save_path.name}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+    async def _download_range(self, url: str, tmp_path: Path, start: int, end: int) -> bool:
+        """下载一个字节范围并写入文件对应位置"""
+        headers = {**self.headers, 'Range': f'bytes={start}-{end}'}
+        async with self.cdn_session.get(url, headers=headers) as response:
+            if response.status != 206:
+                return False
+            return await self._write_range(response, tmp_path, start, end)
+
+    async def _write_range(self, response, tmp_path: Path, start: int, end: int, head: bytes = b'') -> bool:
+        """把响应体（head 在前）的前 end - start + 1 字节写入文件的 start 偏移处"""
+        with open(tmp_path, 'r+b') as f:
+            f.seek(start)
+            written = await self._copy_stream(response, f, limit=end - start + 1, head=head)
+        return written == end - start + 1
+
     async def download_user_page(self, url: str) -> bool:
         """下载用户主页内容"""
         try:
@@ -761,8 +1318,8 @@ class UnifiedDownloader:
     async def _download_user_posts(self, user_id: str):
         """下载用户发布的作品"""
         max_count = self.config.get('number', {}).get('post', 0)
-        cursor = 0
-        downloaded = 0
+        pool = AwemePool(self.concurrency, max_count)
+        metadata = self._open_metadata('post', user_id)
         
         console.print(f"\n[green]开始下载用户发布的作品...[/green]")
         
@@ -774,99 +1331,71 @@ class UnifiedDownloader:
             TimeRemainingColumn(),
             console=console
         ) as progress:
-            
-            while True:
-                # 限速
-                await self.rate_limiter.acquire()
-                
-                # 获取作品列表
-                posts_data = await self._fetch_user_posts(user_id, cursor)
-                if not posts_data:
-                    break
+
+            async def handle(aweme: Dict, index: int) -> bool:
+                # 创建下载任务
+                task_id = progress.add_task(f"下载作品 {index}", total=100)
                 
-                aweme_list = posts_data.get('aweme_list', [])
-                if not aweme_list:
-                    break
+                # 下载
+                success = await self._download_media_files(aweme, progress, metadata)
                 
-                # 下载作品
-                for aweme in aweme_list:
-                    if max_count > 0 and downloaded >= max_count:
-                        console.print(f"[yellow]已达到下载数量限制: {max_count}[/yellow]")
-                        return
+                if success:
+                    self.stats.success += 1  # 增加成功计数
+                    progress.update(task_id, completed=100)
+                    await self._record_increment('post', aweme, sec_uid=user_id)
+                else:
+                    self.stats.failed += 1  # 增加失败计数
+                    progress.update(task_id, description="[red]下载失败[/red]")
+                return success
+            
+            # 获取作品列表（边获取边下载）
+            awemes = self._iter_user_posts(user_id)
+            try:
+                # 下载作品（最多 concurrency 个同时进行）
+                async for aweme in awemes:
+                    if pool.limit_reached:
+                        break
                     
                     # 时间过滤
                     if not self._check_time_filter(aweme):
                         continue
                     
-                    # 创建下载任务
-                    task_id = progress.add_task(
-                        f"下载作品 {downloaded + 1}", 
-                        total=100
-                    )
-                    
                     # 增量判断
                     if self._should_skip_increment('post', aweme, sec_uid=user_id):
                         continue
                     
-                    # 下载
-                    success = await self._download_media_files(aweme, progress)
-                    
-                    if success:
-                        downloaded += 1
-                        self.stats.success += 1  # 增加成功计数
-                        progress.update(task_id, completed=100)
-                        self._record_increment('post', aweme, sec_uid=user_id)
-                    else:
-                        self.stats.failed += 1  # 增加失败计数
-                        progress.update(task_id, description="[red]下载失败[/red]")
-                
-                # 检查是否有更多
-                if not posts_data.get('has_more'):
-                    break
-                
-                cursor = posts_data.get('max_cursor', 0)
+                    if not await pool.submit(lambda a=aweme, n=pool.submitted + 1: handle(a, n)):
+                        break
+            finally:
+                await awemes.aclose()
+                await pool.join()
+                self._close_metadata(metadata)
         
-        console.print(f"[green]✅ 用户作品下载完成，共下载 {downloaded} 个[/green]")
+        if pool.limit_reached:
+            console.print(f"[yellow]已达到下载数量限制: {max_count}[/yellow]")
+        console.print(f"[green]✅ 用户作品下载完成，共下载 {pool.succeeded} 个[/green]")
     
+
+    def _paginate(self, fetch_page, list_field: str = 'aweme_list', cursor_field: str = 'cursor'):
+        """按配置的预取深度与限速器翻页，逐条产出列表项"""
+        return paginate(
+            fetch_page,
+            list_field=list_field,
+            cursor_field=cursor_field,
+            prefetch=self.prefetch_pages,
+            rate_limiter=self.rate_limiter
+        )
+    
+    def _iter_user_posts(self, user_id: str):
+        """逐页获取用户作品（后台预取下一页），每取回一页即可开始下载"""
+        return self._paginate(lambda c: self._fetch_user_posts(user_id, c), cursor_field='max_cursor')
+
     async def _fetch_user_posts(self, user_id: str, cursor: int = 0) -> Optional[Dict]:
-        """获取用户作品列表"""
-        try:
-            # 直接使用 Douyin 类的 getUserInfo 方法，就像 DouYinCommand.py 那样
-            from apiproxy.douyin.douyin import Douyin
-            
-            # 创建 Douyin 实例
-            dy = Douyin(database=False)
-            
-            # 获取用户作品列表
-            result = dy.getUserInfo(
-                user_id, 
-                "post", 
-                35, 
-                0,  # 不限制数量
-                False,  # 不启用增量
-                "",  # start_time
-                ""   # end_time
-            )
-            
-            if result:
-                logger.info(f"Douyin 类成功获取用户作品列表，共 {len(result)} 个作品")
-                # 转换为期望的格式
-                return {
-                    'status_code': 0,
-                    'aweme_list': result,
-                    'max_cursor': cursor,
-                    'has_more': False
-                }
-            else:
-                logger.error("Douyin 类返回空结果")
-                return None
-                
-        except Exception as e:
-            logger.error(f"获取用户作品列表失败: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        return None
+        """获取用户发布的作品列表"""
+        return await self._fetch_list_page(
+            self.urls_helper.USER_POST, "用户作品列表",
+            sec_user_id=user_id, max_cursor=cursor, count=35
+        )
     
     async def _download_user_likes(self, user_id: str):
         """下载用户喜欢的作品"""
@@ -875,8 +1404,8 @@ class UnifiedDownloader:
             max_count = int(self.config.get('number', {}).get('like', 0))
         except Exception:
             max_count = 0
-        cursor = 0
-        downloaded = 0
+        pool = AwemePool(self.concurrency, max_count)
+        metadata = self._open_metadata('like', user_id)
 
         console.print(f"\n[green]开始下载用户喜欢的作品...[/green]")
 
@@ -889,109 +1418,103 @@ class UnifiedDownloader:
             console=console
         ) as progress:
 
-            while True:
-                # 限速
-                await self.rate_limiter.acquire()
+            async def handle(aweme: Dict, index: int) -> bool:
+                task_id = progress.add_task(f"下载喜欢 {index}", total=100)
 
-                # 获取喜欢列表
-                likes_data = await self._fetch_user_likes(user_id, cursor)
-                if not likes_data:
-                    break
+                success = await self._download_media_files(aweme, progress, metadata)
 
-                aweme_list = likes_data.get('aweme_list', [])
-                if not aweme_list:
-                    break
+                if success:
+                    progress.update(task_id, completed=100)
+                    await self._record_increment('like', aweme, sec_uid=user_id)
+                else:
+                    progress.update(task_id, description="[red]下载失败[/red]")
+                return success
 
+            # 获取喜欢列表（后台预取下一页）
+            awemes = self._paginate(lambda c: self._fetch_user_likes(user_id, c), cursor_field='max_cursor')
+            try:
                 # 下载作品
-                for aweme in aweme_list:
-                    if max_count > 0 and downloaded >= max_count:
-                        console.print(f"[yellow]已达到下载数量限制: {max_count}[/yellow]")
-                        return
+                async for aweme in awemes:
+                    if pool.limit_reached:
+                        break
 
                     if not self._check_time_filter(aweme):
                         continue
 
-                    task_id = progress.add_task(
-                        f"下载喜欢 {downloaded + 1}",
-                        total=100
-                    )
-
                     # 增量判断
                     if self._should_skip_increment('like', aweme, sec_uid=user_id):
                         continue
 
-                    success = await self._download_media_files(aweme, progress)
-
-                    if success:
-                        downloaded += 1
-                        progress.update(task_id, completed=100)
-                        self._record_increment('like', aweme, sec_uid=user_id)
-                    else:
-                        progress.update(task_id, description="[red]下载失败[/red]")
-
-                # 翻页
-                if not likes_data.get('has_more'):
-                    break
-                cursor = likes_data.get('max_cursor', 0)
+                    if not await pool.submit(lambda a=aweme, n=pool.submitted + 1: handle(a, n)):
+                        break
+            finally:
+                await awemes.aclose()
+                await pool.join()
+                self._close_metadata(metadata)
 
-        console.print(f"[green]✅ 喜欢作品下载完成，共下载 {downloaded} 个[/green]")
+        if pool.limit_reached:
+            console.print(f"[yellow]已达到下载数量限制: {max_count}[/yellow]")
+        console.print(f"[green]✅ 喜欢作品下载完成，共下载 {pool.succeeded} 个[/green]")
 
     async def _fetch_user_likes(self, user_id: str, cursor: int = 0) -> Optional[Dict]:
         """获取用户喜欢的作品列表"""
-        try:
-            params_list = [
-                f'sec_user_id={user_id}',
-                f'max_cursor={cursor}',
-                'count=35',
-                'aid=6383',
-                'device_platform=webapp',
-                'channel=channel_pc_web',
-                'pc_client_type=1',
-                'version_code=170400',
-                'version_name=17.4.0',
-                'cookie_enabled=true',
-                'screen_width=1920',
-                'screen_height=1080',
-                'browser_language=zh-CN',
-                'browser_platform=MacIntel',
-                'browser_name=Chrome',
-                'browser_version=122.0.0.0',
-                'browser_online=true'
-            ]
-            params = '&'.join(params_list)
-
-            api_url = self.urls_helper.USER_FAVORITE_A
-
-            try:
-                xbogus = self.utils.getXbogus(params)
-                full_url = f"{api_url}{params}&X-Bogus={xbogus}"
-            except Exception as e:
-                logger.warning(f"获取X-Bogus失败: {e}, 尝试不带X-Bogus")
-                full_url = f"{api_url}{params}"
-
-            logger.info(f"请求用户喜欢列表: {full_url[:100]}...")
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url, headers=self.headers, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"请求失败，状态码: {response.status}")
-                        return None
+        return await self._fetch_list_page(
+            self.urls_helper.USER_FAVORITE_A, "用户喜欢列表",
+            sec_user_id=user_id, max_cursor=cursor, count=35
+        )
 
-                    text = await response.text()
-                    if not text:
-                        logger.error("响应内容为空")
-                        return None
+    async def _fetch_list_page(self, api_url: str, label: str, check_status: bool = True, **fields) -> Optional[Dict]:
+        """请求一页列表数据（统一的参数、X-Bogus 签名与错误处理）
 
-                    data = json.loads(text)
-                    if data.get('status_code') == 0:
-                        return data
-                    else:
-                        logger.error(f"API返回错误: {data.get('status_msg', '未知错误')}")
-                        return None
+        Args:
+            api_url: 接口地址
+            label: 日志中的接口名称
+            check_status: 是否要求 status_code == 0
+            fields: 业务参数（会拼接在公共参数之前）
+        """
+        try:
+            logger.info(f"请求{label}: {api_url}")
+            if self.json_raw:
+                data, content = await self.api_client.get_json_raw(api_url, check_status, **fields)
+                self._remember_raw_awemes(data, content)
+                return data
+            return await self.api_client.get_json(api_url, check_status, **fields)
+        except DouyinAPIError as e:
+            if e.status_code is not None:
+                logger.error(f"API返回错误: {e}")
+            else:
+                logger.error(f"获取{label}失败: {e}")
         except Exception as e:
-            logger.error(f"获取用户喜欢列表失败: {e}")
+            logger.error(f"获取{label}失败: {e}")
         return None
 
+    def _remember_raw_awemes(self, data: Dict, content: bytes) -> None:
+        """记录列表页中每个作品的原始 JSON 切片，供写入作品 JSON 时直接使用"""
+        awemes = (data or {}).get('aweme_list') or []
+        if not awemes:
+            return
+        spans = jsonlib.array_item_spans(content, 'aweme_list', len(awemes))
+        if spans is None:
+            logger.debug("未能定位作品原始数据，本页作品 JSON 将重新序列化")
+            return
+        page = memoryview(content)
+        # 字符串中的括号可能使边界偏移：相邻切片之间只能是逗号、最后一个切片后是数组结束，
+        # 且每个切片中第一个 aweme_id 是该作品的 ID 才使用；只做字节比较，不重新解析切片
+        gaps = [content[end:next_start].strip() for (_, end), (next_start, _) in zip(spans, spans[1:])]
+        valid = all(gap == b',' for gap in gaps) and _ARRAY_END.match(content, spans[-1][1]) is not None
+        for aweme, (start, end) in zip(awemes, spans):
+            if not valid:
+                break
+            match = _AWEME_ID.search(content, start, end)
+            valid = match is not None and match.group(1).decode('ascii') == str(aweme.get('aweme_id'))
+        if not valid:
+            logger.debug("作品原始数据边界校验失败，本页作品 JSON 将重新序列化")
+            return
+        for aweme, (start, end) in zip(awemes, spans):
+            self._raw_awemes[str(aweme.get('aweme_id'))] = (aweme, page[start:end])
+        while len(self._raw_awemes) > self.raw_cache_size:
+            self._raw_awemes.popitem(last=False)
+
     async def _download_user_mixes(self, user_id: str):
         """下载用户的所有合集（按配置可限制数量）"""
         max_allmix = 0
@@ -1002,21 +1525,12 @@ class UnifiedDownloader:
         except Exception:
             max_allmix = 0
 
-        cursor = 0
         fetched = 0
 
         console.print(f"\n[green]开始获取用户合集列表...[/green]")
-        while True:
-            await self.rate_limiter.acquire()
-            mix_list_data = await self._fetch_user_mix_list(user_id, cursor)
-            if not mix_list_data:
-                break
-
-            mix_infos = mix_list_data.get('mix_infos') or []
-            if not mix_infos:
-                break
-
-            for mix in mix_infos:
+        mixes = self._paginate(lambda c: self._fetch_user_mix_list(user_id, c), list_field='mix_infos')
+        try:
+            async for mix in mixes:
                 if max_allmix > 0 and fetched >= max_allmix:
                     console.print(f"[yellow]已达到合集数量限制: {max_allmix}[/yellow]")
                     return
@@ -1025,64 +1539,17 @@ class UnifiedDownloader:
                 console.print(f"[cyan]下载合集[/cyan]: {mix_name} ({mix_id})")
                 await self._download_mix_by_id(mix_id)
                 fetched += 1
-
-            if not mix_list_data.get('has_more'):
-                break
-            cursor = mix_list_data.get('cursor', 0)
+        finally:
+            await mixes.aclose()
 
         console.print(f"[green]✅ 用户合集下载完成，共处理 {fetched} 个[/green]")
 
     async def _fetch_user_mix_list(self, user_id: str, cursor: int = 0) -> Optional[Dict]:
         """获取用户合集列表"""
-        try:
-            params_list = [
-                f'sec_user_id={user_id}',
-                f'cursor={cursor}',
-                'count=35',
-                'aid=6383',
-                'device_platform=webapp',
-                'channel=channel_pc_web',
-                'pc_client_type=1',
-                'version_code=170400',
-                'version_name=17.4.0',
-                'cookie_enabled=true',
-                'screen_width=1920',
-                'screen_height=1080',
-                'browser_language=zh-CN',
-                'browser_platform=MacIntel',
-                'browser_name=Chrome',
-                'browser_version=122.0.0.0',
-                'browser_online=true'
-            ]
-            params = '&'.join(params_list)
-
-            api_url = self.urls_helper.USER_MIX_LIST
-            try:
-                xbogus = self.utils.getXbogus(params)
-                full_url = f"{api_url}{params}&X-Bogus={xbogus}"
-            except Exception as e:
-                logger.warning(f"获取X-Bogus失败: {e}, 尝试不带X-Bogus")
-                full_url = f"{api_url}{params}"
-
-            logger.info(f"请求用户合集列表: {full_url[:100]}...")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url, headers=self.headers, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"请求失败，状态码: {response.status}")
-                        return None
-                    text = await response.text()
-                    if not text:
-                        logger.error("响应内容为空")
-                        return None
-                    data = json.loads(text)
-                    if data.get('status_code') == 0:
-                        return data
-                    else:
-                        logger.error(f"API返回错误: {data.get('status_msg', '未知错误')}")
-                        return None
-        except Exception as e:
-            logger.error(f"获取用户合集列表失败: {e}")
-        return None
+        return await self._fetch_list_page(
+            self.urls_helper.USER_MIX_LIST, "用户合集列表",
+            sec_user_id=user_id, cursor=cursor, count=35
+        )
 
     async def download_mix(self, url: str) -> bool:
         """根据合集链接下载合集内所有作品"""
@@ -1104,80 +1571,29 @@ class UnifiedDownloader:
 
     async def _download_mix_by_id(self, mix_id: str):
         """按合集ID下载全部作品"""
-        cursor = 0
-        downloaded = 0
+        pool = AwemePool(self.concurrency)
+        metadata = self._open_metadata('mix', mix_id)
 
         console.print(f"\n[green]开始下载合集 {mix_id} ...[/green]")
 
-        while True:
-            await self.rate_limiter.acquire()
-            data = await self._fetch_mix_awemes(mix_id, cursor)
-            if not data:
-                break
-
-            aweme_list = data.get('aweme_list') or []
-            if not aweme_list:
-                break
-
-            for aweme in aweme_list:
-                success = await self._download_media_files(aweme)
-                if success:
-                    downloaded += 1
-
-            if not data.get('has_more'):
-                break
-            cursor = data.get('cursor', 0)
+        awemes = self._paginate(lambda c: self._fetch_mix_awemes(mix_id, c))
+        try:
+            async for aweme in awemes:
+                await pool.submit(lambda a=aweme: self._download_media_files(a, metadata=metadata))
+        finally:
+            await awemes.aclose()
+            await pool.join()
+            self._close_metadata(metadata)
 
-        console.print(f"[green]✅ 合集下载完成，共下载 {downloaded} 个[/green]")
+        console.print(f"[green]✅ 合集下载完成，共下载 {pool.succeeded} 个[/green]")
 
     async def _fetch_mix_awemes(self, mix_id: str, cursor: int = 0) -> Optional[Dict]:
         """获取合集下作品列表"""
-        try:
-            params_list = [
-                f'mix_id={mix_id}',
-                f'cursor={cursor}',
-                'count=35',
-                'aid=6383',
-                'device_platform=webapp',
-                'channel=channel_pc_web',
-                'pc_client_type=1',
-                'version_code=170400',
-                'version_name=17.4.0',
-                'cookie_enabled=true',
-                'screen_width=1920',
-                'screen_height=1080',
-                'browser_language=zh-CN',
-                'browser_platform=MacIntel',
-                'browser_name=Chrome',
-                'browser_version=122.0.0.0',
-                'browser_online=true'
-            ]
-            params = '&'.join(params_list)
-
-            api_url = self.urls_helper.USER_MIX
-            try:
-                xbogus = self.utils.getXbogus(params)
-                full_url = f"{api_url}{params}&X-Bogus={xbogus}"
-            except Exception as e:
-                logger.warning(f"获取X-Bogus失败: {e}, 尝试不带X-Bogus")
-                full_url = f"{api_url}{params}"
-
-            logger.info(f"请求合集作品列表: {full_url[:100]}...")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url, headers=self.headers, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"请求失败，状态码: {response.status}")
-                        return None
-                    text = await response.text()
-                    if not text:
-                        logger.error("响应内容为空")
-                        return None
-                    data = json.loads(text)
-                    # USER_MIX 返回没有统一的 status_code，这里直接返回
-                    return data
-        except Exception as e:
-            logger.error(f"获取合集作品失败: {e}")
-        return None
+        # USER_MIX 返回没有统一的 status_code，这里直接返回
+        return await self._fetch_list_page(
+            self.urls_helper.USER_MIX, "合集作品列表", check_status=False,
+            mix_id=mix_id, cursor=cursor, count=35
+        )
 
     async def download_music(self, url: str) -> bool:
         """根据音乐页链接下载音乐下的所有作品（支持增量）"""
@@ -1191,41 +1607,41 @@ class UnifiedDownloader:
                 logger.error(f"无法从音乐链接提取ID: {url}")
                 return False
 
-            cursor = 0
-            downloaded = 0
             limit_num = 0
             try:
                 limit_num = int((self.config.get('number', {}) or {}).get('music', 0))
             except Exception:
                 limit_num = 0
+            pool = AwemePool(self.concurrency, limit_num)
+            metadata = self._open_metadata('music', music_id)
 
-            console.print(f"\n[green]开始下载音乐 {music_id} 下的作品...[/green]")
+            async def handle(aweme: Dict) -> bool:
+                success = await self._download_media_files(aweme, metadata=metadata)
+                if success:
+                    await self._record_increment('music', aweme, music_id=music_id)
+                return success
 
-            while True:
-                await self.rate_limiter.acquire()
-                data = await self._fetch_music_awemes(music_id, cursor)
-                if not data:
-                    break
-                aweme_list = data.get('aweme_list') or []
-                if not aweme_list:
-                    break
+            console.print(f"\n[green]开始下载音乐 {music_id} 下的作品...[/green]")
 
-                for aweme in aweme_list:
-                    if limit_num > 0 and downloaded >= limit_num:
-                        console.print(f"[yellow]已达到音乐下载数量限制: {limit_num}[/yellow]")
-                        return True
+            awemes = self._paginate(lambda c: self._fetch_music_awemes(music_id, c))
+            try:
+                async for aweme in awemes:
+                    if pool.limit_reached:
+                        break
                     if self._should_skip_increment('music', aweme, music_id=music_id):
                         continue
-                    success = await self._download_media_files(aweme)
-                    if success:
-                        downloaded += 1
-                        self._record_increment('music', aweme, music_id=music_id)
+                    if not await pool.submit(lambda a=aweme: handle(a)):
+                        break
+            finally:
+                await awemes.aclose()
+                await pool.join()
+                self._close_metadata(metadata)
 
-                if not data.get('has_more'):
-                    break
-                cursor = data.get('cursor', 0)
+            if pool.limit_reached:
+                console.print(f"[yellow]已达到音乐下载数量限制: {limit_num}[/yellow]")
+                return True
 
-            console.print(f"[green]✅ 音乐作品下载完成，共下载 {downloaded} 个[/green]")
+            console.print(f"[green]✅ 音乐作品下载完成，共下载 {pool.succeeded} 个[/green]")
             return True
         except Exception as e:
             logger.error(f"下载音乐页失败: {e}")
@@ -1233,52 +1649,11 @@ class UnifiedDownloader:
 
     async def _fetch_music_awemes(self, music_id: str, cursor: int = 0) -> Optional[Dict]:
         """获取音乐下作品列表"""
-        try:
-            params_list = [
-                f'music_id={music_id}',
-                f'cursor={cursor}',
-                'count=35',
-                'aid=6383',
-                'device_platform=webapp',
-                'channel=channel_pc_web',
-                'pc_client_type=1',
-                'version_code=170400',
-                'version_name=17.4.0',
-                'cookie_enabled=true',
-                'screen_width=1920',
-                'screen_height=1080',
-                'browser_language=zh-CN',
-                'browser_platform=MacIntel',
-                'browser_name=Chrome',
-                'browser_version=122.0.0.0',
-                'browser_online=true'
-            ]
-            params = '&'.join(params_list)
+        return await self._fetch_list_page(
+            self.urls_helper.MUSIC, "音乐作品列表", check_status=False,
+            music_id=music_id, cursor=cursor, count=35
+        )
 
-            api_url = self.urls_helper.MUSIC
-            try:
-                xbogus = self.utils.getXbogus(params)
-                full_url = f"{api_url}{params}&X-Bogus={xbogus}"
-            except Exception as e:
-                logger.warning(f"获取X-Bogus失败: {e}, 尝试不带X-Bogus")
-                full_url = f"{api_url}{params}"
-
-            logger.info(f"请求音乐作品列表: {full_url[:100]}...")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url, headers=self.headers, timeout=10) as response:
-                    if response.status != 200:
-                        logger.error(f"请求失败，状态码: {response.status}")
-                        return None
-                    text = await response.text()
-                    if not text:
-                        logger.error("响应内容为空")
-                        return None
-                    data = json.loads(text)
-                    return data
-        except Exception as e:
-            logger.error(f"获取音乐作品失败: {e}")
-        return None
-    
     def _check_time_filter(self, aweme: Dict) -> bool:
         """检查时间过滤"""
         start_time = self.config.get('start_time')
@@ -1322,6 +1697,15 @@ class UnifiedDownloader:
     
     async def run(self):
         """运行下载器"""
+        watcher = asyncio.ensure_future(self._watch_loop())
+        try:
+            await self._run()
+        finally:
+            watcher.cancel()
+            await self.close()
+
+    async def _run(self):
+        """运行下载器（主流程）"""
         # 显示启动信息
         console.print(Panel.fit(
             "[bold cyan]抖音下载器 v3.0 - 统一增强版[/bold cyan]\n"
@@ -1400,6 +1784,14 @@ class UnifiedDownloader:
         table.add_row("跳过", str(stats['skipped']))
         table.add_row("成功率", stats['success_rate'])
         table.add_row("用时", stats['elapsed_time'])
+        table.add_row("下载量", stats['downloaded_bytes'])
+        table.add_row("缓冲峰值", stats['buffer_peak'])
+        table.add_row("峰值内存", stats['peak_memory'])
+        table.add_row("循环卡顿", f"{stats['loop_stalls']} 次 (最长 {stats['loop_lag_max']})")
+        if self.music_cache is not None:
+            music = self.music_cache.stats()
+            table.add_row("音乐缓存", f"命中 {music['hits']} / 未命中 {music['misses']}, "
+                                      f"节省 {music['saved_bytes'] / 1024 / 1024:.1f}MB, 淘汰 {music['evictions']}")
         
         console.print(table)
         console.print("\n[bold green]✅ 下载任务完成！[/bold green]")
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# downloader.py 与 utils/logger.py 在导入时就在当前目录创建日志文件，
+# 先切换到临时目录再收集测试模块，运行测试不会在仓库中留下文件
+_workdir = tempfile.mkdtemp(prefix='douyin-tests-')
+os.chdir(_workdir)
+atexit.register(shutil.rmtree, _workdir, True)
+
+
+@pytest.fixture(autouse=True)
+def _chdir_tmp(tmp_path, monkeypatch):
+    """每个测试在自己的临时目录中运行（短链接缓存、数据库等默认使用相对路径）"""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from apiproxy.douyin.client import DouyinAsyncClient
+from apiproxy.douyin.douyin import Douyin
+from downloader import UnifiedDownloader
+
+AWEME_DETAIL = {
+    'aweme_id': '7300000000000000001',
+    'desc': '测试作品',
+    'create_time': 1700000000,
+    'images': None,
+    'author': {'nickname': '作者', 'uid': '1', 'sec_uid': 'S'},
+    'video': {'play_addr': {'uri': 'v', 'url_list': ['https://example.com/v.mp4']}},
+}
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    config = tmp_path / 'config.yml'
+    config.write_text(f"link: []\npath: {tmp_path / 'out'}\ndatabase: false\n", encoding='utf-8')
+    return UnifiedDownloader(str(config))
+
+
+async def _serve_detail():
+    async def detail(request):
+        return web.json_response({'status_code': 0, 'aweme_detail': AWEME_DETAIL})
+
+    app = web.Application()
+    app.router.add_get('/detail', detail)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/detail?"
+
+
+def test_get_aweme_info_through_run_blocking(downloader):
+    """同步 Douyin 在线程池中经由主循环的 api_session 请求，不能在私有循环中驱动该会话"""
+
+    async def run():
+        runner, url = await _serve_detail()
+        try:
+            dy = Douyin(database=False, client=downloader.api_client)
+            dy.urls.POST_DETAIL = url
+            dy.timeout = 1
+            return await downloader._run_blocking(dy.getAwemeInfo, AWEME_DETAIL['aweme_id'])
+        finally:
+            await downloader.close()
+            await runner.cleanup()
+
+    result = asyncio.run(run())
+    assert result['aweme_id'] == AWEME_DETAIL['aweme_id']
+    assert result['desc'] == AWEME_DETAIL['desc']
+
+
+def test_get_sync_rejects_foreign_session_without_loop():
+    async def run():
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            client = DouyinAsyncClient(session=session)
+            loop = asyncio.get_running_loop()
+            with pytest.raises(RuntimeError):
+                await loop.run_in_executor(None, client.get_sync, 'http://127.0.0.1:1/')
+
+    asyncio.run(run())
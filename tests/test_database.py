@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import sqlite3
+import zlib
+
+import pytest
+
+from apiproxy.douyin.database import _TABLES, SCHEMA_VERSION, DataBase, DataBaseWriter
+
+# 版本 0（升级前）的表结构：aweme_id 单列唯一，t_mix 没有唯一约束
+BASELINE_SCHEMA = """
+CREATE TABLE t_user_post (id integer primary key autoincrement, sec_uid varchar(200),
+                          aweme_id integer unique, rawdata json);
+CREATE TABLE t_user_like (id integer primary key autoincrement, sec_uid varchar(200),
+                          aweme_id integer unique, rawdata json);
+CREATE TABLE t_mix (id integer primary key autoincrement, sec_uid varchar(200), mix_id varchar(200),
+                    aweme_id integer, rawdata json);
+CREATE TABLE t_music (id integer primary key autoincrement, music_id varchar(200),
+                      aweme_id integer unique, rawdata json);
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / 'data.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("insert into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);",
+                     [('A', 1, json.dumps({'aweme_id': 1})), ('A', 2, json.dumps({'aweme_id': 2}))])
+    conn.executemany("insert into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);",
+                     [('A', 1, json.dumps({'aweme_id': 1}))])
+    # 旧版 t_mix 可能有重复行，升级时只保留最早的一条
+    conn.executemany("insert into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);",
+                     [('A', 'M', 1, json.dumps({'v': 'first'})), ('A', 'M', 1, json.dumps({'v': 'second'}))])
+    conn.executemany("insert into t_music (music_id, aweme_id, rawdata) values(?,?,?);",
+                     [('U', 1, json.dumps({'aweme_id': 1}))])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_migrate_from_baseline(baseline_db):
+    db = DataBase(baseline_db)
+    assert db.cursor.execute("PRAGMA user_version;").fetchone()[0] == SCHEMA_VERSION
+    assert all('rawdata blob' in db._table_sql(table).lower() for table in _TABLES)
+
+    # 原有数据保留
+    assert json.loads(db.get_user_post('A', 1)[-1]) == {'aweme_id': 1}
+    assert db.get_aweme_ids('post', 'A') == [1, 2]
+    assert json.loads(db.get_mix('A', 'M', 1)[-1]) == {'v': 'first'}
+    assert db.count_aweme_ids('mix', 'A', 'M') == 1
+
+    # 组合唯一：同一作品可以被另一个用户喜欢、出现在另一首音乐下
+    db.insert_user_like('B', 1, {'aweme_id': 1})
+    db.insert_music('V', 1, {'aweme_id': 1})
+    assert db.get_user_like('B', 1) is not None
+    assert db.get_music('V', 1) is not None
+    # 同一来源内仍然唯一
+    db.insert_user_post('A', 1, {'aweme_id': 'dup'})
+    assert db.count_aweme_ids('post', 'A') == 2
+    db.close()
+
+    # 再次打开不会重复升级
+    db = DataBase(baseline_db)
+    assert db.count_aweme_ids('like', 'B') == 1
+    db.close()
+
+
+def test_migrate_rawdata_column_to_blob(tmp_path):
+    # 版本 1 的表已是组合唯一，rawdata 仍声明为 json
+    path = str(tmp_path / 'data.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("\n".join(sql.replace('rawdata blob', 'rawdata json') for sql in _TABLES.values()))
+    conn.execute("insert into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);",
+                 ('A', 1, zlib.compress(json.dumps({'aweme_id': 1}).encode())))
+    conn.execute("insert into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);",
+                 ('A', 1, json.dumps({'aweme_id': 1})))
+    conn.execute("PRAGMA user_version=1;")
+    conn.commit()
+    conn.close()
+
+    db = DataBase(path)
+    assert db.cursor.execute("PRAGMA user_version;").fetchone()[0] == SCHEMA_VERSION
+    assert all('rawdata blob' in db._table_sql(table).lower() for table in _TABLES)
+    assert json.loads(db.get_user_post('A', 1)[-1]) == {'aweme_id': 1}
+    assert json.loads(db.get_user_like('A', 1)[-1]) == {'aweme_id': 1}
+    db.close()
+
+
+def test_compact_rewrites_rows_to_current_format(tmp_path):
+    path = str(tmp_path / 'data.db')
+    db = DataBase(path, compression=None)
+    db.insert_user_posts_many('A', ((i, {'aweme_id': i, 'desc': 'x' * 200}) for i in range(50)))
+    db.close()
+
+    db = DataBase(path, compression='zlib')
+    assert not db._is_current(db.cursor.execute("select rawdata from t_user_post limit 1;").fetchone()[0])
+    stats = db.compact()
+    assert stats['rows'] == 50
+    raws = [row[0] for row in db.cursor.execute("select rawdata from t_user_post;")]
+    assert all(isinstance(raw, bytes) and db._is_current(raw) for raw in raws)
+    assert json.loads(db.get_user_post('A', 7)[-1]) == {'aweme_id': 7, 'desc': 'x' * 200}
+    # 已是当前格式时不再改写
+    assert db.compact()['rows'] == 0
+    db.close()
+
+
+def test_writer_flushes_in_background(tmp_path):
+    path = str(tmp_path / 'data.db')
+    writer = DataBaseWriter(path, batch_size=10, flush_interval=60)
+    for i in range(25):
+        writer.put('like', ('A',), i, {'aweme_id': i})
+    writer.flush()
+    db = DataBase(path)
+    assert db.count_aweme_ids('like', 'A') == 25
+    writer.put('music', ('U',), 1, {})
+    writer.close()
+    assert db.count_aweme_ids('music', 'U') == 1
+    db.close()
+
+
+def test_writer_failure_releases_waiters(tmp_path):
+    # 数据库无法打开时写入线程退出，flush()/close() 立即返回，put 报错而不是阻塞
+    writer = DataBaseWriter(str(tmp_path / 'missing' / 'data.db'))
+    writer._thread.join(5)
+    assert not writer.alive
+    assert writer.error is not None
+    writer.flush()
+    with pytest.raises(RuntimeError):
+        writer.put('post', ('A',), 1, {})
+    writer.close()
+
+
+def test_writer_put_nowait_when_full(tmp_path):
+    import queue
+    import threading
+
+    writer = DataBaseWriter(str(tmp_path / 'data.db'), max_queue=1)
+    # 让写入线程停在一次写入中，队列无法被消费
+    gate = threading.Event()
+    entered = threading.Event()
+    write = writer._write
+
+    def blocked_write(db, pending):
+        entered.set()
+        gate.wait(5)
+        write(db, pending)
+
+    writer._write = blocked_write
+    writer.put('post', ('A',), 1, {})
+    writer._queue.put((DataBaseWriter._FLUSH, threading.Event()))
+    assert entered.wait(5)
+    writer.put('post', ('A',), 2, {})
+    with pytest.raises(queue.Full):
+        writer.put_nowait('post', ('A',), 3, {})
+    gate.set()
+    writer.close()
+    db = DataBase(str(tmp_path / 'data.db'))
+    assert db.get_aweme_ids('post', 'A') == [1, 2]
+    db.close()
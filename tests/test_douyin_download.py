@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import threading
+
+import pytest
+from aiohttp import web
+
+from apiproxy.douyin.download import Download
+
+BODY = os.urandom(20000)
+
+
+@pytest.fixture
+def server():
+    """在后台线程中运行的文件服务器，truncate 为真时只发送一半内容后断开"""
+    state = {'truncate': True, 'ranges': []}
+
+    async def handler(request):
+        value = request.headers.get('Range')
+        state['ranges'].append(value)
+        start = int(value.split('=', 1)[1].rstrip('-')) if value else 0
+        body = BODY[start:]
+        response = web.StreamResponse(status=206 if value else 200)
+        response.content_length = len(body)
+        await response.prepare(request)
+        if state['truncate']:
+            await response.write(body[:len(body) // 2])
+            request.transport.close()
+            return response
+        await response.write(body)
+        return response
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def start():
+        app = web.Application()
+        app.router.add_get('/file', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+    runner, port = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    state['url'] = f"http://127.0.0.1:{port}/file"
+    yield state
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_interrupted_download_is_not_recorded(server, tmp_path):
+    dl = Download(segments=1)
+    dl.retry_times = 1
+    path = tmp_path / 'video.mp4'
+
+    assert not dl._download_media([server['url']], path, 'video', ('1', 'video'))
+    # 半个文件留在 .part 中，不会被当作已下载，也不会被其他目录复用
+    assert not path.exists()
+    partial = (tmp_path / 'video.mp4.part').stat().st_size
+    assert 0 < partial < len(BODY)
+    assert dl.content_index.lookup('1', 'video') is None
+
+    server['truncate'] = False
+    assert dl._download_media([server['url']], path, 'video', ('1', 'video'))
+    assert path.read_bytes() == BODY
+    assert not (tmp_path / 'video.mp4.part').exists()
+    assert server['ranges'][-1] == f"bytes={partial}-"
+    assert dl.content_index.lookup('1', 'video') == path
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+import pytest
+from aiohttp import web
+
+from apiproxy.common import jsonlib
+from downloader import AwemePool, UnifiedDownloader
+
+BODY = os.urandom(10000)
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    config = tmp_path / 'config.yml'
+    config.write_text(f"link: []\npath: {tmp_path / 'out'}\ndatabase: false\n", encoding='utf-8')
+    dl = UnifiedDownloader(str(config))
+    dl.segments = 4
+    dl.segment_threshold = 4096
+    return dl
+
+
+async def _serve(body, ranges=True):
+    """返回 (runner, 文件URL, 收到的 Range 头列表)"""
+    seen = []
+
+    async def handler(request):
+        value = request.headers.get('Range')
+        seen.append(value)
+        if value and ranges:
+            start, end = value.split('=', 1)[1].split('-')
+            part = body[int(start):int(end) + 1]
+            return web.Response(body=part, status=206, headers={
+                'Accept-Ranges': 'bytes', 'Content-Range': f'bytes {start}-{end}/{len(body)}'})
+        headers = {'Accept-Ranges': 'bytes'} if ranges else {}
+        return web.Response(body=body, headers=headers)
+
+    app = web.Application()
+    app.router.add_get('/file', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/file", seen
+
+
+def _download(downloader, tmp_path, body, ranges=True):
+    async def run():
+        runner, url, seen = await _serve(body, ranges)
+        try:
+            ok = await downloader._download_file([url], tmp_path / 'f.bin')
+        finally:
+            await downloader.close()
+            await runner.cleanup()
+        return ok, seen
+
+    return asyncio.run(run())
+
+
+def test_segmented_download_reuses_first_response(downloader, tmp_path):
+    ok, seen = _download(downloader, tmp_path, BODY)
+    assert ok
+    assert (tmp_path / 'f.bin').read_bytes() == BODY
+    # 不发送 bytes=0-0 探测，首个完整请求充当第一个分段
+    assert seen[0] is None
+    assert sorted(r for r in seen[1:]) == ['bytes=2500-4999', 'bytes=5000-7499', 'bytes=7500-9999']
+
+
+def test_small_file_single_request(downloader, tmp_path):
+    ok, seen = _download(downloader, tmp_path, BODY[:1000])
+    assert ok
+    assert (tmp_path / 'f.bin').read_bytes() == BODY[:1000]
+    assert seen == [None]
+
+
+def test_no_accept_ranges_single_request(downloader, tmp_path):
+    ok, seen = _download(downloader, tmp_path, BODY, ranges=False)
+    assert ok
+    assert (tmp_path / 'f.bin').read_bytes() == BODY
+    assert seen == [None]
+    assert not (tmp_path / 'f.bin.part').exists()
+
+
+def test_hedge_on_slow_early_throughput(downloader, tmp_path):
+    # 慢镜像立刻返回响应头，但开头迟迟读不完，应启动下一个镜像并采用它
+    downloader.hedge_delay = 0.1
+    downloader.hedge_probe = 4096
+
+    async def slow(request):
+        response = web.StreamResponse(headers={'Content-Length': str(len(BODY))})
+        await response.prepare(request)
+        await response.write(BODY[:100])
+        await asyncio.sleep(1)
+        return response
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/slow', slow)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        slow_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/slow"
+        fast_runner, fast_url, seen = await _serve(BODY, ranges=False)
+        try:
+            ok = await asyncio.wait_for(downloader._download_file([slow_url, fast_url], tmp_path / 'f.bin'), 3)
+        finally:
+            await downloader.close()
+            await fast_runner.cleanup()
+            await runner.cleanup()
+        return ok, seen
+
+    ok, seen = asyncio.run(run())
+    assert ok
+    assert (tmp_path / 'f.bin').read_bytes() == BODY
+    assert seen == [None]
+
+
+def test_metadata_sink_per_task_closed_on_finish(tmp_path):
+    config = tmp_path / 'config.yml'
+    config.write_text(f"link: []\npath: {tmp_path / 'out'}\ndatabase: false\njson_mode: jsonl\n",
+                      encoding='utf-8')
+    dl = UnifiedDownloader(str(config))
+
+    sink = dl._open_metadata('post', 'S1')
+    assert dl._open_metadata('post', 'S1') is sink
+    sink.write('1', {'aweme_id': '1', 'author': {'nickname': 'a'}})
+    sink.write('2', {'aweme_id': '2', 'author': {'nickname': 'b'}})
+    dl._close_metadata(sink)
+
+    # 不同作者的作品写入同一个任务文件，任务结束后不再占用文件句柄
+    assert not dl.metadata._sinks
+    reopened = dl._open_metadata('post', 'S1')
+    assert len(reopened) == 2
+    assert reopened.get('2')['author']['nickname'] == 'b'
+    assert reopened.directory == tmp_path / 'out' / '_metadata' / 'post_S1'
+    dl.metadata.close()
+
+
+def _page(awemes):
+    content = jsonlib.dumps({'status_code': 0, 'aweme_list': awemes, 'has_more': 0})
+    return jsonlib.loads(content), content
+
+
+def test_remember_raw_awemes(downloader):
+    awemes = [{'aweme_id': str(7300000000000000000 + i), 'desc': f'作品{i}', 'music': {'id': i}} for i in range(3)]
+    data, content = _page(awemes)
+    downloader._remember_raw_awemes(data, content)
+    assert list(downloader._raw_awemes) == [a['aweme_id'] for a in awemes]
+    for aweme in data['aweme_list']:
+        cached, raw = downloader._raw_awemes[aweme['aweme_id']]
+        assert cached is aweme
+        assert jsonlib.loads(raw) == aweme
+
+
+def test_remember_raw_awemes_rejects_misaligned_spans(downloader):
+    # 字符串中的括号使括号计数失衡，切片边界错位时不使用原始数据
+    awemes = [{'aweme_id': '1', 'desc': 'a}'}, {'aweme_id': '2', 'desc': '{b'}]
+    data, content = _page(awemes)
+    downloader._remember_raw_awemes(data, content)
+    assert not downloader._raw_awemes
+
+
+def test_raw_cache_size_follows_concurrency(tmp_path):
+    config = tmp_path / 'config.yml'
+    config.write_text(f"link: []\npath: {tmp_path}\ndatabase: false\nconcurrency: 2\nprefetch_pages: 1\n",
+                      encoding='utf-8')
+    assert UnifiedDownloader(str(config)).raw_cache_size == 2 * 3 * 35
+
+
+def _run_pool(pool, outcomes, delay=0.01):
+    """依次提交作品，outcomes[i] 为第 i 个作品是否下载成功；返回 (提交数, 最大并发数)"""
+    running = 0
+    peak = 0
+
+    async def task(ok):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        return ok
+
+    async def run():
+        for ok in outcomes:
+            if pool.limit_reached:
+                break
+            if not await pool.submit(lambda ok=ok: task(ok)):
+                break
+        await pool.join()
+        return peak
+
+    return asyncio.run(run())
+
+
+def test_aweme_pool_concurrency():
+    pool = AwemePool(3)
+    peak = _run_pool(pool, [True] * 10)
+    assert peak == 3
+    assert pool.submitted == pool.succeeded == 10
+
+
+def test_aweme_pool_limit_matches_serial_result():
+    # 在途数 + 成功数不超过上限，失败后才补位：最终成功数恰好等于上限，且不多提交
+    pool = AwemePool(4, limit=3)
+    _run_pool(pool, [True, False, True, False, True, True, True])
+    assert pool.succeeded == 3
+    assert pool.submitted == 5
+    assert pool.limit_reached
+
+
+def test_aweme_pool_counts_exceptions_as_failures():
+    async def boom():
+        raise RuntimeError('boom')
+
+    async def run():
+        pool = AwemePool(2, limit=1)
+        await pool.submit(boom)
+        await pool.submit(lambda: asyncio.sleep(0, result=True))
+        return await pool.join(), pool
+
+    succeeded, pool = asyncio.run(run())
+    assert succeeded == 1
+    assert pool.submitted == 2
+
+
+def test_record_increment_survives_closed_writer(tmp_path, caplog):
+    config = tmp_path / 'config.yml'
+    config.write_text(f"link: []\npath: {tmp_path / 'out'}\ndatabase_path: {tmp_path / 'data.db'}\n",
+                      encoding='utf-8')
+    dl = UnifiedDownloader(str(config))
+    aweme = {'aweme_id': '7300000000000000001', 'author': {'sec_uid': 'S'}}
+
+    async def run():
+        await dl._record_increment('post', aweme)
+        dl.db_writer.flush()
+        dl.db_writer.close()
+        # 写入线程已关闭：记录失败只记日志，已下载索引照常更新
+        await dl._record_increment('post', dict(aweme, aweme_id='7300000000000000002'))
+
+    asyncio.run(run())
+    assert '7300000000000000002' in dl.seen.get('post', 'S')
+    assert dl.db.get_aweme_ids('post', 'S') == [7300000000000000001]
+    assert '写入增量记录失败' in caplog.text
+    dl.seen.close()
+    dl.db.close()
+
+
+
+def test_user_posts_paginate_through_async_client(downloader):
+    pages = {0: {'status_code': 0, 'aweme_list': [{'aweme_id': '1'}, {'aweme_id': '2'}],
+                 'has_more': 1, 'max_cursor': 5},
+             5: {'status_code': 0, 'aweme_list': [{'aweme_id': '3'}], 'has_more': 0, 'max_cursor': 0}}
+    requested = []
+
+    async def get_json(api_url, check_status=True, **fields):
+        requested.append((api_url, fields['max_cursor']))
+        return pages[fields['max_cursor']]
+
+    async def run():
+        downloader.api_client.get_json = get_json
+        try:
+            return [aweme['aweme_id'] async for aweme in downloader._iter_user_posts('S')]
+        finally:
+            await downloader.close()
+
+    assert asyncio.run(run()) == ['1', '2', '3']
+    assert requested == [(downloader.urls_helper.USER_POST, 0), (downloader.urls_helper.USER_POST, 5)]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import time
+
+import pytest
+
+from apiproxy.common.metadata import ZSTD_AVAILABLE, MetadataSink, MetadataSinks
+
+COMPRESSIONS = [None, 'gzip'] + (['zstd'] if ZSTD_AVAILABLE else [])
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_round_trip(tmp_path, compression):
+    records = {str(i): {'aweme_id': str(i), 'desc': f'作品{i}'} for i in range(20)}
+    with MetadataSink(tmp_path, compression=compression, flush_every=7) as sink:
+        for aweme_id, record in records.items():
+            assert sink.write(aweme_id, record)
+        # 未落盘的记录也能读取
+        assert sink.get('19') == records['19']
+        # 原始 JSON 字节去掉换行后写入
+        assert sink.write('raw', b'{\n  "aweme_id": "raw"\n}')
+        assert not sink.write('3', {'aweme_id': 'dup'})
+
+    sink = MetadataSink(tmp_path, compression=compression)
+    assert len(sink) == 21
+    assert '5' in sink and 'missing' not in sink
+    for aweme_id, record in records.items():
+        assert sink.get(aweme_id) == record
+    assert sink.get('raw') == {'aweme_id': 'raw'}
+    assert sink.get('missing') is None
+    # 重新打开后继续追加，不覆盖已有记录
+    sink.write('new', {'aweme_id': 'new'})
+    sink.close()
+    assert MetadataSink(tmp_path, compression=compression).get('new') == {'aweme_id': 'new'}
+
+
+def test_gzip_file_is_plain_jsonl(tmp_path):
+    with MetadataSink(tmp_path, compression='gzip') as sink:
+        sink.write('1', {'aweme_id': '1'})
+        sink.write('2', {'aweme_id': '2'})
+    lines = gzip.decompress(sink.path.read_bytes()).decode('utf-8').splitlines()
+    assert [json.loads(line)['aweme_id'] for line in lines] == ['1', '2']
+    index = sink.index_path.read_text(encoding='utf-8').split()
+    assert index[0] == '1' and index[3] == '2'
+
+
+def test_pending_records_flushed_by_timer(tmp_path):
+    sink = MetadataSink(tmp_path, flush_every=100, flush_interval=0.05)
+    sink.write('1', {'aweme_id': '1'})
+    assert sink.path.read_bytes() == b''
+    # 之后没有新的写入，定时器也会把记录落盘
+    time.sleep(0.3)
+    assert json.loads(sink.path.read_bytes()) == {'aweme_id': '1'}
+    assert sink.index_path.read_text(encoding='utf-8').split()[0] == '1'
+    sink.close()
+
+
+def test_sinks_reuse_and_close(tmp_path):
+    sinks = MetadataSinks()
+    a = sinks.get(tmp_path / 'a')
+    assert sinks.get(tmp_path / 'a') is a
+    a.write('1', {})
+    sinks.close(tmp_path / 'a')
+    assert a._file is None
+    assert sinks.get(tmp_path / 'a') is not a
+    sinks.close()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from apiproxy.common.mirrors import MirrorStats
+
+
+def test_unseen_preferred_stays_first():
+    stats = MirrorStats()
+    stats.record('https://b.example.com/x', 0.2)
+    assert stats.order(['https://a.example.com/x', 'https://b.example.com/x']) == \
+        ['https://a.example.com/x', 'https://b.example.com/x']
+
+
+def test_unseen_hosts_not_promoted_over_measured():
+    stats = MirrorStats()
+    stats.record('https://a.example.com/x', 0.5)
+    stats.record('https://c.example.com/x', 0.1)
+    urls = ['https://a.example.com/x', 'https://b.example.com/x', 'https://c.example.com/x']
+    assert stats.order(urls) == ['https://c.example.com/x', 'https://a.example.com/x', 'https://b.example.com/x']
+
+
+def test_failure_penalty_demotes_host():
+    stats = MirrorStats()
+    stats.record('https://a.example.com/x', 0.1)
+    stats.record_failure('https://a.example.com/x')
+    stats.record('https://b.example.com/x', 0.3)
+    assert stats.order(['https://a.example.com/x', 'https://b.example.com/x'])[0] == 'https://b.example.com/x'
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from apiproxy.douyin.model import Aweme
+from apiproxy.douyin.result import AwemeConverter
+
+from test_result import FULL
+
+
+def test_keep_json_round_trips_converted_dict():
+    converter = AwemeConverter()
+    aweme = Aweme.from_raw(FULL, 1, keep_json=True, converter=converter)
+    assert aweme.to_dict() == AwemeConverter().convert(FULL, 1)
+    assert aweme.images[0].uri == "i1"
+
+
+def test_without_keep_json_only_model_fields():
+    aweme = Aweme.from_raw(FULL, 0)
+    data = aweme.to_dict()
+    assert data["aweme_id"] == FULL["aweme_id"]
+    assert data["video"]["play_addr"]["url_list"] == ["https://v1/play"]
+    assert data["statistics"]["digg_count"] == ""
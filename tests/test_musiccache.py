@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from apiproxy.common.musiccache import MusicCache, music_key
+from apiproxy.douyin.model import Aweme
+from apiproxy.douyin.result import AwemeConverter
+
+RAW = {
+    'aweme_id': '7300000000000000001',
+    'desc': '作品',
+    'create_time': 1700000000,
+    'author': {'nickname': '作者', 'uid': '1', 'sec_uid': 'S'},
+    'video': {'play_addr': {'uri': 'v', 'url_list': ['https://example.com/v.mp4']}},
+    'music': {
+        'id': 7200000000000000000,
+        'id_str': '7200000000000000000',
+        'title': '原声',
+        'play_url': {'uri': 'https://sf3.example.com/obj/ies-music/123.mp3',
+                     'url_list': ['https://example.com/m.mp3']},
+    },
+}
+
+
+def test_music_key_same_for_both_downloaders():
+    # downloader.py 使用接口原始数据，apiproxy/douyin/download.py 使用 Aweme 模型
+    aweme = Aweme.from_dict(AwemeConverter().convert(RAW, 0))
+    assert music_key(RAW['music']) == music_key(aweme.music) == RAW['music']['play_url']['uri']
+
+
+def test_music_key_fallbacks():
+    assert music_key({'id_str': '42', 'play_url': {}}) == '42'
+    assert music_key({}) is None
+    assert music_key(None) is None
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = MusicCache(tmp_path / 'cache', max_bytes=250)
+    for key in ('a', 'b', 'c'):
+        cache.part_path(key).write_bytes(b'x' * 100)
+        assert cache.add(key, tmp_path / f'{key}.mp3')
+    # 超出上限时淘汰最久未使用的 a，已链接到作品目录的文件不受影响
+    assert not cache.path('a').exists()
+    assert (tmp_path / 'a.mp3').read_bytes() == b'x' * 100
+    assert cache.link('c', tmp_path / 'c2.mp3')
+    assert not cache.link('a', tmp_path / 'a2.mp3')
+    assert cache.stats()['evictions'] == 1
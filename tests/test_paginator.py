@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from apiproxy.douyin.paginator import paginate
+
+
+class Pages:
+    """按游标返回预设页面，记录请求顺序"""
+
+    def __init__(self, pages, delay=0.0):
+        self.pages = pages
+        self.delay = delay
+        self.requested = []
+
+    async def __call__(self, cursor):
+        self.requested.append(cursor)
+        await asyncio.sleep(self.delay)
+        page = self.pages[cursor]
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+
+def _pages(n, size=2, has_more_last=False):
+    return {
+        i: {'aweme_list': [f'{i}-{j}' for j in range(size)], 'cursor': i + 1,
+            'has_more': 1 if i + 1 < n or has_more_last else 0}
+        for i in range(n)
+    }
+
+
+async def _collect(iterator, limit=None):
+    items = []
+    try:
+        async for item in iterator:
+            items.append(item)
+            if limit is not None and len(items) >= limit:
+                break
+    finally:
+        await iterator.aclose()
+    return items
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_yields_all_pages_and_stops_on_has_more(prefetch):
+    fetch = Pages(_pages(3))
+    items = asyncio.run(_collect(paginate(fetch, prefetch=prefetch)))
+    assert items == ['0-0', '0-1', '1-0', '1-1', '2-0', '2-1']
+    assert fetch.requested == [0, 1, 2]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1])
+def test_stops_on_empty_page_or_failure(prefetch):
+    pages = _pages(2, has_more_last=True)
+    pages[2] = {'aweme_list': [], 'has_more': 1}
+    assert len(asyncio.run(_collect(paginate(Pages(pages), prefetch=prefetch)))) == 4
+
+    pages[2] = None
+    assert len(asyncio.run(_collect(paginate(Pages(pages), prefetch=prefetch)))) == 4
+
+
+def test_custom_fields():
+    pages = {0: {'mix_infos': ['a'], 'max_cursor': 9, 'has_more': 1}, 9: {'mix_infos': ['b'], 'has_more': 0}}
+    fetch = Pages(pages)
+    items = asyncio.run(_collect(paginate(fetch, list_field='mix_infos', cursor_field='max_cursor')))
+    assert items == ['a', 'b']
+    assert fetch.requested == [0, 9]
+
+
+def test_prefetches_next_page_while_consuming():
+    fetch = Pages(_pages(5))
+
+    async def run():
+        iterator = paginate(fetch, prefetch=1)
+        first = await iterator.__anext__()
+        # 消费第一页时，第二页已在后台请求，预取深度为 1 时只领先一页
+        await asyncio.sleep(0.05)
+        requested = list(fetch.requested)
+        # 取走第二页后才请求第三页
+        for _ in range(2):
+            await iterator.__anext__()
+        await asyncio.sleep(0.05)
+        after = list(fetch.requested)
+        await iterator.aclose()
+        return first, requested, after
+
+    first, requested, after = asyncio.run(run())
+    assert first == '0-0'
+    assert requested == [0, 1]
+    assert after == [0, 1, 2]
+
+
+def test_prefetch_depth_bounds_pages_ahead():
+    fetch = Pages(_pages(10))
+
+    async def run():
+        iterator = paginate(fetch, prefetch=3)
+        await iterator.__anext__()
+        await asyncio.sleep(0.05)
+        requested = list(fetch.requested)
+        await iterator.aclose()
+        return requested
+
+    assert asyncio.run(run()) == [0, 1, 2, 3]
+
+
+def test_aclose_cancels_prefetch():
+    fetch = Pages(_pages(100), delay=0.01)
+
+    async def run():
+        items = await _collect(paginate(fetch, prefetch=2), limit=3)
+        count = len(fetch.requested)
+        await asyncio.sleep(0.1)
+        return items, count
+
+    items, count = asyncio.run(run())
+    assert items == ['0-0', '0-1', '1-0']
+    # 提前结束后不再请求新页面
+    assert len(fetch.requested) == count < 100
+
+
+def test_fetch_exception_propagates():
+    pages = _pages(1, has_more_last=True)
+    pages[1] = RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_collect(paginate(Pages(pages), prefetch=1)))
+
+
+def test_rate_limiter_called_per_page():
+    class Limiter:
+        calls = 0
+
+        async def acquire(self):
+            Limiter.calls += 1
+
+    asyncio.run(_collect(paginate(Pages(_pages(3)), prefetch=1, rate_limiter=Limiter())))
+    assert Limiter.calls == 3
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from apiproxy.douyin.resolver import ShortLinkResolver
+
+
+class FakeResponse:
+    def __init__(self, status_code, location=None):
+        self.status_code = status_code
+        self.headers = {'Location': location} if location else {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按 URL 返回预设响应的 requests 会话替身"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        return self.routes[url]
+
+
+def _resolver(tmp_path):
+    return ShortLinkResolver(tmp_path / 'short_links.json')
+
+
+def test_caches_followed_short_link(tmp_path):
+    session = FakeSession({
+        'https://v.douyin.com/abc/': FakeResponse(302, 'https://www.douyin.com/video/1'),
+        'https://www.douyin.com/video/1': FakeResponse(200),
+    })
+    resolver = _resolver(tmp_path)
+    assert resolver.resolve('https://v.douyin.com/abc/', session=session) == 'https://www.douyin.com/video/1'
+    assert resolver.resolve('https://v.douyin.com/abc/', session=session) == 'https://www.douyin.com/video/1'
+    assert len(session.calls) == 2
+
+
+def test_does_not_cache_without_redirect_or_on_error(tmp_path):
+    session = FakeSession({
+        'https://v.douyin.com/none/': FakeResponse(200),
+        'https://v.douyin.com/bad/': FakeResponse(302, 'https://www.douyin.com/blocked'),
+        'https://www.douyin.com/blocked': FakeResponse(403),
+    })
+    resolver = _resolver(tmp_path)
+    resolver.resolve('https://v.douyin.com/none/', session=session)
+    resolver.resolve('https://v.douyin.com/bad/', session=session)
+    assert resolver.cache.get('https://v.douyin.com/none/') is None
+    assert resolver.cache.get('https://v.douyin.com/bad/') is None
+
+
+def test_does_not_cache_other_hosts(tmp_path):
+    session = FakeSession({
+        'https://www.douyin.com/user/x': FakeResponse(302, 'https://www.douyin.com/user/y'),
+        'https://www.douyin.com/user/y': FakeResponse(200),
+    })
+    resolver = _resolver(tmp_path)
+    assert resolver.resolve('https://www.douyin.com/user/x', session=session) == 'https://www.douyin.com/user/y'
+    assert resolver.cache.get('https://www.douyin.com/user/x') is None
+
+
+def test_does_not_cache_when_redirects_exhausted(tmp_path):
+    session = FakeSession({
+        'https://v.douyin.com/loop/': FakeResponse(302, 'https://www.douyin.com/a'),
+        'https://www.douyin.com/a': FakeResponse(302, 'https://www.douyin.com/b'),
+    })
+    resolver = ShortLinkResolver(tmp_path / 'short_links.json', max_redirects=2)
+    assert resolver.resolve('https://v.douyin.com/loop/', session=session) == 'https://www.douyin.com/b'
+    assert resolver.cache.get('https://v.douyin.com/loop/') is None
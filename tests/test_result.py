@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+
+import pytest
+
+from apiproxy.douyin.result import AwemeConverter, Result
+
+THUMB = {"height": 720, "uri": "100x100/aweme-avatar/x", "width": 720,
+         "url_list": ["https://p3.douyinpic.com/100x100/a.jpeg"]}
+
+FULL = {
+    "aweme_id": "7000000000000000001", "desc": "作品", "create_time": 1700000000,
+    "author": {"avatar_thumb": THUMB, "cover_url": [THUMB], "nickname": "n", "sec_uid": "MS4w", "uid": "1"},
+    "music": {"cover_hd": THUMB, "play_url": {"uri": "p", "url_key": "k", "url_list": ["pl"]}, "title": "t"},
+    "mix_info": {"cover_url": THUMB, "mix_id": "1", "mix_name": "合集", "statis": {"current_episode": 1}},
+    "video": {"bit_rate": [{"play_addr": {"uri": "v0200", "url_list": ["https://v1/play"]}}],
+              "cover": THUMB, "origin_cover": THUMB},
+    "statistics": {"digg_count": 1, "comment_count": 2, "share_count": 3},
+    "images": [{"uri": "i1", "url_list": ["https://p/1.jpeg"], "height": 1}, {"uri": "i2", "width": 2}],
+}
+
+
+def _legacy(aweme, awemeType):
+    result = Result()
+    result.clearDict(result.awemeDict)
+    result.dataConvert(awemeType, result.awemeDict, aweme)
+    return copy.deepcopy(result.awemeDict)
+
+
+@pytest.mark.parametrize('aweme', [
+    FULL,
+    {},
+    {"aweme_id": "1", "author": None, "video": "x", "music": {"play_url": None}},
+    {"aweme_id": "2", "author": {"cover_url": []}, "video": {"bit_rate": []}, "create_time": "bad"},
+    {"aweme_id": "3", "video": {"bit_rate": [{"play_addr": {"uri": "u"}}]}, "images": None},
+])
+@pytest.mark.parametrize('awemeType', [0, 1])
+def test_converter_matches_data_convert(aweme, awemeType):
+    assert AwemeConverter().convert(aweme, awemeType) == _legacy(aweme, awemeType)
+
+
+def test_converter_matches_data_convert_sequence():
+    # Result.picDict 从不清空，前一个作品图片的字段会带到后一个作品
+    awemes = [(FULL, 1), ({"images": [{"uri": "only-uri"}]}, 1), ({"aweme_id": "v"}, 0),
+              ({"images": [{"height": 9}, {"uri": "x", "url_list": []}]}, 1)]
+    result = Result()
+    converter = AwemeConverter()
+    for aweme, awemeType in awemes:
+        result.clearDict(result.awemeDict)
+        result.dataConvert(awemeType, result.awemeDict, aweme)
+        assert converter.convert(aweme, awemeType) == result.awemeDict
+
+
+def test_converter_output_does_not_alias_input():
+    raw = copy.deepcopy(FULL)
+    converter = AwemeConverter()
+    first = converter.convert(raw, 1)
+    first["author"]["avatar"]["url_list"].append("changed")
+    first["author"]["avatar_thumb"]["url_list"].append("changed")
+    first["music"]["play_url"]["url_list"].append("changed")
+    first["images"][0]["url_list"].append("changed")
+    assert raw == FULL
+    assert converter.convert("not a dict", 0) == converter.convert({}, 0)
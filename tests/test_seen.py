@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from apiproxy.douyin.database import DataBase
+from apiproxy.douyin.seen import SeenIndex, SeenSet
+
+BASE = 7300000000000000000
+
+
+def test_seen_set_add_and_save(tmp_path):
+    path = tmp_path / 'post.i64'
+    seen = SeenSet(path)
+    seen.replace([BASE + 1, BASE + 5])
+    seen.add(BASE + 3)
+    seen.add(BASE + 5)
+    assert BASE + 3 in seen and str(BASE + 5) in seen
+    assert BASE + 4 not in seen and 'x' not in seen
+    assert len(seen) == 3
+    seen.close()
+
+    reopened = SeenSet(path)
+    assert list(reopened._ids) == [BASE + 1, BASE + 3, BASE + 5]
+    reopened.close()
+
+
+def test_seen_index_rebuilds_when_database_changes(tmp_path):
+    db = DataBase(str(tmp_path / 'data.db'))
+    db.insert_user_posts_many('A', ((BASE + i, {}) for i in range(10)))
+
+    index = SeenIndex(db)
+    assert BASE + 9 in index.get('post', 'A')
+    assert BASE not in index.get('post', 'B')
+    index.close()
+
+    # 其他进程写入后，记录数与索引文件不一致，加载时从数据库重建
+    db.insert_user_post('A', BASE + 100, {})
+    index = SeenIndex(db)
+    seen = index.get('post', 'A')
+    assert BASE + 100 in seen
+    assert len(seen) == 11
+    index.close()
+
+    # 索引文件损坏（截断）时同样重建
+    path = next((tmp_path / 'data.db.seen').glob('post-*.i64'))
+    path.write_bytes(path.read_bytes()[:20])
+    index = SeenIndex(db)
+    assert len(index.get('post', 'A')) == 11
+    index.close()
+    db.close()
+
+
+def test_seen_index_keeps_owners_apart(tmp_path):
+    db = DataBase(str(tmp_path / 'data.db'))
+    db.insert_mix_many('A', 'M1', [(BASE + 1, {})])
+    db.insert_mix_many('A', 'M2', [(BASE + 2, {})])
+    index = SeenIndex(db)
+    assert BASE + 1 in index.get('mix', 'A', 'M1')
+    assert BASE + 2 not in index.get('mix', 'A', 'M1')
+    assert BASE + 2 in index.get('mix', 'A', 'M2')
+    index.close()
+    db.close()
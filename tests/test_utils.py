@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+import apiproxy
+from apiproxy.common.utils import Utils, XBogusSigner
+from apiproxy.douyin.paginator import build_params
+
+PAYLOADS = [
+    build_params(sec_user_id='MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek', count=35, max_cursor=0),
+    build_params(aweme_id='7300000000000000001'),
+    'a=1',
+    '',
+]
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+@pytest.mark.parametrize('form', ['', 'x=1'])
+@pytest.mark.parametrize('ua', [apiproxy.ua, 'Mozilla/5.0 (X11; Linux x86_64) Chrome/120.0.0.0'])
+def test_signer_matches_get_xbogus(monkeypatch, payload, form, ua):
+    ts = 1700000000
+    monkeypatch.setattr(time, 'time', lambda: ts)
+    assert XBogusSigner(ua).sign(payload, form) == Utils().get_xbogus(payload, ua, form)
+
+
+def test_get_xbogus_params_and_batch(monkeypatch):
+    ts = 1700000123
+    monkeypatch.setattr(time, 'time', lambda: ts)
+    utils = Utils()
+    legacy = [p + "&X-Bogus=" + utils.get_xbogus(p, apiproxy.ua, '') for p in PAYLOADS]
+    assert [utils.getXbogus(p) for p in PAYLOADS] == legacy
+    assert utils.get_signer().sign_many(PAYLOADS) == legacy
+    assert utils.get_signer() is utils.get_signer()